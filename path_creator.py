@@ -1,8 +1,15 @@
+import hashlib
 import os
+import tempfile
 import uuid
 
+from django.core.files.storage import FileSystemStorage, storages
 from django.utils.text import slugify
 
+CAS_PREFIX = "cas/"
+# Uploads are written here while they are hashed, then moved into place.
+CAS_TEMP_PREFIX = f"{CAS_PREFIX}tmp/"
+
 
 def image_file_path(instance, filename):
     _, extension = os.path.splitext(filename)
@@ -10,3 +17,60 @@ def image_file_path(instance, filename):
     filename = f"{slugify(instance)}-{uuid.uuid4()}{extension}"
 
     return os.path.join("uploads", "social_media", directory, filename)
+
+
+def content_path(digest, extension):
+    """Sharded location of a blob: cas/ab/cd/abcd...{extension}."""
+    directory = f"{CAS_PREFIX}{digest[:2]}/{digest[2:4]}"
+    return f"{directory}/{digest}{extension.lower()}"
+
+
+def image_storage():
+    return storages["images"]
+
+
+class ContentAddressedStorage(FileSystemStorage):
+    """
+    File system storage that names every uploaded file after the SHA-256 of
+    its content, so identical uploads share one file whose URL never
+    changes. The upload_to path only contributes the extension. Names
+    already under cas/ (variants derived from a blob) are kept as given.
+    """
+
+    chunk_size = 64 * 1024
+
+    def get_available_name(self, name, max_length=None):
+        # Equal names mean equal content, so an existing file is reused
+        # rather than renamed.
+        return name
+
+    def _save(self, name, content):
+        temp_dir = self.path(CAS_TEMP_PREFIX)
+        os.makedirs(temp_dir, exist_ok=True)
+        digest = hashlib.sha256()
+
+        with tempfile.NamedTemporaryFile(dir=temp_dir, delete=False) as temp:
+            if hasattr(content, "seek"):
+                content.seek(0)
+            for chunk in content.chunks(self.chunk_size):
+                if isinstance(chunk, str):
+                    chunk = chunk.encode()
+                digest.update(chunk)
+                temp.write(chunk)
+
+        if not name.startswith(CAS_PREFIX):
+            name = content_path(digest.hexdigest(), os.path.splitext(name)[1])
+        full_path = self.path(name)
+        os.makedirs(os.path.dirname(full_path), exist_ok=True)
+
+        if os.path.exists(full_path):
+            os.remove(temp.name)
+            # Refresh the modification time so garbage collection treats a
+            # re-uploaded blob as new until its reference is recorded.
+            os.utime(full_path)
+        else:
+            if self.file_permissions_mode is not None:
+                os.chmod(temp.name, self.file_permissions_mode)
+            os.replace(temp.name, full_path)
+
+        return name.replace("\\", "/")
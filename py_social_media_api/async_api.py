@@ -0,0 +1,89 @@
+import base64
+import binascii
+import functools
+
+from django.http import JsonResponse
+from rest_framework import status
+from rest_framework.exceptions import APIException, NotFound
+from rest_framework.utils.urls import replace_query_param
+from rest_framework_simplejwt.exceptions import InvalidToken
+
+from user.authentication import aauthenticate
+
+CURSOR_QUERY_PARAM = "cursor"
+
+
+def async_api_view(view):
+    """
+    Turn an async function into a read-only JSON endpoint: only GET/HEAD is
+    allowed, request.user is resolved from the JWT header and DRF API
+    exceptions become error responses like in the sync views.
+    """
+
+    @functools.wraps(view)
+    async def wrapper(request, *args, **kwargs):
+        if request.method not in ("GET", "HEAD"):
+            return JsonResponse(
+                {"detail": f'Method "{request.method}" not allowed.'},
+                status=status.HTTP_405_METHOD_NOT_ALLOWED,
+                headers={"Allow": "GET, HEAD"},
+            )
+        try:
+            request.user = await aauthenticate(request)
+            data, headers = await view(request, *args, **kwargs)
+        except InvalidToken as exc:
+            return JsonResponse(exc.detail, status=exc.status_code)
+        except APIException as exc:
+            return JsonResponse(
+                (
+                    exc.detail
+                    if isinstance(exc.detail, (dict, list))
+                    else {"detail": exc.detail}
+                ),
+                status=exc.status_code,
+            )
+        return JsonResponse(data, safe=False, headers=headers)
+
+    return wrapper
+
+
+def decode_cursor(request):
+    encoded = request.GET.get(CURSOR_QUERY_PARAM)
+    if not encoded:
+        return None
+    try:
+        return int(base64.urlsafe_b64decode(encoded.encode()).decode())
+    except (TypeError, ValueError, UnicodeDecodeError, binascii.Error):
+        raise NotFound("Invalid cursor")
+
+
+def encode_cursor(position):
+    return base64.urlsafe_b64encode(str(position).encode()).decode()
+
+
+async def paginate_by_id(request, queryset, serializer_class, page_size):
+    """
+    Serialize one page of queryset newest-id first, fetched with a single
+    async query, as {"next", "results"} with an opaque id cursor.
+    """
+    position = decode_cursor(request)
+    if position is not None:
+        queryset = queryset.filter(id__lt=position)
+
+    items = [
+        item
+        async for item in queryset.order_by("-id")[: page_size + 1].aiterator(
+            chunk_size=page_size + 1
+        )
+    ]
+    page = items[:page_size]
+    next_link = None
+    if len(items) > page_size:
+        next_link = replace_query_param(
+            request.build_absolute_uri(),
+            CURSOR_QUERY_PARAM,
+            encode_cursor(page[-1].id),
+        )
+    # Every relation is loaded by now, so serializing cannot hit the ORM.
+    data = serializer_class(page, many=True, context={"request": request}).data
+    return {"next": next_link, "results": data}
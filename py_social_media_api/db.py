@@ -0,0 +1,153 @@
+from django.conf import settings
+from django.db import connections, models, router
+from django.db.models import F
+from django.db.models.constants import OnConflict
+from django.db.models.functions import Greatest
+from django.db.models.sql import UpdateQuery
+
+# Backends that support UPDATE ... RETURNING. MariaDB only has it for
+# INSERT and DELETE, so can_return_columns_from_insert does not tell.
+UPDATE_RETURNING_VENDORS = ("postgresql", "sqlite")
+
+
+def _connection_for_write(model):
+    return connections[router.db_for_write(model)]
+
+
+def configure_sqlite(sender, connection, **kwargs):
+    """
+    connection_created receiver applying SQLITE_PRAGMAS to every new SQLite
+    connection. Runs on the raw connection so the pragmas are not counted as
+    queries of the request that opened it.
+    """
+    if connection.vendor != "sqlite":
+        return
+    for name, value in settings.SQLITE_PRAGMAS.items():
+        connection.connection.execute(f"PRAGMA {name} = {value}")
+
+
+def insert_ignore(model, **values):
+    """
+    Insert one row with a single conflict-ignoring statement.
+    Returns 1 if the row was inserted and 0 if it already existed.
+    """
+    connection = _connection_for_write(model)
+    quote = connection.ops.quote_name
+    fields = [model._meta.get_field(name) for name in values]
+    columns = ", ".join(quote(field.column) for field in fields)
+    placeholders = ", ".join(["%s"] * len(fields))
+    suffix = connection.ops.on_conflict_suffix_sql(
+        fields, OnConflict.IGNORE, None, None
+    )
+    sql = (
+        f"{connection.ops.insert_statement(on_conflict=OnConflict.IGNORE)} "
+        f"{quote(model._meta.db_table)} ({columns}) "
+        f"VALUES ({placeholders}) {suffix}"
+    )
+
+    with connection.cursor() as cursor:
+        cursor.execute(
+            sql,
+            [
+                field.get_db_prep_save(value, connection)
+                for field, value in zip(fields, values.values())
+            ],
+        )
+        return cursor.rowcount
+
+
+def shifted(field_name, delta):
+    """
+    Expression adding delta to a counter column. Decrements are clamped at
+    zero so a drifted counter cannot break writes.
+    """
+    value = F(field_name) + delta
+    if delta < 0:
+        value = Greatest(value, 0)
+    return value
+
+
+def shift_counter(model, pk, field_name, delta):
+    """
+    Add delta to a counter column (never going below zero) and return its
+    new value, or None when no row has that primary key. Uses a single
+    UPDATE ... RETURNING where the backend supports it.
+    """
+    alias = router.db_for_write(model)
+    connection = connections[alias]
+    queryset = model._base_manager.using(alias).filter(pk=pk)
+
+    # SQLite has RETURNING since 3.35, like for INSERT.
+    if connection.vendor not in UPDATE_RETURNING_VENDORS or not (
+        connection.features.can_return_columns_from_insert
+    ):
+        if not queryset.update(**{field_name: shifted(field_name, delta)}):
+            return None
+        return queryset.values_list(field_name, flat=True).get()
+
+    query = queryset.query.chain(UpdateQuery)
+    query.add_update_values({field_name: shifted(field_name, delta)})
+    sql, params = query.get_compiler(alias).as_sql()
+    column = connection.ops.quote_name(
+        model._meta.get_field(field_name).column
+    )
+    with connection.cursor() as cursor:
+        cursor.execute(f"{sql} RETURNING {column}", params)
+        row = cursor.fetchone()
+    return row[0] if row else None
+
+
+def upsert_increment(model, rows, unique_fields, field_name, batch_size=500):
+    """
+    Add rows[field_name] to the matching counter row, inserting rows that do
+    not exist yet. Uses one INSERT ... ON CONFLICT DO UPDATE statement per
+    batch where the backend supports it and update-or-insert per row
+    otherwise.
+    """
+    if len(rows) > batch_size:
+        for start in range(0, len(rows), batch_size):
+            upsert_increment(
+                model,
+                rows[start:start + batch_size],
+                unique_fields,
+                field_name,
+                batch_size,
+            )
+        return
+    if not rows:
+        return
+
+    connection = _connection_for_write(model)
+    quote = connection.ops.quote_name
+    table = quote(model._meta.db_table)
+    names = [*unique_fields, field_name]
+    fields = [model._meta.get_field(name) for name in names]
+    columns = [field.column for field in fields]
+    column = quote(model._meta.get_field(field_name).column)
+
+    if connection.features.supports_update_conflicts_with_target:
+        placeholders = ", ".join(["%s"] * len(names))
+        conflict = ", ".join(quote(name) for name in columns[:-1])
+        sql = (
+            f"INSERT INTO {table} ({', '.join(map(quote, columns))}) "
+            f"VALUES {', '.join([f'({placeholders})'] * len(rows))} "
+            f"ON CONFLICT ({conflict}) DO UPDATE SET "
+            f"{column} = {table}.{column} + EXCLUDED.{column}"
+        )
+        params = [
+            field.get_db_prep_save(row[name], connection)
+            for row in rows
+            for name, field in zip(names, fields)
+        ]
+        with connection.cursor() as cursor:
+            cursor.execute(sql, params)
+        return
+
+    for row in rows:
+        lookup = {name: row[name] for name in unique_fields}
+        delta = models.F(field_name) + row[field_name]
+        manager = model._default_manager.using(connection.alias)
+        if manager.filter(**lookup).update(**{field_name: delta}):
+            continue
+        if not insert_ignore(model, **row):
+            manager.filter(**lookup).update(**{field_name: delta})
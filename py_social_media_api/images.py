@@ -0,0 +1,335 @@
+import io
+import logging
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+from django.apps import apps
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.db import connections, transaction
+from django.db.models.signals import (
+    post_delete,
+    post_init,
+    post_save,
+    pre_save,
+)
+from django.utils import timezone
+from PIL import Image, ImageOps
+
+from path_creator import CAS_PREFIX
+from py_social_media_api.db import shifted, upsert_increment
+
+logger = logging.getLogger(__name__)
+
+Image.MAX_IMAGE_PIXELS = settings.IMAGE_VARIANTS["MAX_PIXELS"]
+
+SAVE_OPTIONS = {
+    "webp": {"format": "WEBP", "method": 4},
+    "jpeg": {"format": "JPEG", "optimize": True, "progressive": True},
+}
+
+_executor = None
+registered = []
+
+
+def variants_field(field_name):
+    return f"{field_name}_variants"
+
+
+def get_executor():
+    global _executor
+    if _executor is None:
+        _executor = ThreadPoolExecutor(
+            max_workers=settings.IMAGE_VARIANTS["WORKERS"],
+            thread_name_prefix="image-variants",
+        )
+    return _executor
+
+
+def _encode(image, image_format):
+    if image_format == "jpeg" and image.mode != "RGB":
+        background = Image.new("RGB", image.size, "white")
+        if image.mode in ("RGBA", "LA", "P"):
+            image = image.convert("RGBA")
+            background.paste(image, mask=image.getchannel("A"))
+        else:
+            background.paste(image.convert("RGB"))
+        image = background
+    elif image_format == "webp" and image.mode not in ("RGB", "RGBA"):
+        image = image.convert("RGBA")
+
+    buffer = io.BytesIO()
+    # No exif= argument is passed, so metadata never reaches the variants.
+    image.save(
+        buffer,
+        quality=settings.IMAGE_VARIANTS["QUALITY"],
+        **SAVE_OPTIONS[image_format],
+    )
+    return buffer.getvalue()
+
+
+def build_variants(file):
+    """
+    Write resized, metadata-free copies of an image next to it for every
+    configured width not larger than the original, plus the original size.
+    Returns a list of {"name", "width", "height", "format"} dicts.
+    """
+    config = settings.IMAGE_VARIANTS
+    storage = file.storage
+
+    with file.open("rb"):
+        with Image.open(file) as source:
+            width, height = source.size
+            if width * height > config["MAX_PIXELS"]:
+                raise ValueError(
+                    f"{file.name} has {width * height} pixels, "
+                    f"more than {config['MAX_PIXELS']}"
+                )
+            image = ImageOps.exif_transpose(source)
+            image.load()
+
+    base, _ = os.path.splitext(file.name)
+    widths = sorted(
+        {min(width, image.width) for width in config["WIDTHS"]}
+        | {min(image.width, config["MAX_WIDTH"])}
+    )
+    variants = []
+
+    for target_width in widths:
+        target_height = max(
+            round(image.height * target_width / image.width), 1
+        )
+        resized = (
+            image
+            if target_width == image.width
+            else image.resize((target_width, target_height), Image.LANCZOS)
+        )
+        for image_format in config["FORMATS"]:
+            extension = "jpg" if image_format == "jpeg" else image_format
+            name = f"{base}-{target_width}w.{extension}"
+            # Originals are named after their content or uniquely, so a file
+            # that exists is a variant of these very bytes; reuse it.
+            if not storage.exists(name):
+                name = storage.save(
+                    name, ContentFile(_encode(resized, image_format))
+                )
+            variants.append(
+                {
+                    "name": name,
+                    "width": target_width,
+                    "height": target_height,
+                    "format": image_format,
+                }
+            )
+    return variants
+
+
+def process_image(model, pk, field_name, in_worker=False):
+    """
+    Worker entry point: build the variants of one stored image and record
+    them, unless the image was replaced while they were being built.
+    """
+    try:
+        instance = model._default_manager.filter(pk=pk).first()
+        file = getattr(instance, field_name, None)
+        if not file:
+            return
+
+        variants = build_variants(file)
+        recorded = model._default_manager.filter(
+            pk=pk, **{field_name: file.name}
+        ).update(
+            **{
+                variants_field(field_name): {
+                    "source": file.name,
+                    "variants": variants,
+                }
+            }
+        )
+        if not recorded and not _blob_name(file.name):
+            # Variants of a content-addressed blob are shared with every
+            # record holding the same bytes; collect_image_blobs reclaims
+            # them once nothing references the blob.
+            for variant in variants:
+                file.storage.delete(variant["name"])
+    except Exception:
+        logger.exception(
+            "Could not build variants of %s %s.%s",
+            model.__name__,
+            pk,
+            field_name,
+        )
+    finally:
+        if in_worker:
+            connections.close_all()
+
+
+def enqueue_image(instance, field_name):
+    """Build variants in the worker pool once the transaction commits."""
+    model, pk = type(instance), instance.pk
+
+    def submit():
+        if settings.IMAGE_VARIANTS["EAGER"]:
+            process_image(model, pk, field_name)
+        else:
+            get_executor().submit(
+                process_image, model, pk, field_name, in_worker=True
+            )
+
+    transaction.on_commit(submit)
+
+
+def _blob_name(value):
+    name = getattr(value, "name", value) or ""
+    return name if name.startswith(CAS_PREFIX) else ""
+
+
+def acquire_blob(name):
+    if name:
+        upsert_increment(
+            apps.get_model("social_media", "ImageBlob"),
+            [{"name": name, "refcount": 1}],
+            unique_fields=["name"],
+            field_name="refcount",
+        )
+
+
+def release_blob(name):
+    if name:
+        apps.get_model("social_media", "ImageBlob").objects.filter(
+            name=name
+        ).update(refcount=shifted("refcount", -1))
+
+
+def register(model, field_name):
+    """
+    Track an image field: queue variant generation whenever the image
+    changes and keep the reference counts of content-addressed blobs.
+    """
+    original = f"_{field_name}_original_blob"
+
+    def image_loaded(sender, instance, **kwargs):
+        if field_name in instance.__dict__:
+            setattr(
+                instance,
+                original,
+                _blob_name(instance.__dict__[field_name]),
+            )
+
+    def image_saving(sender, instance, raw=False, **kwargs):
+        if raw or instance._state.adding or hasattr(instance, original):
+            return
+        # The field was deferred when the instance was loaded.
+        stored = (
+            model._default_manager.filter(pk=instance.pk)
+            .values_list(field_name, flat=True)
+            .first()
+        )
+        setattr(instance, original, _blob_name(stored))
+
+    def image_saved(sender, instance, created, raw=False, **kwargs):
+        if raw:
+            return
+        file = getattr(instance, field_name)
+        previous = "" if created else getattr(instance, original, "")
+        current = _blob_name(file)
+        if current != previous:
+            acquire_blob(current)
+            release_blob(previous)
+        setattr(instance, original, current)
+
+        recorded = getattr(instance, variants_field(field_name)) or {}
+        if file and recorded.get("source") != file.name:
+            enqueue_image(instance, field_name)
+
+    def image_deleted(sender, instance, **kwargs):
+        release_blob(_blob_name(instance.__dict__.get(field_name)))
+
+    if (model, field_name) not in registered:
+        registered.append((model, field_name))
+    uid = f"image-{model._meta.label}-{field_name}"
+    post_init.connect(image_loaded, sender=model, weak=False, dispatch_uid=uid)
+    pre_save.connect(image_saving, sender=model, weak=False, dispatch_uid=uid)
+    post_save.connect(image_saved, sender=model, weak=False, dispatch_uid=uid)
+    post_delete.connect(
+        image_deleted, sender=model, weak=False, dispatch_uid=uid
+    )
+
+
+def pick_variant(instance, field_name, min_width=None):
+    """
+    Name of the smallest recorded variant at least min_width wide in the
+    preferred format, the largest one if none is that wide, or the
+    original when no variants match the current image.
+    """
+    file = getattr(instance, field_name)
+    if not file:
+        return None
+    recorded = getattr(instance, variants_field(field_name)) or {}
+    if recorded.get("source") != file.name:
+        return file.name
+
+    preferred = settings.IMAGE_VARIANTS["FORMATS"][0]
+    variants = sorted(
+        (
+            variant
+            for variant in recorded.get("variants", [])
+            if variant["format"] == preferred
+        ),
+        key=lambda variant: variant["width"],
+    )
+    if not variants:
+        return file.name
+    for variant in variants:
+        if min_width is None or variant["width"] >= min_width:
+            return variant["name"]
+    return variants[-1]["name"]
+
+
+def collect_image_blobs(storage, grace):
+    """
+    Delete content-addressed blobs (and the variants derived from them) that
+    no record references and that were not written within the grace period,
+    along with stale temporary uploads. Returns the number of deleted blobs.
+    """
+    ImageBlob = apps.get_model("social_media", "ImageBlob")
+    cutoff = timezone.now() - grace
+    deleted = 0
+
+    def is_stale(name):
+        return storage.get_modified_time(name) < cutoff
+
+    if storage.exists(f"{CAS_PREFIX}tmp"):
+        for name in storage.listdir(f"{CAS_PREFIX}tmp")[1]:
+            if is_stale(f"{CAS_PREFIX}tmp/{name}"):
+                storage.delete(f"{CAS_PREFIX}tmp/{name}")
+
+    if not storage.exists(CAS_PREFIX):
+        return deleted
+    for first in storage.listdir(CAS_PREFIX)[0]:
+        if first == "tmp":
+            continue
+        for second in storage.listdir(f"{CAS_PREFIX}{first}")[0]:
+            directory = f"{CAS_PREFIX}{first}/{second}"
+            files = storage.listdir(directory)[1]
+            blobs = [
+                f"{directory}/{name}"
+                for name in files
+                if "-" not in os.path.splitext(name)[0]
+            ]
+            referenced = set(
+                ImageBlob.objects.filter(
+                    name__in=blobs, refcount__gt=0
+                ).values_list("name", flat=True)
+            )
+            for blob in blobs:
+                if blob in referenced or not is_stale(blob):
+                    continue
+                digest = os.path.splitext(os.path.basename(blob))[0]
+                for name in files:
+                    if name.startswith(f"{digest}-"):
+                        storage.delete(f"{directory}/{name}")
+                storage.delete(blob)
+                ImageBlob.objects.filter(name=blob, refcount=0).delete()
+                deleted += 1
+    return deleted
@@ -0,0 +1,159 @@
+import mimetypes
+import os
+import posixpath
+import re
+
+from django.conf import settings
+from django.core.exceptions import SuspiciousFileOperation
+from django.http import (
+    FileResponse,
+    Http404,
+    HttpResponse,
+    HttpResponseNotAllowed,
+    StreamingHttpResponse,
+)
+from django.utils._os import safe_join
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date, parse_http_date_safe
+
+from path_creator import CAS_PREFIX, CAS_TEMP_PREFIX
+
+RANGE_RE = re.compile(r"^bytes=(\d*)-(\d*)$")
+CHUNK_SIZE = 64 * 1024
+
+
+def _etag(path, stat):
+    if path.startswith(CAS_PREFIX):
+        # Content-addressed names already identify the bytes.
+        return f'"{posixpath.splitext(posixpath.basename(path))[0]}"'
+    return f'"{stat.st_mtime_ns:x}-{stat.st_size:x}"'
+
+
+def _cache_control(path):
+    config = settings.MEDIA_SERVE
+    if path.startswith(CAS_PREFIX):
+        return f"public, max-age={config['IMMUTABLE_MAX_AGE']}, immutable"
+    return f"public, max-age={config['MAX_AGE']}"
+
+
+def _requested_range(request, size, etag, last_modified):
+    """
+    (start, end) of a satisfiable single byte range, None to send the whole
+    file, or False when the range cannot be satisfied.
+    """
+    header = request.headers.get("Range")
+    if not header:
+        return None
+    if_range = request.headers.get("If-Range")
+    if if_range and if_range != etag:
+        if parse_http_date_safe(if_range) != int(last_modified):
+            return None
+
+    match = RANGE_RE.match(header.strip())
+    if not match or match.groups() == ("", ""):
+        # Multiple or malformed ranges: serving the full body is allowed.
+        return None
+    first, last = match.groups()
+    if first:
+        start = int(first)
+        end = min(int(last), size - 1) if last else size - 1
+    else:
+        start, end = max(size - int(last), 0), size - 1
+    if start > end or start >= size:
+        return False
+    return start, end
+
+
+def _read_range(full_path, start, length):
+    with open(full_path, "rb") as file:
+        file.seek(start)
+        while length > 0:
+            chunk = file.read(min(CHUNK_SIZE, length))
+            if not chunk:
+                break
+            length -= len(chunk)
+            yield chunk
+
+
+def serve_media(request, path):
+    """
+    Serve an uploaded file with ETag/Last-Modified validation, single byte
+    ranges and long-lived caching. With MEDIA_SERVE["MODE"] set to
+    "x-accel-redirect" or "x-sendfile" only headers are produced and the
+    front proxy sends the bytes.
+    """
+    if request.method not in ("GET", "HEAD"):
+        return HttpResponseNotAllowed(["GET", "HEAD"])
+
+    path = posixpath.normpath(path).lstrip("/")
+    if f"{path}/".startswith(CAS_TEMP_PREFIX):
+        # Half-written uploads are not content-addressed files yet.
+        raise Http404("File not found")
+    try:
+        full_path = safe_join(settings.MEDIA_ROOT, path)
+    except SuspiciousFileOperation:
+        raise Http404("File not found")
+    if not os.path.isfile(full_path):
+        raise Http404("File not found")
+
+    stat = os.stat(full_path)
+    etag = _etag(path, stat)
+    response = get_conditional_response(
+        request, etag=etag, last_modified=int(stat.st_mtime)
+    )
+    content_type, encoding = mimetypes.guess_type(full_path)
+    content_type = content_type or "application/octet-stream"
+    mode = settings.MEDIA_SERVE["MODE"]
+
+    if response is None:
+        if mode == "x-accel-redirect":
+            response = HttpResponse(content_type=content_type)
+            response["X-Accel-Redirect"] = (
+                settings.MEDIA_SERVE["ACCEL_REDIRECT_PREFIX"] + path
+            )
+        elif mode == "x-sendfile":
+            response = HttpResponse(content_type=content_type)
+            response["X-Sendfile"] = full_path
+        else:
+            response = _stream(request, full_path, stat, etag, content_type)
+        response["Last-Modified"] = http_date(stat.st_mtime)
+        if encoding:
+            response["Content-Encoding"] = encoding
+
+    response["ETag"] = etag
+    response["Cache-Control"] = _cache_control(path)
+    return response
+
+
+def _stream(request, full_path, stat, etag, content_type):
+    size = stat.st_size
+    byte_range = _requested_range(request, size, etag, stat.st_mtime)
+
+    if byte_range is False:
+        response = HttpResponse(status=416)
+        response["Content-Range"] = f"bytes */{size}"
+        return response
+
+    if byte_range is None:
+        if request.method == "HEAD":
+            response = HttpResponse(content_type=content_type)
+        else:
+            response = FileResponse(
+                open(full_path, "rb"), content_type=content_type
+            )
+        response["Content-Length"] = size
+    else:
+        start, end = byte_range
+        length = end - start + 1
+        response = StreamingHttpResponse(
+            ()
+            if request.method == "HEAD"
+            else _read_range(full_path, start, length),
+            status=206,
+            content_type=content_type,
+        )
+        response["Content-Range"] = f"bytes {start}-{end}/{size}"
+        response["Content-Length"] = length
+
+    response["Accept-Ranges"] = "bytes"
+    return response
@@ -0,0 +1,160 @@
+import logging
+import time
+from contextlib import ExitStack, contextmanager
+
+from asgiref.sync import (
+    iscoroutinefunction,
+    markcoroutinefunction,
+    sync_to_async,
+)
+from django.conf import settings
+from django.db import connections
+from rest_framework.permissions import SAFE_METHODS
+
+from py_social_media_api.routers import pin_primary
+
+logger = logging.getLogger(__name__)
+
+
+class QueryCounter:
+    """Execute wrapper that counts and times SQL queries on every database."""
+
+    def __init__(self, record=False):
+        self.count = 0
+        self.duration = 0.0
+        self.record = record
+        self.queries = []
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.count += 1
+            self.duration += time.perf_counter() - start
+            if self.record:
+                self.queries.append(sql)
+
+    @property
+    def duration_ms(self):
+        return self.duration * 1000
+
+    @contextmanager
+    def capture(self):
+        with ExitStack() as stack:
+            for connection in connections.all():
+                stack.enter_context(connection.execute_wrapper(self))
+            yield self
+
+
+def get_query_budget(method, view_name):
+    """Look up "METHOD view-name" first, then the bare view name."""
+    budgets = settings.QUERY_BUDGET["VIEWS"]
+    return budgets.get(
+        f"{method} {view_name}",
+        budgets.get(view_name, settings.QUERY_BUDGET["DEFAULT"]),
+    )
+
+
+class QueryBudgetMiddleware:
+    """
+    Count SQL queries and DB time per request, expose them as
+    X-DB-Queries/X-DB-Time-Ms headers when enabled and warn when a view
+    goes over its QUERY_BUDGET.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+
+        counter = QueryCounter()
+        with counter.capture():
+            response = self.get_response(request)
+        return self.check_budget(request, response, counter)
+
+    async def __acall__(self, request):
+        # Under ASGI every thread-sensitive ORM call of a request runs in the
+        # same executor thread, so the wrappers are installed there.
+        counter = QueryCounter()
+        with ExitStack() as stack:
+            await sync_to_async(stack.enter_context)(counter.capture())
+            try:
+                response = await self.get_response(request)
+            finally:
+                await sync_to_async(stack.close)()
+        return self.check_budget(request, response, counter)
+
+    def check_budget(self, request, response, counter):
+        config = settings.QUERY_BUDGET
+        if config["HEADERS"]:
+            response["X-DB-Queries"] = str(counter.count)
+            response["X-DB-Time-Ms"] = f"{counter.duration_ms:.2f}"
+
+        view_name = getattr(request.resolver_match, "view_name", None)
+        budget = get_query_budget(request.method, view_name)
+        if counter.count > budget:
+            logger.warning(
+                "%s %s (%s) ran %d queries in %.2f ms, budget is %d",
+                request.method,
+                request.path,
+                view_name,
+                counter.count,
+                counter.duration_ms,
+                budget,
+            )
+
+        return response
+
+
+class StickyPrimaryMiddleware:
+    """
+    Pin an authenticated user's reads to the primary database for
+    DATABASE_ROUTING["STICKY_SECONDS"] after each successful write, so
+    replica lag never hides their own changes from them.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+
+        response = self.get_response(request)
+        if self.wrote(request, response):
+            self.pin(request)
+        return response
+
+    async def __acall__(self, request):
+        response = await self.get_response(request)
+        if self.wrote(request, response):
+            await sync_to_async(self.pin)(request)
+        return response
+
+    @staticmethod
+    def wrote(request, response):
+        return (
+            bool(settings.DATABASE_ROUTING["REPLICAS"])
+            and request.method not in SAFE_METHODS
+            and response.status_code < 400
+        )
+
+    @staticmethod
+    def pin(request):
+        # DRF stores the authenticated user on the underlying request.
+        user = getattr(request, "user", None)
+        if user is not None and user.is_authenticated:
+            pin_primary(user.id)
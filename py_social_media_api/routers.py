@@ -0,0 +1,91 @@
+import random
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import DEFAULT_DB_ALIAS
+from rest_framework.permissions import SAFE_METHODS
+
+replica_reads = ContextVar("replica_reads", default=False)
+
+
+def _pin_key(user_id):
+    return f"db-primary:{user_id}"
+
+
+def pin_primary(user_id):
+    """Keep the user's reads on the primary for the next STICKY_SECONDS."""
+    cache.set(
+        _pin_key(user_id), 1, settings.DATABASE_ROUTING["STICKY_SECONDS"]
+    )
+
+
+def is_pinned(user):
+    return user.is_authenticated and cache.get(_pin_key(user.id)) is not None
+
+
+@contextmanager
+def use_primary():
+    """Read from the primary inside the block, even in a replica view."""
+    token = replica_reads.set(False)
+    try:
+        yield
+    finally:
+        replica_reads.reset(token)
+
+
+class ReplicaRouter:
+    """
+    Send ORM reads to a random DATABASE_ROUTING replica while replica_reads
+    is set (see ReplicaReadMixin) and everything else to the primary. A
+    write turns replica reads off for the rest of the request, so it always
+    reads its own writes.
+    """
+
+    @staticmethod
+    def databases():
+        return {DEFAULT_DB_ALIAS, *settings.DATABASE_ROUTING["REPLICAS"]}
+
+    def choose_replica(self):
+        return random.choice(settings.DATABASE_ROUTING["REPLICAS"])
+
+    def db_for_read(self, model, **hints):
+        if replica_reads.get() and settings.DATABASE_ROUTING["REPLICAS"]:
+            return self.choose_replica()
+        return DEFAULT_DB_ALIAS
+
+    def db_for_write(self, model, **hints):
+        replica_reads.set(False)
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        databases = self.databases()
+        if obj1._state.db in databases and obj2._state.db in databases:
+            return True
+        return None
+
+
+class ReplicaReadMixin:
+    """
+    ViewSet mixin serving safe requests from the read replicas, unless the
+    authenticated user wrote something within the last STICKY_SECONDS (see
+    StickyPrimaryMiddleware).
+    """
+
+    def dispatch(self, request, *args, **kwargs):
+        token = replica_reads.set(False)
+        try:
+            return super().dispatch(request, *args, **kwargs)
+        finally:
+            replica_reads.reset(token)
+
+    def initial(self, request, *args, **kwargs):
+        # Runs after authentication, so request.user is known here.
+        super().initial(request, *args, **kwargs)
+        if (
+            settings.DATABASE_ROUTING["REPLICAS"]
+            and request.method in SAFE_METHODS
+            and not is_pinned(request.user)
+        ):
+            replica_reads.set(True)
@@ -44,6 +44,7 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    "py_social_media_api.middleware.QueryBudgetMiddleware",
     "django.middleware.security.SecurityMiddleware",
     "django.contrib.sessions.middleware.SessionMiddleware",
     "django.middleware.common.CommonMiddleware",
@@ -51,6 +52,7 @@ MIDDLEWARE = [
     "django.contrib.auth.middleware.AuthenticationMiddleware",
     "django.contrib.messages.middleware.MessageMiddleware",
     "django.middleware.clickjacking.XFrameOptionsMiddleware",
+    "py_social_media_api.middleware.StickyPrimaryMiddleware",
 ]
 
 ROOT_URLCONF = "py_social_media_api.urls"
@@ -76,11 +78,58 @@ WSGI_APPLICATION = "py_social_media_api.wsgi.application"
 # Database
 # https://docs.djangoproject.com/en/5.0/ref/settings/#databases
 
+# Connections are kept open for DATABASE_CONN_MAX_AGE seconds and checked
+# before reuse. DATABASE_REPLICAS lists read replicas as SQLite files, or as
+# hosts for server databases; they become the aliases replica_1, replica_2...
+
 DATABASES = {
     "default": {
-        "ENGINE": "django.db.backends.sqlite3",
-        "NAME": BASE_DIR / "db.sqlite3",
+        "ENGINE": os.environ.get(
+            "DATABASE_ENGINE", "django.db.backends.sqlite3"
+        ),
+        "NAME": os.environ.get("DATABASE_NAME", BASE_DIR / "db.sqlite3"),
+        "USER": os.environ.get("DATABASE_USER", ""),
+        "PASSWORD": os.environ.get("DATABASE_PASSWORD", ""),
+        "HOST": os.environ.get("DATABASE_HOST", ""),
+        "PORT": os.environ.get("DATABASE_PORT", ""),
+        "CONN_MAX_AGE": int(os.environ.get("DATABASE_CONN_MAX_AGE", 60)),
+        "CONN_HEALTH_CHECKS": True,
+    }
+}
+
+for index, replica in enumerate(
+    filter(None, os.environ.get("DATABASE_REPLICAS", "").split(",")), 1
+):
+    DATABASES[f"replica_{index}"] = {
+        **DATABASES["default"],
+        "NAME" if "sqlite" in DATABASES["default"]["ENGINE"] else "HOST": (
+            replica.strip()
+        ),
+        "TEST": {"MIRROR": "default"},
     }
+
+DATABASE_ROUTERS = ["py_social_media_api.routers.ReplicaRouter"]
+
+# Read replica routing
+# Safe requests to views using routers.ReplicaReadMixin read from a random
+# replica in REPLICAS. After a successful write a user's reads stay on the
+# primary for STICKY_SECONDS, which should exceed the usual replica lag.
+
+DATABASE_ROUTING = {
+    "REPLICAS": [alias for alias in DATABASES if alias != "default"],
+    "STICKY_SECONDS": 5,
+}
+
+# SQLite tuning applied to every new connection by db.configure_sqlite:
+# WAL lets readers run alongside the single writer, NORMAL sync is still
+# crash-safe in WAL mode and writers wait busy_timeout ms for the lock
+# instead of failing with "database is locked".
+
+SQLITE_PRAGMAS = {
+    "journal_mode": "WAL",
+    "synchronous": "NORMAL",
+    "busy_timeout": 5000,
+    "mmap_size": 256 * 1024 * 1024,
 }
 
 # Password validation
@@ -123,6 +172,35 @@ STATIC_URL = "static/"
 
 MEDIA_ROOT = BASE_DIR / "media"
 MEDIA_URL = "/media/"
+
+# Uploaded images are stored under the SHA-256 of their content (see
+# path_creator.ContentAddressedStorage) and deduplicated across uploads.
+
+STORAGES = {
+    "default": {
+        "BACKEND": "django.core.files.storage.FileSystemStorage",
+    },
+    "staticfiles": {
+        "BACKEND": "django.contrib.staticfiles.storage.StaticFilesStorage",
+    },
+    "images": {
+        "BACKEND": "path_creator.ContentAddressedStorage",
+    },
+}
+
+# Serving MEDIA_URL
+# "stream" sends files from Python with Range and conditional GET support;
+# "x-accel-redirect" (nginx) and "x-sendfile" (Apache, lighttpd) only set
+# headers so the front proxy sends the bytes. Content-addressed files never
+# change and are cached for IMMUTABLE_MAX_AGE, everything else for MAX_AGE.
+
+MEDIA_SERVE = {
+    "MODE": os.environ.get("MEDIA_SERVE_MODE", "stream"),
+    "ACCEL_REDIRECT_PREFIX": "/protected-media/",
+    "MAX_AGE": 60 * 60,
+    "IMMUTABLE_MAX_AGE": 60 * 60 * 24 * 365,
+}
+
 # Default primary key field type
 # https://docs.djangoproject.com/en/5.0/ref/settings/#default-auto-field
 
@@ -133,7 +211,7 @@ AUTH_USER_MODEL = "user.User"
 REST_FRAMEWORK = {
     "DEFAULT_SCHEMA_CLASS": "drf_spectacular.openapi.AutoSchema",
     "DEFAULT_AUTHENTICATION_CLASSES": (
-        "rest_framework_simplejwt.authentication.JWTAuthentication",
+        "user.authentication.CachedJWTAuthentication",
     ),
 }
 
@@ -141,8 +219,187 @@ SIMPLE_JWT = {
     "ACCESS_TOKEN_LIFETIME": timedelta(minutes=540),
     "REFRESH_TOKEN_LIFETIME": timedelta(days=3),
     "ROTATE_REFRESH_TOKENS": True,
+    "BLACKLIST_AFTER_ROTATION": True,
+    "TOKEN_REFRESH_SERIALIZER": "user.serializers.TokenRefreshSerializer",
+}
+
+# Caches
+# https://docs.djangoproject.com/en/5.0/topics/cache/
+# Invalidation of the post detail, user and token blacklist caches, replica
+# pinning and nickname autocomplete all go through the default cache. The
+# local-memory default only reaches the current process, so deployments
+# running several workers must point CACHE_BACKEND/CACHE_LOCATION at Redis
+# or Memcached.
+
+CACHES = {
+    "default": {
+        "BACKEND": os.environ.get(
+            "CACHE_BACKEND", "django.core.cache.backends.locmem.LocMemCache"
+        ),
+        "LOCATION": os.environ.get("CACHE_LOCATION", "social-media-api"),
+    }
+}
+
+PROCESS_LOCAL_CACHES = (
+    "django.core.cache.backends.locmem.LocMemCache",
+    "django.core.cache.backends.dummy.DummyCache",
+)
+SHARED_CACHE = CACHES["default"]["BACKEND"] not in PROCESS_LOCAL_CACHES
+
+# Refresh token blacklist filter
+# When ENABLED, blacklisted JTIs are mirrored in a per-process Bloom filter
+# sized for twice the current blacklist (at least MIN_CAPACITY) at
+# ERROR_RATE, so refreshes only query the blacklist for likely hits. It
+# picks up entries written by other processes through the shared cache, or
+# otherwise every SYNC_INTERVAL seconds, re-reading SYNC_OVERLAP seconds of
+# history to cover rows that were committed late. Without a shared cache
+# every refresh checks the blacklist table. Expired tokens are removed by
+# the compact_token_blacklist command.
+
+TOKEN_BLACKLIST_FILTER = {
+    "ENABLED": SHARED_CACHE,
+    "ERROR_RATE": 0.001,
+    "MIN_CAPACITY": 10000,
+    "SYNC_INTERVAL": 30,
+    "SYNC_OVERLAP": 60,
 }
 
+# Authenticated user cache
+# When ENABLED, user.authentication.CachedJWTAuthentication keeps up to
+# MAX_SIZE users per process instead of loading request.user on every
+# request. Saving or deleting a user invalidates it through the default
+# cache. With a shared cache that reaches every process and users are kept
+# for TIMEOUT seconds. Otherwise only the current process is told, so users
+# are kept for LOCAL_TIMEOUT seconds, the longest another process may serve
+# a stale one. SHARED also stores users in the shared cache so other
+# processes can skip the query too.
+
+JWT_USER_CACHE = {
+    "ENABLED": True,
+    "TIMEOUT": 30,
+    "LOCAL_TIMEOUT": 5,
+    "MAX_SIZE": 10000,
+    "SHARED": False,
+}
+
+# Nickname autocomplete
+# user.autocomplete.NicknameIndex answers users/autocomplete/?q= with up to
+# LIMIT matches from an in-process trie. With a shared cache, nickname
+# changes made by other processes trigger a rebuild, at most once every
+# SYNC_INTERVAL seconds. Without one, the trie is rebuilt every
+# SYNC_INTERVAL seconds.
+
+NICKNAME_AUTOCOMPLETE = {
+    "LIMIT": 10,
+    "SYNC_INTERVAL": 30,
+}
+
+# Per-request SQL query budgets
+# HEADERS adds X-DB-Queries/X-DB-Time-Ms to every response; views running
+# more queries than their budget are logged. VIEWS is keyed by
+# "METHOD url-name" or by the bare URL name for every method.
+
+QUERY_BUDGET = {
+    "HEADERS": DEBUG,
+    "DEFAULT": 20,
+    "VIEWS": {
+        "GET social-media:post-list": 5,
+        "GET social-media:post-detail": 8,
+        "GET social-media:comment-list": 5,
+        "GET social-media:comment-detail": 5,
+        "GET social-media:comment-thread": 3,
+        "GET social-media:likes-state": 3,
+        "GET social-media:hashtag-trending": 5,
+        "GET social-media:search-list": 5,
+        "GET user:user-list": 5,
+        "GET user:user-detail": 8,
+        "GET user:user-autocomplete": 1,
+    },
+}
+
+# Post detail response cache
+# Concurrent misses wait up to WAIT_TIMEOUT seconds for the single request
+# holding the recompute lock instead of querying the database themselves.
+
+POST_DETAIL_CACHE = {
+    "TIMEOUT": 300,
+    "LOCK_TIMEOUT": 10,
+    "WAIT_TIMEOUT": 2,
+    "POLL_INTERVAL": 0.05,
+}
+
+# Number of latest comments and first likes embedded in a post detail;
+# the full lists are paginated under posts/{id}/comments/ and /likes/.
+
+POST_DETAIL_PREVIEW = {
+    "COMMENTS": 3,
+    "LIKES": 5,
+}
+
+# Number of latest follows embedded in a user detail response; the full
+# lists are paginated under users/{id}/following/ and /followers/.
+
+USER_DETAIL_PREVIEW = {
+    "FOLLOWING": 5,
+    "FOLLOWERS": 5,
+}
+
+# Deepest allowed reply depth; top-level comments have depth 0. Paths take
+# 11 characters per level, so at most 22 fit Comment.path.
+
+COMMENT_REPLY_MAX_DEPTH = 8
+
+# Maximum number of posts in one likes/batch/ or likes/state/ request
+
+LIKE_BATCH_MAX_POSTS = 100
+
+# Maximum number of users in one users/follow/batch/ request
+
+FOLLOW_BATCH_MAX_USERS = 100
+
+# Uploaded image variants
+# Every uploaded post, comment and avatar image is resized into WIDTHS (and
+# its own size capped at MAX_WIDTH) in each of FORMATS by a pool of WORKERS
+# threads after the upload commits; list endpoints serve the smallest
+# variant at least LIST_WIDTH wide. Images above MAX_PIXELS are rejected.
+# EAGER builds variants in the committing thread instead (for tests).
+
+IMAGE_VARIANTS = {
+    "WIDTHS": [160, 480, 1080],
+    "MAX_WIDTH": 2048,
+    "FORMATS": ["webp", "jpeg"],
+    "QUALITY": 80,
+    "MAX_PIXELS": 40_000_000,
+    "WORKERS": 2,
+    "LIST_WIDTH": 480,
+    "EAGER": False,
+}
+
+# Trending hashtags
+# Usage is counted into hourly buckets at write time; buckets of whole days
+# older than HOURLY_RETENTION_HOURS are rolled up into daily buckets by the
+# compact_hashtag_usage command. Rankings are cached for CACHE_TIMEOUT
+# seconds and weight each bucket by a decay with HALF_LIFE_HOURS.
+
+TRENDING_HASHTAGS = {
+    "DEFAULT_WINDOW": "24h",
+    "MAX_WINDOW_HOURS": 24 * 30,
+    "HALF_LIFE_HOURS": 6,
+    "CACHE_TIMEOUT": 60,
+    "LIMIT": 10,
+    "MAX_LIMIT": 50,
+    "HOURLY_RETENTION_HOURS": 48,
+    "DAILY_RETENTION_DAYS": 90,
+}
+
+# Home timeline fan-out
+# Authors with at least this many followers are merged into feeds at read
+# time instead of being written into every follower's timeline.
+
+FEED_CELEBRITY_FOLLOWER_THRESHOLD = 10000
+FEED_FANOUT_BATCH_SIZE = 1000
+FEED_BACKFILL_SIZE = 50
+
 SPECTACULAR_SETTINGS = {
     "TITLE": "Social Media API",
     "DESCRIPTION": "A RESTful API for social media platform",
@@ -0,0 +1,22 @@
+from contextlib import contextmanager
+
+from py_social_media_api.middleware import QueryCounter
+
+
+class QueryBudgetTestMixin:
+    """TestCase mixin for pinning the number of queries an action may run."""
+
+    @contextmanager
+    def assertMaxQueries(self, budget):
+        counter = QueryCounter(record=True)
+        with counter.capture():
+            yield counter
+
+        if counter.count > budget:
+            self.fail(
+                f"{counter.count} queries executed, budget is {budget}:\n"
+                + "\n".join(
+                    f"{index}. {sql}"
+                    for index, sql in enumerate(counter.queries, start=1)
+                )
+            )
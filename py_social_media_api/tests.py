@@ -0,0 +1,294 @@
+import os
+import shutil
+import tempfile
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import DEFAULT_DB_ALIAS
+from django.db.utils import ConnectionHandler
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from py_social_media_api.db import shift_counter
+from py_social_media_api.routers import ReplicaRouter, replica_reads
+from social_media.models import Post
+
+MEDIA_ROOT = tempfile.mkdtemp()
+MEDIA_SERVE = {
+    "MODE": "stream",
+    "ACCEL_REDIRECT_PREFIX": "/protected-media/",
+    "MAX_AGE": 60,
+    "IMMUTABLE_MAX_AGE": 3600,
+}
+CAS_NAME = f"cas/ab/cd/{'ab' * 32}.png"
+
+
+def media_url(name: str):
+    return reverse("media", args=[name])
+
+
+@override_settings(MEDIA_ROOT=MEDIA_ROOT, MEDIA_SERVE=MEDIA_SERVE)
+class ServeMediaTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        for name, content in (
+            ("uploads/notes.txt", b"0123456789"),
+            (CAS_NAME, b"png bytes"),
+            ("cas/tmp/upload", b"partial"),
+        ):
+            path = os.path.join(MEDIA_ROOT, name)
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            with open(path, "wb") as file:
+                file.write(content)
+
+    @classmethod
+    def tearDownClass(cls):
+        shutil.rmtree(MEDIA_ROOT, ignore_errors=True)
+        super().tearDownClass()
+
+    def test_stream_whole_file(self):
+        res = self.client.get(media_url("uploads/notes.txt"))
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(b"".join(res.streaming_content), b"0123456789")
+        self.assertEqual(res["Content-Length"], "10")
+        self.assertEqual(res["Accept-Ranges"], "bytes")
+        self.assertEqual(res["Cache-Control"], "public, max-age=60")
+        self.assertIn("Last-Modified", res)
+
+    def test_content_addressed_file_is_immutable(self):
+        res = self.client.get(media_url(CAS_NAME))
+
+        self.assertEqual(res["ETag"], f'"{"ab" * 32}"')
+        self.assertEqual(
+            res["Cache-Control"], "public, max-age=3600, immutable"
+        )
+
+    def test_matching_etag_is_not_modified(self):
+        etag = self.client.get(media_url("uploads/notes.txt"))["ETag"]
+
+        res = self.client.get(
+            media_url("uploads/notes.txt"), HTTP_IF_NONE_MATCH=etag
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_304_NOT_MODIFIED)
+        self.assertEqual(res["ETag"], etag)
+
+    def test_byte_ranges(self):
+        url = media_url("uploads/notes.txt")
+
+        middle = self.client.get(url, HTTP_RANGE="bytes=2-5")
+        suffix = self.client.get(url, HTTP_RANGE="bytes=-3")
+        open_ended = self.client.get(url, HTTP_RANGE="bytes=8-")
+
+        self.assertEqual(middle.status_code, status.HTTP_206_PARTIAL_CONTENT)
+        self.assertEqual(middle["Content-Range"], "bytes 2-5/10")
+        self.assertEqual(b"".join(middle.streaming_content), b"2345")
+        self.assertEqual(b"".join(suffix.streaming_content), b"789")
+        self.assertEqual(b"".join(open_ended.streaming_content), b"89")
+
+    def test_unsatisfiable_range(self):
+        res = self.client.get(
+            media_url("uploads/notes.txt"), HTTP_RANGE="bytes=20-30"
+        )
+
+        self.assertEqual(
+            res.status_code, status.HTTP_416_REQUESTED_RANGE_NOT_SATISFIABLE
+        )
+        self.assertEqual(res["Content-Range"], "bytes */10")
+
+    def test_stale_if_range_sends_whole_file(self):
+        res = self.client.get(
+            media_url("uploads/notes.txt"),
+            HTTP_RANGE="bytes=2-5",
+            HTTP_IF_RANGE='"outdated"',
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(b"".join(res.streaming_content), b"0123456789")
+
+    def test_path_traversal_is_rejected(self):
+        outside = os.path.join(os.path.dirname(MEDIA_ROOT), "secret.txt")
+
+        for name in ("../secret.txt", "uploads/../../secret.txt", outside):
+            res = self.client.get(f"/media/{name}")
+            self.assertEqual(res.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_upload_in_progress_is_hidden(self):
+        for name in ("cas/tmp/upload", "cas/tmp", "cas/ab/../tmp/upload"):
+            res = self.client.get(media_url(name))
+            self.assertEqual(res.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_missing_file(self):
+        res = self.client.get(media_url("uploads/missing.txt"))
+
+        self.assertEqual(res.status_code, status.HTTP_404_NOT_FOUND)
+
+    @override_settings(MEDIA_SERVE={**MEDIA_SERVE, "MODE": "x-accel-redirect"})
+    def test_x_accel_redirect(self):
+        res = self.client.get(media_url(CAS_NAME))
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            res["X-Accel-Redirect"], f"/protected-media/{CAS_NAME}"
+        )
+        self.assertEqual(res.content, b"")
+        self.assertEqual(res["Content-Type"], "image/png")
+
+    @override_settings(MEDIA_SERVE={**MEDIA_SERVE, "MODE": "x-sendfile"})
+    def test_x_sendfile(self):
+        res = self.client.get(media_url("uploads/notes.txt"))
+
+        self.assertEqual(
+            res["X-Sendfile"], os.path.join(MEDIA_ROOT, "uploads/notes.txt")
+        )
+        self.assertEqual(res.content, b"")
+
+
+class ShiftCounterTest(TestCase):
+    def setUp(self):
+        author = get_user_model().objects.create_user(
+            "test@test.com", "test12345", nickname="tester"
+        )
+        self.post = Post.objects.create(
+            author=author, title="Post", content="Text", likes_count=1
+        )
+
+    def check_shifts(self):
+        self.assertEqual(
+            shift_counter(Post, self.post.id, "likes_count", 2), 3
+        )
+        self.assertEqual(
+            shift_counter(Post, self.post.id, "likes_count", -5), 0
+        )
+        self.assertIsNone(shift_counter(Post, 0, "likes_count", 1))
+        self.post.refresh_from_db()
+        self.assertEqual(self.post.likes_count, 0)
+
+    def test_update_returning(self):
+        with self.assertNumQueries(1):
+            shift_counter(Post, self.post.id, "likes_count", 1)
+        shift_counter(Post, self.post.id, "likes_count", -1)
+        self.check_shifts()
+
+    def test_update_then_select_fallback(self):
+        with mock.patch("py_social_media_api.db.UPDATE_RETURNING_VENDORS", ()):
+            with self.assertNumQueries(2):
+                shift_counter(Post, self.post.id, "likes_count", 1)
+            shift_counter(Post, self.post.id, "likes_count", -1)
+            self.check_shifts()
+
+
+class SQLitePragmasTest(SimpleTestCase):
+    def test_new_connections_are_tuned(self):
+        with tempfile.TemporaryDirectory() as directory:
+            handler = ConnectionHandler(
+                {
+                    DEFAULT_DB_ALIAS: {
+                        "ENGINE": "django.db.backends.sqlite3",
+                        "NAME": os.path.join(directory, "tuned.sqlite3"),
+                    }
+                }
+            )
+            connection = handler[DEFAULT_DB_ALIAS]
+            try:
+                with connection.cursor() as cursor:
+                    pragmas = {
+                        name: cursor.execute(f"PRAGMA {name}").fetchone()[0]
+                        for name in ("journal_mode", "synchronous")
+                    }
+                    pragmas["busy_timeout"] = cursor.execute(
+                        "PRAGMA busy_timeout"
+                    ).fetchone()[0]
+            finally:
+                connection.close()
+
+        self.assertEqual(
+            pragmas,
+            {"journal_mode": "wal", "synchronous": 1, "busy_timeout": 5000},
+        )
+
+
+@override_settings(
+    DATABASE_ROUTING={"REPLICAS": ["replica"], "STICKY_SECONDS": 5}
+)
+class ReplicaRoutingTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            "test@test.com", "test12345", nickname="tester"
+        )
+        self.other = get_user_model().objects.create_user(
+            "other@test.com", "test12345", nickname="other"
+        )
+        self.post = Post.objects.create(
+            author=self.other, title="Post", content="Text"
+        )
+        # The test database has no replica, so "reading from the replica"
+        # is recorded and then served by the primary.
+        patcher = mock.patch.object(
+            ReplicaRouter, "choose_replica", return_value=DEFAULT_DB_ALIAS
+        )
+        self.choose_replica = patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def get(self, url, user):
+        self.choose_replica.reset_mock()
+        self.client.force_authenticate(user)
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return self.choose_replica.called
+
+    def test_router_reads_from_replica_until_a_write(self):
+        router = ReplicaRouter()
+        self.assertEqual(router.db_for_read(Post), DEFAULT_DB_ALIAS)
+
+        token = replica_reads.set(True)
+        try:
+            router.db_for_read(Post)
+            self.assertTrue(self.choose_replica.called)
+            self.assertEqual(router.db_for_write(Post), DEFAULT_DB_ALIAS)
+            self.assertFalse(replica_reads.get())
+        finally:
+            replica_reads.reset(token)
+
+    def test_safe_requests_of_replica_views_read_from_replicas(self):
+        for url in (
+            reverse("social-media:post-list"),
+            reverse("social-media:comment-list"),
+            reverse("user:user-list"),
+        ):
+            self.assertTrue(self.get(url, self.user), url)
+
+        self.assertFalse(
+            self.get(reverse("social-media:feed-list"), self.user)
+        )
+        self.assertFalse(replica_reads.get())
+
+    def test_post_detail_is_computed_on_the_primary(self):
+        url = reverse("social-media:post-detail", args=[self.post.id])
+        self.assertFalse(self.get(url, self.user))
+
+    def test_writes_pin_the_user_to_the_primary(self):
+        self.client.force_authenticate(self.user)
+        self.client.post(
+            reverse("social-media:post-like", args=[self.post.id])
+        )
+        url = reverse("social-media:post-list")
+
+        self.assertFalse(self.get(url, self.user))
+        self.assertTrue(self.get(url, self.other))
+
+        cache.clear()
+        self.assertTrue(self.get(url, self.user))
+
+    @override_settings(DATABASE_ROUTING={"REPLICAS": [], "STICKY_SECONDS": 5})
+    def test_no_replicas(self):
+        self.assertFalse(
+            self.get(reverse("social-media:post-list"), self.user)
+        )
@@ -1,20 +1,31 @@
+import re
+
 from django.conf import settings
-from django.conf.urls.static import static
 from django.contrib import admin
-from django.urls import path, include
+from django.urls import path, include, re_path
 from drf_spectacular.views import (
     SpectacularSwaggerView,
     SpectacularRedocView,
     SpectacularAPIView,
 )
 
+from py_social_media_api.media import serve_media
+
 
 urlpatterns = [
     path("admin/", admin.site.urls),
     path("api/users/", include("user.urls", namespace="user")),
     path(
         "api/social_media/",
-        include("social_media.urls", namespace="social-media")
+        include("social_media.urls", namespace="social-media"),
+    ),
+    path(
+        "api/async/users/",
+        include("user.async_urls", namespace="user-async"),
+    ),
+    path(
+        "api/async/social_media/",
+        include("social_media.async_urls", namespace="social-media-async"),
     ),
     path("api/schema/", SpectacularAPIView.as_view(), name="schema"),
     path(
@@ -27,4 +38,9 @@ urlpatterns = [
         SpectacularRedocView.as_view(url_name="schema"),
         name="redoc",
     ),
-] + static(settings.MEDIA_URL, document_root=settings.MEDIA_ROOT)
+    re_path(
+        r"^%s(?P<path>.*)$" % re.escape(settings.MEDIA_URL.lstrip("/")),
+        serve_media,
+        name="media",
+    ),
+]
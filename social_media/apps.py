@@ -1,6 +1,19 @@
 from django.apps import AppConfig
+from django.db.backends.signals import connection_created
+from django.db.models.signals import post_migrate
 
 
 class SocialMediaConfig(AppConfig):
     default_auto_field = "django.db.models.BigAutoField"
     name = "social_media"
+
+    def ready(self):
+        import social_media.signals  # noqa: F401
+        from py_social_media_api.db import configure_sqlite
+        from py_social_media_api.images import register
+        from social_media.search import restore_search_triggers
+
+        connection_created.connect(configure_sqlite)
+        post_migrate.connect(restore_search_triggers, sender=self)
+        register(self.get_model("Post"), "image")
+        register(self.get_model("Comment"), "image")
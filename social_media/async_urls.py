@@ -0,0 +1,17 @@
+from django.urls import path
+
+from social_media.async_views import (
+    comment_list,
+    hashtag_list,
+    post_detail,
+    post_list,
+)
+
+app_name = "social_media_async"
+
+urlpatterns = [
+    path("posts/", post_list, name="post-list"),
+    path("posts/<int:pk>/", post_detail, name="post-detail"),
+    path("comments/", comment_list, name="comment-list"),
+    path("hashtags/", hashtag_list, name="hashtag-list"),
+]
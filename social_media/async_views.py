@@ -0,0 +1,83 @@
+from rest_framework.exceptions import NotFound
+
+from py_social_media_api.async_api import async_api_view, paginate_by_id
+from social_media.cache import aget_or_compute_post_detail
+from social_media.models import Comment, Hashtag, Post
+from social_media.serializers import (
+    CommentListSerializer,
+    HashtagSerializer,
+    PostDetailSerializer,
+    PostListSerializer,
+)
+from social_media.views import (
+    CommentPagination,
+    CommentViewSet,
+    PostPagination,
+    PostViewSet,
+)
+
+
+@async_api_view
+async def post_list(request):
+    """
+    Endpoint for listing posts, newest first, on the async read path
+    example: api/async/social_media/posts/?hashtags=1,2&match=all
+    """
+    queryset = PostViewSet.filter_by_params(
+        Post.objects.select_related("author").prefetch_related("hashtags"),
+        request.GET,
+    ).with_viewer_state(request.user)
+    data = await paginate_by_id(
+        request, queryset, PostListSerializer, PostPagination.page_size
+    )
+    return data, {}
+
+
+@async_api_view
+async def post_detail(request, pk):
+    """
+    Endpoint for a post with its comment and like previews
+    example: api/async/social_media/posts/pk/
+    """
+
+    async def compute():
+        post = await (
+            Post.objects.select_related("author")
+            .prefetch_related("hashtags")
+            .with_previews()
+            .filter(pk=pk)
+            .afirst()
+        )
+        if post is None:
+            raise NotFound("No Post matches the given query.")
+        return PostDetailSerializer(post, context={"request": request}).data
+
+    data, hit = await aget_or_compute_post_detail(pk, compute)
+    return data, {"X-Cache": "HIT" if hit else "MISS"}
+
+
+@async_api_view
+async def comment_list(request):
+    """
+    Endpoint for listing comments, newest first, on the async read path
+    example: api/async/social_media/comments/?post=1
+    """
+    data = await paginate_by_id(
+        request,
+        CommentViewSet.filter_by_params(
+            Comment.objects.select_related("author", "post"), request.GET
+        ),
+        CommentListSerializer,
+        CommentPagination.page_size,
+    )
+    return data, {}
+
+
+@async_api_view
+async def hashtag_list(request):
+    """
+    Endpoint for listing hashtags on the async read path
+    example: api/async/social_media/hashtags/
+    """
+    hashtags = [hashtag async for hashtag in Hashtag.objects.all()]
+    return HashtagSerializer(hashtags, many=True).data, {}
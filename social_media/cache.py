@@ -0,0 +1,141 @@
+import asyncio
+import time
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+
+HITS_KEY = "post-detail:hits"
+MISSES_KEY = "post-detail:misses"
+
+
+def _version_key(post_id):
+    return f"post-detail:{post_id}:version"
+
+
+def _data_key(post_id, version):
+    return f"post-detail:{post_id}:v{version}"
+
+
+def _fresh_version():
+    # A clock-based version can never collide with a stale entry left behind
+    # when the version key itself was evicted.
+    return time.time_ns()
+
+
+def get_version(post_id):
+    key = _version_key(post_id)
+    version = cache.get(key)
+    if version is None:
+        cache.add(key, _fresh_version(), timeout=None)
+        version = cache.get(key)
+    return version
+
+
+def bump_version(post_id):
+    try:
+        cache.incr(_version_key(post_id))
+    except ValueError:
+        cache.set(_version_key(post_id), _fresh_version(), timeout=None)
+
+
+def invalidate_post_detail(*post_ids):
+    """Drop cached detail responses once the current transaction commits."""
+    for post_id in post_ids:
+        transaction.on_commit(lambda post_id=post_id: bump_version(post_id))
+
+
+def _count(key):
+    try:
+        cache.incr(key)
+    except ValueError:
+        cache.add(key, 0, timeout=None)
+        cache.incr(key)
+
+
+def get_stats():
+    hits = cache.get(HITS_KEY, 0)
+    misses = cache.get(MISSES_KEY, 0)
+    total = hits + misses
+    return {
+        "hits": hits,
+        "misses": misses,
+        "hit_ratio": round(hits / total, 4) if total else None,
+    }
+
+
+def get_or_compute_post_detail(post_id, compute):
+    """
+    Return (data, hit) for a post detail response.
+    Only one caller recomputes a missing entry; concurrent misses wait for
+    it to be stored instead of hitting the database themselves.
+    """
+    config = settings.POST_DETAIL_CACHE
+    key = _data_key(post_id, get_version(post_id))
+
+    data = cache.get(key)
+    if data is not None:
+        _count(HITS_KEY)
+        return data, True
+
+    lock_key = f"{key}:lock"
+    locked = cache.add(lock_key, 1, timeout=config["LOCK_TIMEOUT"])
+    if not locked:
+        deadline = time.monotonic() + config["WAIT_TIMEOUT"]
+        while time.monotonic() < deadline:
+            time.sleep(config["POLL_INTERVAL"])
+            data = cache.get(key)
+            if data is not None:
+                _count(HITS_KEY)
+                return data, True
+
+    try:
+        data = compute()
+        cache.set(key, data, timeout=config["TIMEOUT"])
+    finally:
+        if locked:
+            cache.delete(lock_key)
+
+    _count(MISSES_KEY)
+    return data, False
+
+
+async def _acount(key):
+    try:
+        await cache.aincr(key)
+    except ValueError:
+        await cache.aadd(key, 0, timeout=None)
+        await cache.aincr(key)
+
+
+async def aget_or_compute_post_detail(post_id, compute):
+    """Async get_or_compute_post_detail for an awaitable compute()."""
+    config = settings.POST_DETAIL_CACHE
+    key = _data_key(post_id, await sync_to_async(get_version)(post_id))
+
+    data = await cache.aget(key)
+    if data is not None:
+        await _acount(HITS_KEY)
+        return data, True
+
+    lock_key = f"{key}:lock"
+    locked = await cache.aadd(lock_key, 1, timeout=config["LOCK_TIMEOUT"])
+    if not locked:
+        deadline = time.monotonic() + config["WAIT_TIMEOUT"]
+        while time.monotonic() < deadline:
+            await asyncio.sleep(config["POLL_INTERVAL"])
+            data = await cache.aget(key)
+            if data is not None:
+                await _acount(HITS_KEY)
+                return data, True
+
+    try:
+        data = await compute()
+        await cache.aset(key, data, timeout=config["TIMEOUT"])
+    finally:
+        if locked:
+            await cache.adelete(lock_key)
+
+    await _acount(MISSES_KEY)
+    return data, False
@@ -0,0 +1,94 @@
+from django.db.models import Count, F, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+from py_social_media_api.db import shifted
+from social_media.models import Post, Like, Comment
+
+
+def increment_post_counter(post_id, field, delta=1):
+    """
+    Atomically shift a denormalized counter on a single post.
+    Must be called inside the transaction that changed the counted rows.
+    Decrements are clamped at zero so a drifted counter cannot break writes.
+    """
+    Post.objects.filter(pk=post_id).update(**{field: shifted(field, delta)})
+
+
+def _count_subquery(model):
+    return Coalesce(
+        Subquery(
+            model.objects.filter(post=OuterRef("pk"))
+            .order_by()
+            .values("post")
+            .annotate(total=Count("pk"))
+            .values("total")
+        ),
+        0,
+    )
+
+
+def recount_post_likes(post_ids):
+    """Recompute likes_count of the given posts in a single UPDATE."""
+    Post.objects.filter(id__in=post_ids).update(
+        likes_count=_count_subquery(Like)
+    )
+
+
+def recount_post_counters(post_ids):
+    """Recompute likes_count/comments_count of the given posts."""
+    Post.objects.filter(id__in=post_ids).update(
+        likes_count=_count_subquery(Like),
+        comments_count=_count_subquery(Comment),
+    )
+
+
+def post_ids_touched_by(user):
+    """Ids of the posts a user has liked or commented on."""
+    return set(
+        Like.objects.filter(created_by=user).values_list("post_id", flat=True)
+    ) | set(
+        Comment.objects.filter(author=user).values_list("post_id", flat=True)
+    )
+
+
+def posts_with_actual_counts(queryset=None):
+    """Annotate posts with counters computed from the Like/Comment tables."""
+    if queryset is None:
+        queryset = Post.objects.all()
+    return queryset.annotate(
+        actual_likes_count=_count_subquery(Like),
+        actual_comments_count=_count_subquery(Comment),
+    )
+
+
+def repair_post_counters(queryset=None, batch_size=1000):
+    """
+    Recompute likes_count/comments_count and write back only drifted rows.
+    Returns the number of repaired posts.
+    """
+    drifted = (
+        posts_with_actual_counts(queryset)
+        .exclude(
+            likes_count=F("actual_likes_count"),
+            comments_count=F("actual_comments_count"),
+        )
+        .only("id", "likes_count", "comments_count")
+        .order_by()
+    )
+    repaired = 0
+    batch = []
+
+    for post in drifted.iterator(chunk_size=batch_size):
+        post.likes_count = post.actual_likes_count
+        post.comments_count = post.actual_comments_count
+        batch.append(post)
+        if len(batch) >= batch_size:
+            Post.objects.bulk_update(batch, ["likes_count", "comments_count"])
+            repaired += len(batch)
+            batch = []
+
+    if batch:
+        Post.objects.bulk_update(batch, ["likes_count", "comments_count"])
+        repaired += len(batch)
+
+    return repaired
@@ -0,0 +1,191 @@
+import base64
+import binascii
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.db.models import F, Window, prefetch_related_objects
+from django.db.models.functions import RowNumber
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import replace_query_param
+
+from social_media.models import Post, TimelineEntry, viewer_state_annotations
+from user.models import Follow
+
+
+def is_celebrity(user_id):
+    """Authors above the threshold are merged into feeds at read time."""
+    return get_user_model().objects.filter(
+        pk=user_id,
+        followers_count__gte=settings.FEED_CELEBRITY_FOLLOWER_THRESHOLD,
+    ).exists()
+
+
+def celebrity_followee_ids(user):
+    return list(
+        Follow.objects.filter(
+            follower=user,
+            following__followers_count__gte=(
+                settings.FEED_CELEBRITY_FOLLOWER_THRESHOLD
+            ),
+        ).values_list("following_id", flat=True)
+    )
+
+
+def _write_entries(entries):
+    TimelineEntry.objects.bulk_create(
+        entries,
+        batch_size=settings.FEED_FANOUT_BATCH_SIZE,
+        ignore_conflicts=True,
+    )
+
+
+def fan_out_post(post):
+    """Write a new post into the timeline of every follower of its author."""
+    if post.author_id is None or is_celebrity(post.author_id):
+        return
+
+    batch_size = settings.FEED_FANOUT_BATCH_SIZE
+    follower_ids = (
+        Follow.objects.filter(following_id=post.author_id)
+        .values_list("follower_id", flat=True)
+        .iterator(chunk_size=batch_size)
+    )
+    batch = []
+
+    for follower_id in follower_ids:
+        batch.append(TimelineEntry(user_id=follower_id, post_id=post.id))
+        if len(batch) >= batch_size:
+            _write_entries(batch)
+            batch = []
+
+    if batch:
+        _write_entries(batch)
+
+
+def backfill_timeline(user_id, followed_id):
+    """Copy the latest posts of a newly followed author into a timeline."""
+    backfill_timelines(user_id, [followed_id])
+
+
+def backfill_timelines(user_id, followed_ids):
+    """
+    Copy the latest posts of every newly followed non-celebrity author into
+    a timeline with one ranked query, whatever the number of authors.
+    """
+    author_ids = list(
+        get_user_model()
+        .objects.filter(
+            id__in=followed_ids,
+            followers_count__lt=settings.FEED_CELEBRITY_FOLLOWER_THRESHOLD,
+        )
+        .values_list("id", flat=True)
+    )
+    if not author_ids:
+        return
+
+    post_ids = (
+        Post.objects.filter(author_id__in=author_ids)
+        .annotate(
+            rank=Window(
+                RowNumber(),
+                partition_by=F("author_id"),
+                order_by=F("id").desc(),
+            )
+        )
+        .filter(rank__lte=settings.FEED_BACKFILL_SIZE)
+        .order_by()
+        .values_list("id", flat=True)
+    )
+    _write_entries(
+        [
+            TimelineEntry(user_id=user_id, post_id=post_id)
+            for post_id in post_ids
+        ]
+    )
+
+
+def prune_timeline(user_id, unfollowed_id):
+    TimelineEntry.objects.filter(
+        user_id=user_id,
+        post__author_id=unfollowed_id,
+    ).delete()
+
+
+class FeedPagination(BasePagination):
+    """
+    Keyset pagination over post ids that merges the materialized timeline
+    with posts of followed celebrity accounts.
+    """
+
+    page_size = 10
+    cursor_query_param = "cursor"
+
+    def decode_cursor(self, request):
+        encoded = request.query_params.get(self.cursor_query_param)
+        if not encoded:
+            return None
+        try:
+            return int(base64.urlsafe_b64decode(encoded.encode()).decode())
+        except (TypeError, ValueError, UnicodeDecodeError, binascii.Error):
+            raise NotFound("Invalid cursor")
+
+    @staticmethod
+    def encode_cursor(position):
+        return base64.urlsafe_b64encode(str(position).encode()).decode()
+
+    def paginate_feed(self, request, user):
+        self.request = request
+        position = self.decode_cursor(request)
+        limit = self.page_size + 1
+
+        entries = (
+            TimelineEntry.objects.filter(user=user)
+            .select_related("post__author")
+            .annotate(**viewer_state_annotations(user, "post"))
+        )
+        if position is not None:
+            entries = entries.filter(post_id__lt=position)
+        posts = []
+        for entry in entries.order_by("-post_id")[:limit]:
+            entry.post.liked_by_me = entry.liked_by_me
+            entry.post.author_followed_by_me = entry.author_followed_by_me
+            posts.append(entry.post)
+
+        celebrity_ids = celebrity_followee_ids(user)
+        if celebrity_ids:
+            merged = Post.objects.filter(author_id__in=celebrity_ids)
+            if position is not None:
+                merged = merged.filter(id__lt=position)
+            merged = (
+                merged.select_related("author")
+                .with_viewer_state(user)
+                .order_by("-id")[:limit]
+            )
+            posts = list(
+                {post.id: post for post in [*posts, *merged]}.values()
+            )
+            posts.sort(key=lambda post: post.id, reverse=True)
+
+        self.has_next = len(posts) > self.page_size
+        self.page = posts[: self.page_size]
+        prefetch_related_objects(self.page, "hashtags")
+        return self.page
+
+    def get_next_link(self):
+        if not self.has_next:
+            return None
+        return replace_query_param(
+            self.request.build_absolute_uri(),
+            self.cursor_query_param,
+            self.encode_cursor(self.page[-1].id),
+        )
+
+    def get_paginated_response(self, data):
+        return Response(
+            {
+                "next": self.get_next_link(),
+                "results": data,
+            }
+        )
@@ -0,0 +1,99 @@
+from django.db import transaction
+from rest_framework.exceptions import NotFound
+
+from py_social_media_api.db import insert_ignore, shift_counter
+from social_media.cache import invalidate_post_detail
+from social_media.counters import recount_post_likes
+from social_media.models import Like, Post
+
+
+def _likes_count(post_id, changed, delta):
+    if changed:
+        likes_count = shift_counter(Post, post_id, "likes_count", delta)
+    else:
+        likes_count = (
+            Post.objects.filter(id=post_id)
+            .values_list("likes_count", flat=True)
+            .first()
+        )
+    if likes_count is None:
+        raise NotFound("No Post matches the given query.")
+    if changed:
+        invalidate_post_detail(post_id)
+    return likes_count
+
+
+def like_post(post_id, user_id):
+    """
+    Idempotently like a post with one conflict-ignoring insert plus one
+    counter update, and return the resulting like state.
+    """
+    with transaction.atomic():
+        inserted = insert_ignore(Like, post_id=post_id, created_by_id=user_id)
+        likes_count = _likes_count(post_id, inserted, 1)
+    return {"liked": True, "likes_count": likes_count}
+
+
+def unlike_post(post_id, user_id):
+    """Idempotently remove a like with one delete plus one counter update."""
+    with transaction.atomic():
+        deleted, _ = Like.objects.filter(
+            post_id=post_id, created_by_id=user_id
+        ).delete()
+        likes_count = _likes_count(post_id, deleted, -deleted)
+    return {"liked": False, "likes_count": likes_count}
+
+
+def batch_update_likes(user_id, like_ids, unlike_ids):
+    """
+    Like and unlike many posts at once with one bulk insert, one delete and
+    one recount of the affected posts. Ids of missing posts are ignored.
+    Returns the resulting state of every existing affected post.
+    """
+    with transaction.atomic():
+        post_ids = set(
+            Post.objects.filter(
+                id__in=set(like_ids) | set(unlike_ids)
+            ).values_list("id", flat=True)
+        )
+        like_ids = post_ids.intersection(like_ids)
+        unlike_ids = post_ids.intersection(unlike_ids)
+
+        Like.objects.bulk_create(
+            [
+                Like(post_id=post_id, created_by_id=user_id)
+                for post_id in like_ids
+            ],
+            ignore_conflicts=True,
+        )
+        if unlike_ids:
+            Like.objects.filter(
+                created_by_id=user_id, post_id__in=unlike_ids
+            ).delete()
+
+        if post_ids:
+            recount_post_likes(post_ids)
+            invalidate_post_detail(*post_ids)
+        likes_counts = dict(
+            Post.objects.filter(id__in=post_ids).values_list(
+                "id", "likes_count"
+            )
+        )
+
+    return [
+        {
+            "post": post_id,
+            "liked": post_id in like_ids,
+            "likes_count": likes_counts[post_id],
+        }
+        for post_id in sorted(post_ids)
+    ]
+
+
+def liked_post_ids(user_id, post_ids):
+    """Return which of post_ids the user has liked, in one index lookup."""
+    return set(
+        Like.objects.filter(
+            created_by_id=user_id, post_id__in=post_ids
+        ).values_list("post_id", flat=True)
+    )
@@ -0,0 +1,31 @@
+from django.core.management.base import BaseCommand
+
+from py_social_media_api.images import (
+    process_image,
+    registered,
+    variants_field,
+)
+
+
+class Command(BaseCommand):
+    help = (
+        "Build missing size variants of every stored post, comment and "
+        "avatar image in the current process"
+    )
+
+    def handle(self, *args, **options):
+        built = 0
+        for model, field_name in registered:
+            rows = (
+                model._default_manager.exclude(**{field_name: ""})
+                .exclude(**{f"{field_name}__isnull": True})
+                .values_list("pk", field_name, variants_field(field_name))
+                .order_by("pk")
+            )
+            for pk, name, recorded in rows.iterator():
+                if (recorded or {}).get("source") != name:
+                    process_image(model, pk, field_name)
+                    built += 1
+        self.stdout.write(
+            self.style.SUCCESS(f"Built variants of {built} image(s)")
+        )
@@ -0,0 +1,26 @@
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+
+from path_creator import image_storage
+from py_social_media_api.images import collect_image_blobs
+
+
+class Command(BaseCommand):
+    help = "Delete content-addressed image blobs that nothing references"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--grace-minutes",
+            type=int,
+            default=60,
+            help="Keep blobs written more recently than this",
+        )
+
+    def handle(self, *args, **options):
+        deleted = collect_image_blobs(
+            image_storage(), timedelta(minutes=options["grace_minutes"])
+        )
+        self.stdout.write(
+            self.style.SUCCESS(f"Deleted {deleted} unreferenced blob(s)")
+        )
@@ -0,0 +1,19 @@
+from django.core.management.base import BaseCommand
+
+from social_media.trending import compact_hashtag_usage
+
+
+class Command(BaseCommand):
+    help = (
+        "Roll old hourly hashtag usage buckets up into daily buckets and "
+        "delete daily buckets past their retention"
+    )
+
+    def handle(self, *args, **options):
+        rolled_up, deleted = compact_hashtag_usage()
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Rolled up {rolled_up} hourly bucket(s), "
+                f"deleted {deleted} daily bucket(s)"
+            )
+        )
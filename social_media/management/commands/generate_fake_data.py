@@ -0,0 +1,318 @@
+import itertools
+import random
+import uuid
+from bisect import bisect_left
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+from django.core.management import call_command
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.db.models import Count
+from django.utils import timezone
+
+from py_social_media_api.db import upsert_increment
+from social_media.models import (
+    Comment,
+    Hashtag,
+    HashtagUsage,
+    Like,
+    Post,
+    PostHashtag,
+    TimelineEntry,
+)
+from social_media.threads import place_root_comments
+from social_media.trending import repair_hashtag_counters
+from user.autocomplete import bump_generation
+from user.counters import recount_follow_counters
+from user.models import Follow, fold_nickname
+
+
+def chunked(iterable, size):
+    iterator = iter(iterable)
+    while chunk := list(itertools.islice(iterator, size)):
+        yield chunk
+
+
+class PowerLawSampler:
+    """Draw ids so the i-th one is picked with weight 1 / (i + 1) ** alpha."""
+
+    def __init__(self, ids, alpha, rng):
+        self.ids = list(ids)
+        self.rng = rng
+        self.cum_weights = list(
+            itertools.accumulate(
+                1 / (rank + 1) ** alpha for rank in range(len(self.ids))
+            )
+        )
+
+    def sample(self):
+        point = self.rng.random() * self.cum_weights[-1]
+        return self.ids[bisect_left(self.cum_weights, point)]
+
+
+class Command(BaseCommand):
+    help = (
+        "Bulk-insert fake users, follows, posts, hashtags, comments and likes "
+        "for load testing"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--users", type=int, default=1000)
+        parser.add_argument(
+            "--follows-per-user",
+            type=int,
+            default=20,
+            help="Average number of accounts each user follows",
+        )
+        parser.add_argument("--hashtags", type=int, default=200)
+        parser.add_argument("--posts", type=int, default=10000)
+        parser.add_argument(
+            "--hashtags-per-post",
+            type=int,
+            default=3,
+            help="Maximum number of hashtags attached to a post",
+        )
+        parser.add_argument("--comments", type=int, default=20000)
+        parser.add_argument("--likes", type=int, default=50000)
+        parser.add_argument(
+            "--alpha",
+            type=float,
+            default=1.1,
+            help="Power-law exponent for follower and engagement skew",
+        )
+        parser.add_argument("--chunk-size", type=int, default=5000)
+        parser.add_argument("--seed", type=int, default=None)
+        parser.add_argument(
+            "--skip-timelines",
+            action="store_true",
+            help="Do not materialize home timelines for generated posts",
+        )
+
+    def handle(self, *args, **options):
+        self.rng = random.Random(options["seed"])
+        self.chunk_size = options["chunk_size"]
+        self.alpha = options["alpha"]
+        self.prefix = uuid.uuid4().hex[:8]
+
+        user_ids = self.create_users(options["users"])
+        if len(user_ids) < 2:
+            self.stderr.write("At least two users are required")
+            return
+
+        self.create_follows(user_ids, options["follows_per_user"])
+        hashtag_ids = self.create_hashtags(options["hashtags"])
+        post_ids = self.create_posts(
+            user_ids,
+            hashtag_ids,
+            options["posts"],
+            options["hashtags_per_post"],
+        )
+        if post_ids:
+            self.create_comments(user_ids, post_ids, options["comments"])
+            self.create_likes(user_ids, post_ids, options["likes"])
+            call_command("repair_post_counters", stdout=self.stdout)
+            if not options["skip_timelines"]:
+                self.create_timelines(post_ids[0])
+
+        self.stdout.write(self.style.SUCCESS("Fake data generated"))
+
+    def log(self, message):
+        self.stdout.write(message)
+
+    def bulk_insert(self, model, objects, ignore_conflicts=False):
+        """
+        Insert objects in chunks and return the number of created rows.
+        bulk_create does not report the rows skipped by ignore_conflicts, so
+        the table is then counted before and after.
+        """
+        before = model.objects.count() if ignore_conflicts else 0
+        created = 0
+        for chunk in chunked(objects, self.chunk_size):
+            with transaction.atomic():
+                model.objects.bulk_create(
+                    chunk, ignore_conflicts=ignore_conflicts
+                )
+            created += len(chunk)
+        if ignore_conflicts:
+            return model.objects.count() - before
+        return created
+
+    def create_users(self, count):
+        password = make_password("password12345")
+        users = (
+            get_user_model()(
+                email=f"{self.prefix}.{index}@example.com",
+                nickname=f"{self.prefix}_{index}",
+                nickname_folded=fold_nickname(f"{self.prefix}_{index}"),
+                password=password,
+            )
+            for index in range(count)
+        )
+        self.bulk_insert(get_user_model(), users)
+        # bulk_create sends no signals, so have every process reindex.
+        bump_generation()
+        user_ids = list(
+            get_user_model()
+            .objects.filter(nickname__startswith=f"{self.prefix}_")
+            .order_by("id")
+            .values_list("id", flat=True)
+        )
+        self.log(f"Created {len(user_ids)} users")
+        return user_ids
+
+    def create_follows(self, user_ids, follows_per_user):
+        celebrities = PowerLawSampler(user_ids, self.alpha, self.rng)
+
+        def edges():
+            for follower_id in user_ids:
+                followees = set()
+                wanted = min(
+                    len(user_ids) - 1,
+                    int(self.rng.expovariate(1 / follows_per_user)),
+                )
+                for _ in range(wanted * 2):
+                    if len(followees) >= wanted:
+                        break
+                    followee_id = celebrities.sample()
+                    if followee_id != follower_id:
+                        followees.add(followee_id)
+                for followee_id in followees:
+                    yield Follow(
+                        follower_id=follower_id, following_id=followee_id
+                    )
+
+        created = self.bulk_insert(Follow, edges(), ignore_conflicts=True)
+        for chunk in chunked(user_ids, 500):
+            recount_follow_counters(
+                get_user_model().objects.filter(id__in=chunk)
+            )
+        self.log(f"Created {created} follows")
+
+    def create_hashtags(self, count):
+        hashtags = (
+            Hashtag(name=f"{self.prefix}_tag{index}") for index in range(count)
+        )
+        self.bulk_insert(Hashtag, hashtags)
+        hashtag_ids = list(
+            Hashtag.objects.filter(name__startswith=f"{self.prefix}_")
+            .order_by("id")
+            .values_list("id", flat=True)
+        )
+        self.log(f"Created {len(hashtag_ids)} hashtags")
+        return hashtag_ids
+
+    def create_posts(self, user_ids, hashtag_ids, count, hashtags_per_post):
+        authors = PowerLawSampler(user_ids, self.alpha, self.rng)
+        posts = (
+            Post(
+                author_id=authors.sample(),
+                title=f"Post {index}",
+                content=f"Generated post {index} of {self.prefix}",
+            )
+            for index in range(count)
+        )
+        last_post = Post.objects.order_by("-id").only("id").first()
+        first_id = last_post.id + 1 if last_post else 1
+        self.bulk_insert(Post, posts)
+        post_ids = list(
+            Post.objects.filter(id__gte=first_id)
+            .order_by("id")
+            .values_list("id", flat=True)
+        )
+        self.log(f"Created {len(post_ids)} posts")
+
+        if hashtag_ids and hashtags_per_post:
+            tags = PowerLawSampler(hashtag_ids, self.alpha, self.rng)
+            through = Post.hashtags.through
+
+            def links():
+                for post_id in post_ids:
+                    picked = {
+                        tags.sample()
+                        for _ in range(self.rng.randint(0, hashtags_per_post))
+                    }
+                    for hashtag_id in picked:
+                        yield through(post_id=post_id, hashtag_id=hashtag_id)
+
+            created = self.bulk_insert(through, links(), ignore_conflicts=True)
+            self.log(f"Attached {created} hashtags to posts")
+            self.count_hashtag_usage(post_ids)
+
+        return post_ids
+
+    @staticmethod
+    def count_hashtag_usage(post_ids):
+        # Bulk-inserted links bypass the signals that maintain the counters.
+        repair_hashtag_counters()
+        usage = (
+            PostHashtag.objects.filter(post_id__gte=post_ids[0])
+            .values("hashtag_id")
+            .annotate(total=Count("id"))
+            .order_by()
+        )
+        bucket = timezone.now().replace(minute=0, second=0, microsecond=0)
+        upsert_increment(
+            HashtagUsage,
+            [
+                {
+                    "hashtag": row["hashtag_id"],
+                    "granularity": HashtagUsage.HOUR,
+                    "bucket": bucket,
+                    "count": row["total"],
+                }
+                for row in usage
+            ],
+            unique_fields=["hashtag", "granularity", "bucket"],
+            field_name="count",
+        )
+
+    def create_comments(self, user_ids, post_ids, count):
+        hot_posts = PowerLawSampler(reversed(post_ids), self.alpha, self.rng)
+        comments = (
+            Comment(
+                post_id=hot_posts.sample(),
+                author_id=self.rng.choice(user_ids),
+                content=f"Generated comment {index}",
+            )
+            for index in range(count)
+        )
+        created = self.bulk_insert(Comment, comments)
+        place_root_comments(Comment.objects.filter(path=""))
+        self.log(f"Created {created} comments")
+
+    def create_likes(self, user_ids, post_ids, count):
+        hot_posts = PowerLawSampler(reversed(post_ids), self.alpha, self.rng)
+
+        def likes():
+            seen = set()
+            for _ in range(count):
+                pair = (hot_posts.sample(), self.rng.choice(user_ids))
+                if pair not in seen:
+                    seen.add(pair)
+                    yield Like(post_id=pair[0], created_by_id=pair[1])
+
+        created = self.bulk_insert(Like, likes(), ignore_conflicts=True)
+        self.log(f"Created {created} likes")
+
+    def create_timelines(self, first_post_id):
+        """Fan out generated posts in one set-based INSERT ... SELECT."""
+        quote = connection.ops.quote_name
+        timeline = quote(TimelineEntry._meta.db_table)
+        post = quote(Post._meta.db_table)
+        follow = quote(Follow._meta.db_table)
+        user = quote(get_user_model()._meta.db_table)
+
+        with transaction.atomic(), connection.cursor() as cursor:
+            cursor.execute(
+                f"INSERT INTO {timeline} (user_id, post_id) "
+                f"SELECT f.follower_id, p.id FROM {post} p "
+                f"INNER JOIN {follow} f ON f.following_id = p.author_id "
+                f"INNER JOIN {user} u ON u.id = p.author_id "
+                f"WHERE p.id >= %s AND u.followers_count < %s "
+                f"ON CONFLICT DO NOTHING",
+                [first_post_id, settings.FEED_CELEBRITY_FOLLOWER_THRESHOLD],
+            )
+            created = cursor.rowcount
+        self.log(f"Created {created} timeline entries")
@@ -0,0 +1,21 @@
+from django.core.management.base import BaseCommand
+
+from social_media.search import rebuild_search_index
+
+
+class Command(BaseCommand):
+    help = "Rebuild the full-text search index of posts and comments"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=5000,
+            help="Number of rows indexed per statement",
+        )
+
+    def handle(self, *args, **options):
+        indexed = rebuild_search_index(batch_size=options["batch_size"])
+        self.stdout.write(
+            self.style.SUCCESS(f"Indexed {indexed} post(s) and comment(s)")
+        )
@@ -0,0 +1,21 @@
+from django.core.management.base import BaseCommand
+
+from social_media.counters import repair_post_counters
+
+
+class Command(BaseCommand):
+    help = "Recompute likes_count/comments_count and repair drifted posts"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=1000,
+            help="Number of posts written per bulk update",
+        )
+
+    def handle(self, *args, **options):
+        repaired = repair_post_counters(batch_size=options["batch_size"])
+        self.stdout.write(
+            self.style.SUCCESS(f"Repaired counters on {repaired} post(s)")
+        )
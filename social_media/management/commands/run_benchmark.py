@@ -0,0 +1,470 @@
+import asyncio
+import json
+import math
+import platform
+import threading
+import time
+from datetime import datetime, timezone
+from urllib.parse import urlsplit
+from wsgiref.util import setup_testing_defaults
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, connections
+from django.db.models import Count
+from django.urls import reverse
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.tokens import AccessToken
+
+from py_social_media_api.middleware import QueryCounter
+from social_media.models import Comment, Post, Hashtag, Like
+from user.models import Follow
+
+
+def percentile(sorted_values, percent):
+    """Nearest-rank percentile of an already sorted list."""
+    if not sorted_values:
+        return 0.0
+    rank = math.ceil(percent / 100 * len(sorted_values))
+    return sorted_values[max(rank, 1) - 1]
+
+
+def summarize(latencies, requests, elapsed, errors):
+    latencies.sort()
+    return {
+        "p50_ms": round(percentile(latencies, 50), 3),
+        "p95_ms": round(percentile(latencies, 95), 3),
+        "p99_ms": round(percentile(latencies, 99), 3),
+        "mean_ms": round(sum(latencies) / max(len(latencies), 1), 3),
+        "throughput_rps": round(requests / elapsed, 2) if elapsed else 0,
+        "errors": errors,
+    }
+
+
+def split_counts(total, parts):
+    """Split total requests over parts workers as evenly as possible."""
+    return [total // parts + (index < total % parts) for index in range(parts)]
+
+
+class WSGIDriver:
+    """Send GET requests straight to the project's WSGI application."""
+
+    def __init__(self, host, headers):
+        from py_social_media_api.wsgi import application
+
+        self.application = application
+        self.host = host
+        self.headers = headers
+
+    def get(self, url):
+        parts = urlsplit(url)
+        environ = {
+            "PATH_INFO": parts.path,
+            "QUERY_STRING": parts.query,
+            "HTTP_HOST": self.host,
+            **{
+                "HTTP_" + name.upper().replace("-", "_"): value
+                for name, value in self.headers.items()
+            },
+        }
+        setup_testing_defaults(environ)
+        status = []
+
+        def start_response(status_line, headers, exc_info=None):
+            status.append(int(status_line.split()[0]))
+
+        body = self.application(environ, start_response)
+        try:
+            for _ in body:
+                pass
+        finally:
+            if hasattr(body, "close"):
+                body.close()
+        return status[0]
+
+    def run(self, url, requests, concurrency):
+        latencies = []
+        errors = []
+        lock = threading.Lock()
+
+        def worker(count):
+            try:
+                for _ in range(count):
+                    started = time.perf_counter()
+                    status = self.get(url)
+                    latency = (time.perf_counter() - started) * 1000
+                    with lock:
+                        latencies.append(latency)
+                        errors.append(status >= 400)
+            finally:
+                connections.close_all()
+
+        threads = [
+            threading.Thread(target=worker, args=(count,))
+            for count in split_counts(requests, concurrency)
+        ]
+        started = time.perf_counter()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        elapsed = time.perf_counter() - started
+        return summarize(latencies, requests, elapsed, sum(errors))
+
+
+class ASGIDriver:
+    """Send GET requests straight to the project's ASGI application."""
+
+    def __init__(self, host, headers):
+        from py_social_media_api.asgi import application
+
+        self.application = application
+        self.host = host
+        self.headers = headers
+
+    async def get(self, url):
+        parts = urlsplit(url)
+        scope = {
+            "type": "http",
+            "asgi": {"version": "3.0"},
+            "http_version": "1.1",
+            "method": "GET",
+            "scheme": "http",
+            "path": parts.path,
+            "raw_path": parts.path.encode(),
+            "query_string": parts.query.encode(),
+            "root_path": "",
+            "headers": [
+                (b"host", self.host.encode()),
+                *(
+                    (name.lower().encode(), value.encode())
+                    for name, value in self.headers.items()
+                ),
+            ],
+            "client": ("127.0.0.1", 0),
+            "server": (self.host, 80),
+        }
+        request_sent = False
+        status = []
+
+        async def receive():
+            nonlocal request_sent
+            if not request_sent:
+                request_sent = True
+                return {"type": "http.request", "body": b""}
+            # The client never disconnects; Django cancels this wait once
+            # the response is sent.
+            await asyncio.Future()
+
+        async def send(message):
+            if message["type"] == "http.response.start":
+                status.append(message["status"])
+
+        await self.application(scope, receive, send)
+        return status[0]
+
+    async def run_async(self, url, requests, concurrency):
+        latencies = []
+        errors = 0
+
+        async def worker(count):
+            nonlocal errors
+            for _ in range(count):
+                started = time.perf_counter()
+                status = await self.get(url)
+                latencies.append((time.perf_counter() - started) * 1000)
+                errors += status >= 400
+
+        started = time.perf_counter()
+        await asyncio.gather(
+            *(worker(count) for count in split_counts(requests, concurrency))
+        )
+        elapsed = time.perf_counter() - started
+        return summarize(latencies, requests, elapsed, errors)
+
+    def run(self, url, requests, concurrency):
+        return asyncio.run(self.run_async(url, requests, concurrency))
+
+
+class Command(BaseCommand):
+    help = (
+        "Benchmark the main API endpoints in-process with the DRF APIClient "
+        "and write latency, query and throughput numbers to a JSON file"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--requests",
+            type=int,
+            default=200,
+            help="Measured requests per endpoint",
+        )
+        parser.add_argument(
+            "--warmup",
+            type=int,
+            default=10,
+            help="Unmeasured requests per endpoint before measuring",
+        )
+        parser.add_argument(
+            "--user",
+            help="Email of the user to authenticate as "
+            "(default: the user following the most accounts)",
+        )
+        parser.add_argument(
+            "--output",
+            default="bench_output.json",
+            help="Path of the JSON report",
+        )
+        parser.add_argument(
+            "--compare",
+            help="Previous JSON report to print relative changes against",
+        )
+        parser.add_argument(
+            "--async",
+            action="store_true",
+            dest="compare_servers",
+            help="Compare the WSGI and ASGI entry points on the read "
+            "endpoints under concurrent load instead",
+        )
+        parser.add_argument(
+            "--concurrency",
+            type=int,
+            default=32,
+            help="Concurrent clients per entry point with --async",
+        )
+
+    def handle(self, *args, **options):
+        user = self.get_user(options["user"])
+        post = Post.objects.order_by("-likes_count").first()
+        other = (
+            get_user_model()
+            .objects.exclude(id=user.id)
+            .order_by("-id")
+            .first()
+        )
+        if post is None or other is None:
+            raise CommandError(
+                "Not enough data to benchmark, run generate_fake_data first"
+            )
+
+        if options["compare_servers"]:
+            results = self.compare_servers(
+                user,
+                post,
+                other,
+                options["requests"],
+                options["warmup"],
+                options["concurrency"],
+            )
+        else:
+            results = self.run_scenarios(
+                user, post, other, options["requests"], options["warmup"]
+            )
+
+        report = {
+            "created_at": datetime.now(timezone.utc).isoformat(),
+            "python": platform.python_version(),
+            "database": connection.vendor,
+            "dataset": {
+                "users": get_user_model().objects.count(),
+                "follows": Follow.objects.count(),
+                "posts": Post.objects.count(),
+                "hashtags": Hashtag.objects.count(),
+                "comments": Comment.objects.count(),
+                "likes": Like.objects.count(),
+            },
+            "requests_per_endpoint": options["requests"],
+            "concurrency": (
+                options["concurrency"] if options["compare_servers"] else 1
+            ),
+            "endpoints": results,
+        }
+        with open(options["output"], "w") as report_file:
+            json.dump(report, report_file, indent=2)
+        self.stdout.write(
+            self.style.SUCCESS(f"Report written to {options['output']}")
+        )
+
+        if options["compare"]:
+            self.compare(options["compare"], results)
+
+    @staticmethod
+    def get_user(email):
+        users = get_user_model().objects.all()
+        if email:
+            user = users.filter(email=email).first()
+        else:
+            user = (
+                users.annotate(following_total=Count("following"))
+                .order_by("-following_total")
+                .first()
+            )
+        if user is None:
+            raise CommandError("No user to authenticate as")
+        return user
+
+    def run_scenarios(self, user, post, other, requests, warmup):
+        self.client = APIClient(SERVER_NAME="localhost")
+        self.client.force_authenticate(user)
+        results = {}
+
+        for name, method, url_factory in self.get_scenarios(user, post, other):
+            results[name] = self.measure(method, url_factory, requests, warmup)
+            self.print_result(name, results[name])
+        return results
+
+    def compare_servers(
+        self, user, post, other, requests, warmup, concurrency
+    ):
+        """
+        Run every read endpoint through the WSGI application with one thread
+        per client and its async counterpart through the ASGI application
+        with one task per client. Both authenticate with the same JWT.
+        """
+        headers = {"Authorization": f"Bearer {AccessToken.for_user(user)}"}
+        drivers = {
+            "wsgi": WSGIDriver("localhost", headers),
+            "asgi": ASGIDriver("localhost", headers),
+        }
+        results = {}
+
+        for name, urls in self.get_read_scenarios(post, other):
+            for server, driver in drivers.items():
+                driver.run(urls[server], warmup, concurrency)
+                key = f"{name}_{server}"
+                results[key] = driver.run(urls[server], requests, concurrency)
+                self.print_result(key, results[key])
+        return results
+
+    @staticmethod
+    def get_read_scenarios(post, other):
+        """Return (name, {"wsgi": url, "asgi": url}) per read endpoint."""
+        return [
+            (
+                name,
+                {
+                    "wsgi": reverse(f"{namespace}:{route}", args=args),
+                    "asgi": reverse(f"{namespace}-async:{route}", args=args),
+                },
+            )
+            for name, namespace, route, args in (
+                ("post_list", "social-media", "post-list", []),
+                ("post_detail", "social-media", "post-detail", [post.id]),
+                ("comment_list", "social-media", "comment-list", []),
+                ("hashtag_list", "social-media", "hashtag-list", []),
+                ("user_detail", "user", "user-detail", [other.id]),
+            )
+        ]
+
+    @staticmethod
+    def get_scenarios(user, post, other):
+        """Return (name, method, url factory) for each benchmarked endpoint."""
+
+        def toggle(first, second, start_with_second=False):
+            state = {"calls": int(start_with_second)}
+
+            def url_factory():
+                state["calls"] += 1
+                return first if state["calls"] % 2 else second
+
+            return url_factory
+
+        def fixed(url):
+            return lambda: url
+
+        return [
+            ("post_list", "get", fixed(reverse("social-media:post-list"))),
+            (
+                "post_detail",
+                "get",
+                fixed(reverse("social-media:post-detail", args=[post.id])),
+            ),
+            (
+                "post_like",
+                "post",
+                toggle(
+                    reverse("social-media:post-like", args=[post.id]),
+                    reverse("social-media:post-unlike", args=[post.id]),
+                    Like.objects.filter(post=post, created_by=user).exists(),
+                ),
+            ),
+            (
+                "comment_list",
+                "get",
+                fixed(reverse("social-media:comment-list")),
+            ),
+            ("user_list", "get", fixed(reverse("user:user-list"))),
+            (
+                "user_detail",
+                "get",
+                fixed(reverse("user:user-detail", args=[other.id])),
+            ),
+            (
+                "follow",
+                "post",
+                toggle(
+                    reverse("user:user-follow", args=[other.id]),
+                    reverse("user:user-unfollow", args=[other.id]),
+                    Follow.objects.filter(
+                        follower=user, following=other
+                    ).exists(),
+                ),
+            ),
+        ]
+
+    def measure(self, method, url_factory, requests, warmup):
+        send = getattr(self.client, method)
+        for _ in range(warmup):
+            send(url_factory())
+
+        latencies = []
+        queries = 0
+        errors = 0
+        started = time.perf_counter()
+
+        for _ in range(requests):
+            counter = QueryCounter()
+            with counter.capture():
+                request_started = time.perf_counter()
+                response = send(url_factory())
+                latency = time.perf_counter() - request_started
+            latencies.append(latency * 1000)
+            queries += counter.count
+            errors += response.status_code >= 400
+
+        elapsed = time.perf_counter() - started
+        return {
+            **summarize(latencies, requests, elapsed, errors),
+            "queries_per_request": round(queries / max(requests, 1), 2),
+        }
+
+    def print_result(self, name, result):
+        queries = result.get("queries_per_request", "-")
+        self.stdout.write(
+            f"{name:<18} p50={result['p50_ms']:>8.2f}ms "
+            f"p95={result['p95_ms']:>8.2f}ms p99={result['p99_ms']:>8.2f}ms "
+            f"queries={queries:>6} "
+            f"rps={result['throughput_rps']:>8} errors={result['errors']}"
+        )
+
+    def compare(self, path, results):
+        with open(path) as baseline_file:
+            baseline = json.load(baseline_file)["endpoints"]
+
+        self.stdout.write(f"Compared with {path}:")
+        for name, result in results.items():
+            if name not in baseline:
+                continue
+            changes = []
+            for metric in (
+                "p50_ms",
+                "p99_ms",
+                "queries_per_request",
+                "throughput_rps",
+            ):
+                before = baseline[name].get(metric)
+                if before and metric in result:
+                    changes.append(
+                        f"{metric}={(result[metric] - before) / before:+.1%}"
+                    )
+            self.stdout.write(f"{name:<18} " + " ".join(changes))
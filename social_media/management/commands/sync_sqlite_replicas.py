@@ -0,0 +1,30 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+
+
+class Command(BaseCommand):
+    help = (
+        "Copy the primary SQLite database into every configured replica "
+        "file, to try replica routing locally"
+    )
+
+    def handle(self, *args, **options):
+        replicas = settings.DATABASE_ROUTING["REPLICAS"]
+        primary = connections["default"]
+        if primary.vendor != "sqlite":
+            raise CommandError("Only SQLite replicas can be synced")
+        if not replicas:
+            raise CommandError("No replicas configured, see DATABASE_REPLICAS")
+
+        primary.ensure_connection()
+        for alias in replicas:
+            replica = connections[alias]
+            replica.ensure_connection()
+            primary.connection.backup(replica.connection)
+            self.stdout.write(
+                self.style.SUCCESS(
+                    f"Copied {primary.settings_dict['NAME']} to "
+                    f"{replica.settings_dict['NAME']}"
+                )
+            )
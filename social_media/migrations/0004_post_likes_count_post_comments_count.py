@@ -0,0 +1,48 @@
+# Generated by Django 5.0.1 on 2026-10-18 02:37
+
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+
+def populate_counters(apps, schema_editor):
+    Post = apps.get_model("social_media", "Post")
+    Like = apps.get_model("social_media", "Like")
+    Comment = apps.get_model("social_media", "Comment")
+
+    def count_subquery(model):
+        return Coalesce(
+            Subquery(
+                model.objects.filter(post=OuterRef("pk"))
+                .order_by()
+                .values("post")
+                .annotate(total=Count("pk"))
+                .values("total")
+            ),
+            0,
+        )
+
+    Post.objects.update(
+        likes_count=count_subquery(Like),
+        comments_count=count_subquery(Comment),
+    )
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("social_media", "0003_alter_post_hashtags"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="post",
+            name="comments_count",
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name="post",
+            name="likes_count",
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.RunPython(populate_counters, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,44 @@
+# Generated by Django 5.0.1 on 2026-10-18 02:40
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("social_media", "0005_timelineentry"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AlterModelOptions(
+            name="comment",
+            options={"ordering": ["-created_at", "-id"]},
+        ),
+        migrations.AlterModelOptions(
+            name="post",
+            options={"ordering": ["-created_at", "-id"]},
+        ),
+        migrations.AlterField(
+            model_name="comment",
+            name="created_at",
+            field=models.DateTimeField(auto_now_add=True),
+        ),
+        migrations.AlterField(
+            model_name="post",
+            name="created_at",
+            field=models.DateTimeField(auto_now_add=True),
+        ),
+        migrations.AddIndex(
+            model_name="comment",
+            index=models.Index(
+                fields=["created_at", "id"], name="comment_created_at_id_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="post",
+            index=models.Index(
+                fields=["created_at", "id"], name="post_created_at_id_idx"
+            ),
+        ),
+    ]
@@ -0,0 +1,25 @@
+# Generated by Django 5.0.1 on 2026-10-18 02:58
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("social_media", "0006_created_at_datetime"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="comment",
+            index=models.Index(
+                fields=["post", "created_at", "id"],
+                name="comment_post_created_at_idx",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="like",
+            index=models.Index(fields=["post", "id"], name="like_post_id_idx"),
+        ),
+    ]
@@ -0,0 +1,63 @@
+# Generated by Django 5.0.1 on 2026-10-18 03:01
+
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Count, Min, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+
+def remove_duplicate_likes(apps, schema_editor):
+    Like = apps.get_model("social_media", "Like")
+    Post = apps.get_model("social_media", "Post")
+
+    duplicates = (
+        Like.objects.values("post", "created_by")
+        .annotate(first_id=Min("id"), total=Count("id"))
+        .filter(total__gt=1)
+    )
+    affected_posts = set()
+    for duplicate in duplicates.iterator():
+        Like.objects.filter(
+            post_id=duplicate["post"],
+            created_by_id=duplicate["created_by"],
+        ).exclude(id=duplicate["first_id"]).delete()
+        affected_posts.add(duplicate["post"])
+
+    if affected_posts:
+        Post.objects.filter(id__in=affected_posts).update(
+            likes_count=Coalesce(
+                Subquery(
+                    Like.objects.filter(post=OuterRef("pk"))
+                    .order_by()
+                    .values("post")
+                    .annotate(total=Count("pk"))
+                    .values("total")
+                ),
+                0,
+            )
+        )
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("social_media", "0007_post_detail_previews"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.RunPython(
+            remove_duplicate_likes, migrations.RunPython.noop
+        ),
+        migrations.AddIndex(
+            model_name="like",
+            index=models.Index(
+                fields=["created_by", "post"], name="like_created_by_post_idx"
+            ),
+        ),
+        migrations.AddConstraint(
+            model_name="like",
+            constraint=models.UniqueConstraint(
+                fields=("post", "created_by"), name="unique_like"
+            ),
+        ),
+    ]
@@ -0,0 +1,65 @@
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("social_media", "0008_unique_like"),
+    ]
+
+    operations = [
+        # Adopt the auto-created M2M table as an explicit model without
+        # touching the data; only the migration state changes here.
+        migrations.SeparateDatabaseAndState(
+            state_operations=[
+                migrations.CreateModel(
+                    name="PostHashtag",
+                    fields=[
+                        (
+                            "id",
+                            models.BigAutoField(
+                                auto_created=True,
+                                primary_key=True,
+                                serialize=False,
+                                verbose_name="ID",
+                            ),
+                        ),
+                        (
+                            "hashtag",
+                            models.ForeignKey(
+                                on_delete=django.db.models.deletion.CASCADE,
+                                to="social_media.hashtag",
+                            ),
+                        ),
+                        (
+                            "post",
+                            models.ForeignKey(
+                                on_delete=django.db.models.deletion.CASCADE,
+                                to="social_media.post",
+                            ),
+                        ),
+                    ],
+                    options={
+                        "db_table": "social_media_post_hashtags",
+                        "unique_together": {("post", "hashtag")},
+                    },
+                ),
+                migrations.AlterField(
+                    model_name="post",
+                    name="hashtags",
+                    field=models.ManyToManyField(
+                        blank=True,
+                        related_name="posts",
+                        through="social_media.PostHashtag",
+                        to="social_media.hashtag",
+                    ),
+                ),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name="posthashtag",
+            index=models.Index(
+                fields=["hashtag", "-post"], name="post_hashtag_recent_idx"
+            ),
+        ),
+    ]
@@ -0,0 +1,86 @@
+# Generated by Django 5.0.1 on 2026-10-18 03:10
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+
+def fill_posts_count(apps, schema_editor):
+    Hashtag = apps.get_model("social_media", "Hashtag")
+    PostHashtag = apps.get_model("social_media", "PostHashtag")
+
+    Hashtag.objects.update(
+        posts_count=Coalesce(
+            Subquery(
+                PostHashtag.objects.filter(hashtag=OuterRef("pk"))
+                .order_by()
+                .values("hashtag")
+                .annotate(total=Count("pk"))
+                .values("total")
+            ),
+            0,
+        )
+    )
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("social_media", "0009_posthashtag"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="hashtag",
+            name="posts_count",
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.RunPython(fill_posts_count, migrations.RunPython.noop),
+        migrations.CreateModel(
+            name="HashtagUsage",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "granularity",
+                    models.CharField(
+                        choices=[("hour", "Hour"), ("day", "Day")],
+                        default="hour",
+                        max_length=4,
+                    ),
+                ),
+                ("bucket", models.DateTimeField()),
+                ("count", models.PositiveIntegerField(default=0)),
+                (
+                    "hashtag",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="usage",
+                        to="social_media.hashtag",
+                    ),
+                ),
+            ],
+            options={
+                "indexes": [
+                    models.Index(
+                        fields=["granularity", "bucket"],
+                        name="hashtag_usage_bucket_idx",
+                    )
+                ],
+            },
+        ),
+        migrations.AddConstraint(
+            model_name="hashtagusage",
+            constraint=models.UniqueConstraint(
+                fields=("hashtag", "granularity", "bucket"),
+                name="unique_hashtag_usage_bucket",
+            ),
+        ),
+    ]
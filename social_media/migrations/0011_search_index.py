@@ -0,0 +1,129 @@
+from django.db import migrations
+
+# Copied from social_media.search so this migration keeps doing what it did
+# when it was written.
+SQLITE_TABLE = "social_media_search"
+SQLITE_SCHEMA = [
+    f"""
+    CREATE VIRTUAL TABLE IF NOT EXISTS {SQLITE_TABLE} USING fts5(
+        title, content, post_id UNINDEXED, author_id UNINDEXED,
+        tokenize = 'unicode61 remove_diacritics 2'
+    )
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS social_media_post_search_insert
+    AFTER INSERT ON social_media_post BEGIN
+        INSERT INTO {SQLITE_TABLE} (rowid, title, content, post_id, author_id)
+        VALUES (new.id * 2, new.title, new.content, new.id, new.author_id);
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS social_media_post_search_update
+    AFTER UPDATE OF title, content, author_id ON social_media_post BEGIN
+        UPDATE {SQLITE_TABLE}
+        SET title = new.title, content = new.content,
+            author_id = new.author_id
+        WHERE rowid = new.id * 2;
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS social_media_post_search_delete
+    AFTER DELETE ON social_media_post BEGIN
+        DELETE FROM {SQLITE_TABLE} WHERE rowid = old.id * 2;
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS social_media_comment_search_insert
+    AFTER INSERT ON social_media_comment BEGIN
+        INSERT INTO {SQLITE_TABLE} (rowid, title, content, post_id, author_id)
+        VALUES (new.id * 2 + 1, '', new.content, new.post_id, new.author_id);
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS social_media_comment_search_update
+    AFTER UPDATE OF content, post_id, author_id ON social_media_comment BEGIN
+        UPDATE {SQLITE_TABLE}
+        SET content = new.content, post_id = new.post_id,
+            author_id = new.author_id
+        WHERE rowid = new.id * 2 + 1;
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS social_media_comment_search_delete
+    AFTER DELETE ON social_media_comment BEGIN
+        DELETE FROM {SQLITE_TABLE} WHERE rowid = old.id * 2 + 1;
+    END
+    """,
+]
+SQLITE_DROP = [
+    "DROP TRIGGER IF EXISTS social_media_post_search_insert",
+    "DROP TRIGGER IF EXISTS social_media_post_search_update",
+    "DROP TRIGGER IF EXISTS social_media_post_search_delete",
+    "DROP TRIGGER IF EXISTS social_media_comment_search_insert",
+    "DROP TRIGGER IF EXISTS social_media_comment_search_update",
+    "DROP TRIGGER IF EXISTS social_media_comment_search_delete",
+    f"DROP TABLE IF EXISTS {SQLITE_TABLE}",
+]
+
+POSTGRES_SCHEMA = [
+    """
+    ALTER TABLE social_media_post ADD COLUMN IF NOT EXISTS search_vector
+    tsvector GENERATED ALWAYS AS (
+        setweight(to_tsvector('english', coalesce(title, '')), 'A')
+        || setweight(to_tsvector('english', coalesce(content, '')), 'B')
+    ) STORED
+    """,
+    """
+    CREATE INDEX IF NOT EXISTS post_search_vector_idx
+    ON social_media_post USING GIN (search_vector)
+    """,
+    """
+    ALTER TABLE social_media_comment ADD COLUMN IF NOT EXISTS search_vector
+    tsvector GENERATED ALWAYS AS (
+        setweight(to_tsvector('english', coalesce(content, '')), 'B')
+    ) STORED
+    """,
+    """
+    CREATE INDEX IF NOT EXISTS comment_search_vector_idx
+    ON social_media_comment USING GIN (search_vector)
+    """,
+]
+POSTGRES_DROP = [
+    "DROP INDEX IF EXISTS post_search_vector_idx",
+    "ALTER TABLE social_media_post DROP COLUMN IF EXISTS search_vector",
+    "DROP INDEX IF EXISTS comment_search_vector_idx",
+    "ALTER TABLE social_media_comment DROP COLUMN IF EXISTS search_vector",
+]
+
+STATEMENTS = {
+    "sqlite": (SQLITE_SCHEMA, SQLITE_DROP),
+    "postgresql": (POSTGRES_SCHEMA, POSTGRES_DROP),
+}
+
+
+def install(apps, schema_editor):
+    schema, _ = STATEMENTS.get(schema_editor.connection.vendor, ((), ()))
+    for statement in schema:
+        schema_editor.execute(statement, params=None)
+
+
+def uninstall(apps, schema_editor):
+    _, drop = STATEMENTS.get(schema_editor.connection.vendor, ((), ()))
+    for statement in drop:
+        schema_editor.execute(statement, params=None)
+
+
+class Migration(migrations.Migration):
+    """
+    Full-text index over posts and comments: an FTS5 table kept in sync by
+    triggers on SQLite, generated tsvector columns with GIN indexes on
+    PostgreSQL. Other backends are left untouched.
+    """
+
+    dependencies = [
+        ("social_media", "0010_hashtag_usage"),
+    ]
+
+    operations = [
+        migrations.RunPython(install, uninstall),
+    ]
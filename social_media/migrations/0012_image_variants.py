@@ -0,0 +1,22 @@
+# Generated by Django 5.0.1 on 2026-10-18 03:18
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("social_media", "0011_search_index"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="comment",
+            name="image_variants",
+            field=models.JSONField(blank=True, default=dict),
+        ),
+        migrations.AddField(
+            model_name="post",
+            name="image_variants",
+            field=models.JSONField(blank=True, default=dict),
+        ),
+    ]
@@ -0,0 +1,49 @@
+# Generated by Django 5.0.1 on 2026-10-18 03:21
+
+import path_creator
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("social_media", "0012_image_variants"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="ImageBlob",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("name", models.CharField(max_length=255, unique=True)),
+                ("refcount", models.PositiveIntegerField(default=0)),
+            ],
+        ),
+        migrations.AlterField(
+            model_name="comment",
+            name="image",
+            field=models.ImageField(
+                blank=True,
+                null=True,
+                storage=path_creator.image_storage,
+                upload_to=path_creator.image_file_path,
+            ),
+        ),
+        migrations.AlterField(
+            model_name="post",
+            name="image",
+            field=models.ImageField(
+                blank=True,
+                null=True,
+                storage=path_creator.image_storage,
+                upload_to=path_creator.image_file_path,
+            ),
+        ),
+    ]
@@ -0,0 +1,54 @@
+# Generated by Django 5.0.1 on 2026-10-18 04:11
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import CharField, Value
+from django.db.models.functions import Cast, LPad
+
+
+def populate_paths(apps, schema_editor):
+    # Every existing comment becomes the root of its own thread.
+    Comment = apps.get_model("social_media", "Comment")
+    Comment.objects.update(path=LPad(Cast("id", CharField()), 10, Value("0")))
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("social_media", "0014_post_author_indexes"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="comment",
+            name="depth",
+            field=models.PositiveSmallIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name="comment",
+            name="parent",
+            field=models.ForeignKey(
+                blank=True,
+                null=True,
+                on_delete=django.db.models.deletion.CASCADE,
+                related_name="replies",
+                to="social_media.comment",
+            ),
+        ),
+        migrations.AddField(
+            model_name="comment",
+            name="path",
+            field=models.CharField(blank=True, editable=False, max_length=255),
+        ),
+        migrations.AddField(
+            model_name="comment",
+            name="replies_count",
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddIndex(
+            model_name="comment",
+            index=models.Index(fields=["path"], name="comment_path_idx"),
+        ),
+        migrations.RunPython(populate_paths, migrations.RunPython.noop),
+    ]
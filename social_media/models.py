@@ -1,24 +1,159 @@
+from django.conf import settings
 from django.contrib.auth import get_user_model
 from django.db import models
 
-from path_creator import image_file_path
+from path_creator import image_file_path, image_storage
+from user.models import Follow
 
 
 class Hashtag(models.Model):
     name = models.CharField(max_length=64, unique=True)
+    posts_count = models.PositiveIntegerField(default=0)
 
     def __str__(self):
         return "#" + self.name
 
 
+class ImageBlob(models.Model):
+    """
+    Reference count of a content-addressed image file shared by every post,
+    comment and avatar uploaded with the same content.
+    """
+
+    name = models.CharField(max_length=255, unique=True)
+    refcount = models.PositiveIntegerField(default=0)
+
+    def __str__(self):
+        return f"{self.name} ({self.refcount})"
+
+
+class HashtagUsage(models.Model):
+    """
+    Number of times a hashtag was attached to posts within one time bucket.
+    Hourly buckets are rolled up into daily ones by compact_hashtag_usage.
+    """
+
+    HOUR = "hour"
+    DAY = "day"
+    GRANULARITY_CHOICES = (
+        (HOUR, "Hour"),
+        (DAY, "Day"),
+    )
+
+    hashtag = models.ForeignKey(
+        Hashtag,
+        related_name="usage",
+        on_delete=models.CASCADE,
+    )
+    granularity = models.CharField(
+        max_length=4,
+        choices=GRANULARITY_CHOICES,
+        default=HOUR,
+    )
+    bucket = models.DateTimeField()
+    count = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=["hashtag", "granularity", "bucket"],
+                name="unique_hashtag_usage_bucket",
+            ),
+        ]
+        indexes = [
+            models.Index(
+                fields=["granularity", "bucket"],
+                name="hashtag_usage_bucket_idx",
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.hashtag} {self.granularity} {self.bucket}"
+
+
+def viewer_state_annotations(user, post_path="pk"):
+    """
+    Exists() subqueries telling whether the user liked a post and follows
+    its author. post_path is the lookup of the post from the outer query.
+    """
+    author_path = "author" if post_path == "pk" else f"{post_path}__author"
+    return {
+        "liked_by_me": models.Exists(
+            Like.objects.filter(
+                post=models.OuterRef(post_path), created_by=user
+            )
+        ),
+        "author_followed_by_me": models.Exists(
+            Follow.objects.filter(
+                following=models.OuterRef(author_path), follower=user
+            )
+        ),
+    }
+
+
+class PostQuerySet(models.QuerySet):
+    def tagged(self, hashtags, lookup="hashtag", match_all=False):
+        """
+        Filter posts tagged with any (or, with match_all, every) of the given
+        hashtags through Exists() on the tag index, so no join or DISTINCT
+        is needed. lookup selects how hashtags are given: by id or by
+        "hashtag__name".
+        """
+        links = PostHashtag.objects.filter(post=models.OuterRef("pk"))
+        if not match_all:
+            return self.filter(
+                models.Exists(links.filter(**{f"{lookup}__in": hashtags}))
+            )
+
+        queryset = self
+        for hashtag in set(hashtags):
+            queryset = queryset.filter(
+                models.Exists(links.filter(**{lookup: hashtag}))
+            )
+        return queryset
+
+    def with_viewer_state(self, user):
+        """
+        Annotate liked_by_me and author_followed_by_me for the given user.
+        Anonymous users get no subqueries; serializers default both to False.
+        """
+        if not user.is_authenticated:
+            return self
+        return self.annotate(**viewer_state_annotations(user))
+
+    def with_previews(self):
+        """
+        Prefetch the latest comments and the first likes shown on a post
+        detail, bounded per post by POST_DETAIL_PREVIEW.
+        """
+        preview = settings.POST_DETAIL_PREVIEW
+        return self.prefetch_related(
+            models.Prefetch(
+                "comments",
+                queryset=Comment.objects.select_related("author").order_by(
+                    "-created_at", "-id"
+                )[: preview["COMMENTS"]],
+                to_attr="preview_comments",
+            ),
+            models.Prefetch(
+                "likes",
+                queryset=Like.objects.select_related("created_by").order_by(
+                    "id"
+                )[: preview["LIKES"]],
+                to_attr="preview_likes",
+            ),
+        )
+
+
 class Post(models.Model):
     author = models.ForeignKey(
         get_user_model(),
         null=True,
         related_name="posts",
         on_delete=models.CASCADE,
+        db_index=False,
     )
-    created_at = models.DateField(
+    created_at = models.DateTimeField(
         auto_now_add=True,
     )
     title = models.CharField(
@@ -29,16 +164,60 @@ class Post(models.Model):
         null=True,
         blank=True,
         upload_to=image_file_path,
+        storage=image_storage,
+    )
+    image_variants = models.JSONField(default=dict, blank=True)
+    hashtags = models.ManyToManyField(
+        Hashtag,
+        related_name="posts",
+        blank=True,
+        through="PostHashtag",
     )
-    hashtags = models.ManyToManyField(Hashtag, related_name="posts", blank=True)
+    likes_count = models.PositiveIntegerField(default=0)
+    comments_count = models.PositiveIntegerField(default=0)
+
+    objects = PostQuerySet.as_manager()
 
     class Meta:
-        ordering = ["-created_at"]
+        ordering = ["-created_at", "-id"]
+        indexes = [
+            models.Index(
+                fields=["created_at", "id"],
+                name="post_created_at_id_idx",
+            ),
+            # Posts of an author in list order, and by id for the feed.
+            models.Index(
+                fields=["author", "created_at", "id"],
+                name="post_author_created_at_idx",
+            ),
+            models.Index(
+                fields=["author", "id"],
+                name="post_author_id_idx",
+            ),
+        ]
 
     def __str__(self):
         return self.title
 
 
+class PostHashtag(models.Model):
+    post = models.ForeignKey(Post, on_delete=models.CASCADE)
+    hashtag = models.ForeignKey(Hashtag, on_delete=models.CASCADE)
+
+    class Meta:
+        db_table = "social_media_post_hashtags"
+        unique_together = ("post", "hashtag")
+        indexes = [
+            models.Index(
+                fields=["hashtag", "-post"],
+                name="post_hashtag_recent_idx",
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.post} {self.hashtag}"
+
+
 class Comment(models.Model):
     post = models.ForeignKey(
         Post,
@@ -50,7 +229,7 @@ class Comment(models.Model):
         null=True,
         on_delete=models.CASCADE,
     )
-    created_at = models.DateField(
+    created_at = models.DateTimeField(
         auto_now_add=True,
     )
     content = models.TextField()
@@ -58,10 +237,39 @@ class Comment(models.Model):
         null=True,
         blank=True,
         upload_to=image_file_path,
+        storage=image_storage,
     )
+    image_variants = models.JSONField(default=dict, blank=True)
+    parent = models.ForeignKey(
+        "self",
+        null=True,
+        blank=True,
+        on_delete=models.CASCADE,
+        related_name="replies",
+    )
+    # Materialized path: the zero-padded ids of the thread root down to this
+    # comment, so a thread is one range of paths in reading order.
+    path = models.CharField(max_length=255, blank=True, editable=False)
+    depth = models.PositiveSmallIntegerField(default=0, editable=False)
+    # Replies in the whole thread, kept on the root comment only.
+    replies_count = models.PositiveIntegerField(default=0)
 
     class Meta:
-        ordering = ["-created_at"]
+        ordering = ["-created_at", "-id"]
+        indexes = [
+            models.Index(
+                fields=["created_at", "id"],
+                name="comment_created_at_id_idx",
+            ),
+            models.Index(
+                fields=["path"],
+                name="comment_path_idx",
+            ),
+            models.Index(
+                fields=["post", "created_at", "id"],
+                name="comment_post_created_at_idx",
+            ),
+        ]
 
     def __str__(self):
         return f"{self.author.nickname} commented {self.post}"
@@ -78,5 +286,47 @@ class Like(models.Model):
         related_name="likes",
     )
 
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=["post", "created_by"],
+                name="unique_like",
+            ),
+        ]
+        indexes = [
+            models.Index(
+                fields=["post", "id"],
+                name="like_post_id_idx",
+            ),
+            models.Index(
+                fields=["created_by", "post"],
+                name="like_created_by_post_idx",
+            ),
+        ]
+
     def __str__(self):
         return f"{self.created_by.nickname} liked {self.post}"
+
+
+class TimelineEntry(models.Model):
+    user = models.ForeignKey(
+        get_user_model(),
+        on_delete=models.CASCADE,
+        related_name="timeline_entries",
+    )
+    post = models.ForeignKey(
+        Post,
+        on_delete=models.CASCADE,
+        related_name="timeline_entries",
+    )
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=["user", "post"],
+                name="unique_timeline_entry",
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.post} in timeline of {self.user}"
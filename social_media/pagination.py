@@ -0,0 +1,61 @@
+from rest_framework.pagination import CursorPagination, PageNumberPagination
+
+
+class CursorOrPageNumberPagination(CursorPagination):
+    """
+    Keyset pagination on (created_at, id) so every page costs the same.
+    Passing ?page= opts back into page-number pagination for older clients.
+    """
+
+    page_size = 10
+    max_page_size = 100
+    ordering = ("-created_at", "-id")
+
+    def get_page_number_paginator(self):
+        paginator = PageNumberPagination()
+        paginator.page_size = self.page_size
+        paginator.max_page_size = self.max_page_size
+        return paginator
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.page_number_paginator = None
+
+        if PageNumberPagination.page_query_param in request.query_params:
+            self.page_number_paginator = self.get_page_number_paginator()
+            return self.page_number_paginator.paginate_queryset(
+                queryset.order_by(*self.ordering), request, view
+            )
+
+        return super().paginate_queryset(queryset, request, view)
+
+    def get_paginated_response(self, data):
+        if self.page_number_paginator is not None:
+            return self.page_number_paginator.get_paginated_response(data)
+        return super().get_paginated_response(data)
+
+    def get_html_context(self):
+        if self.page_number_paginator is not None:
+            return self.page_number_paginator.get_html_context()
+        return super().get_html_context()
+
+    def get_schema_operation_parameters(self, view):
+        return [
+            *super().get_schema_operation_parameters(view),
+            *self.get_page_number_paginator().get_schema_operation_parameters(
+                view
+            )[:1],
+        ]
+
+
+class LikePagination(CursorPagination):
+    page_size = 20
+    ordering = "-id"
+
+
+class ThreadPagination(CursorPagination):
+    """Replies of a thread in reading order, by materialized path."""
+
+    page_size = 20
+    max_page_size = 100
+    page_size_query_param = "page_size"
+    ordering = "path"
@@ -0,0 +1,347 @@
+import base64
+import binascii
+import re
+
+from django.db import connection, connections, transaction
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import replace_query_param
+
+from social_media.models import Comment, Post
+
+# Posts and comments share one index; a document id is the object id times
+# two, plus one for comments, so both map back to their rows by id.
+POST, COMMENT = "post", "comment"
+TERM_RE = re.compile(r"\w+", re.UNICODE)
+
+SQLITE_TABLE = "social_media_search"
+SQLITE_SCHEMA = [
+    f"""
+    CREATE VIRTUAL TABLE IF NOT EXISTS {SQLITE_TABLE} USING fts5(
+        title, content, post_id UNINDEXED, author_id UNINDEXED,
+        tokenize = 'unicode61 remove_diacritics 2'
+    )
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS social_media_post_search_insert
+    AFTER INSERT ON social_media_post BEGIN
+        INSERT INTO {SQLITE_TABLE} (rowid, title, content, post_id, author_id)
+        VALUES (new.id * 2, new.title, new.content, new.id, new.author_id);
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS social_media_post_search_update
+    AFTER UPDATE OF title, content, author_id ON social_media_post BEGIN
+        UPDATE {SQLITE_TABLE}
+        SET title = new.title, content = new.content,
+            author_id = new.author_id
+        WHERE rowid = new.id * 2;
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS social_media_post_search_delete
+    AFTER DELETE ON social_media_post BEGIN
+        DELETE FROM {SQLITE_TABLE} WHERE rowid = old.id * 2;
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS social_media_comment_search_insert
+    AFTER INSERT ON social_media_comment BEGIN
+        INSERT INTO {SQLITE_TABLE} (rowid, title, content, post_id, author_id)
+        VALUES (new.id * 2 + 1, '', new.content, new.post_id, new.author_id);
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS social_media_comment_search_update
+    AFTER UPDATE OF content, post_id, author_id ON social_media_comment BEGIN
+        UPDATE {SQLITE_TABLE}
+        SET content = new.content, post_id = new.post_id,
+            author_id = new.author_id
+        WHERE rowid = new.id * 2 + 1;
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS social_media_comment_search_delete
+    AFTER DELETE ON social_media_comment BEGIN
+        DELETE FROM {SQLITE_TABLE} WHERE rowid = old.id * 2 + 1;
+    END
+    """,
+]
+
+POSTGRES_SCHEMA = [
+    """
+    ALTER TABLE social_media_post ADD COLUMN IF NOT EXISTS search_vector
+    tsvector GENERATED ALWAYS AS (
+        setweight(to_tsvector('english', coalesce(title, '')), 'A')
+        || setweight(to_tsvector('english', coalesce(content, '')), 'B')
+    ) STORED
+    """,
+    """
+    CREATE INDEX IF NOT EXISTS post_search_vector_idx
+    ON social_media_post USING GIN (search_vector)
+    """,
+    """
+    ALTER TABLE social_media_comment ADD COLUMN IF NOT EXISTS search_vector
+    tsvector GENERATED ALWAYS AS (
+        setweight(to_tsvector('english', coalesce(content, '')), 'B')
+    ) STORED
+    """,
+    """
+    CREATE INDEX IF NOT EXISTS comment_search_vector_idx
+    ON social_media_comment USING GIN (search_vector)
+    """,
+]
+
+
+def _statements(vendor):
+    if vendor == "sqlite":
+        return SQLITE_SCHEMA
+    if vendor == "postgresql":
+        return POSTGRES_SCHEMA
+    return []
+
+
+def install_search_schema(using="default"):
+    """
+    Create the search index and the triggers keeping it in sync. Safe to
+    run repeatedly; it also restores triggers dropped when a migration
+    rebuilds the post or comment table on SQLite.
+    """
+    with connections[using].cursor() as cursor:
+        for statement in _statements(connections[using].vendor):
+            cursor.execute(statement)
+
+
+def restore_search_triggers(using="default", **kwargs):
+    """
+    post_migrate hook: SQLite drops triggers along with a table whenever a
+    migration rebuilds it, so reinstall them if the index exists.
+    """
+    db = connections[using]
+    if db.vendor != "sqlite":
+        return
+    with db.cursor() as cursor:
+        cursor.execute(
+            "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = %s",
+            [SQLITE_TABLE],
+        )
+        exists = cursor.fetchone()
+    if exists:
+        install_search_schema(using)
+
+
+def rebuild_search_index(batch_size=5000, using="default"):
+    """
+    Re-index every post and comment in id-range batches. Returns the number
+    of indexed documents. The SQLite index is cleared and refilled in one
+    transaction, so searches keep seeing the old index until it is done.
+    PostgreSQL vectors are generated columns, so there only the GIN indexes
+    are rebuilt.
+    """
+    db = connections[using]
+    install_search_schema(using)
+
+    if db.vendor == "postgresql":
+        with db.cursor() as cursor:
+            cursor.execute("REINDEX INDEX post_search_vector_idx")
+            cursor.execute("REINDEX INDEX comment_search_vector_idx")
+        return Post.objects.count() + Comment.objects.count()
+
+    sources = [
+        (
+            Post,
+            "id * 2, title, content, id, author_id FROM social_media_post",
+        ),
+        (
+            Comment,
+            "id * 2 + 1, '', content, post_id, author_id "
+            "FROM social_media_comment",
+        ),
+    ]
+    indexed = 0
+    with transaction.atomic(using=using), db.cursor() as cursor:
+        cursor.execute(f"DELETE FROM {SQLITE_TABLE}")
+        for model, select in sources:
+            last = (
+                model.objects.using(using)
+                .order_by("-id")
+                .values_list("id")
+                .first()
+            )
+            for start in range(0, last[0] if last else 0, batch_size):
+                cursor.execute(
+                    f"INSERT INTO {SQLITE_TABLE} "
+                    "(rowid, title, content, post_id, author_id) "
+                    f"SELECT {select} WHERE id > %s AND id <= %s",
+                    [start, start + batch_size],
+                )
+                indexed += cursor.rowcount
+    with db.cursor() as cursor:
+        cursor.execute(
+            f"INSERT INTO {SQLITE_TABLE} ({SQLITE_TABLE}) VALUES ('optimize')"
+        )
+    return indexed
+
+
+def _terms(query):
+    return TERM_RE.findall(query or "")
+
+
+def _hit_filters(author_id, hashtag_ids, post_column, author_column):
+    where, params = [], []
+    if author_id is not None:
+        where.append(f"{author_column} = %s")
+        params.append(author_id)
+    if hashtag_ids:
+        placeholders = ", ".join(["%s"] * len(hashtag_ids))
+        where.append(
+            f"{post_column} IN (SELECT post_id "
+            "FROM social_media_post_hashtags "
+            f"WHERE hashtag_id IN ({placeholders}))"
+        )
+        params.extend(hashtag_ids)
+    return where, params
+
+
+def _sqlite_hits(terms, author_id, hashtag_ids):
+    # Every term is quoted so user input can never be parsed as FTS5 syntax;
+    # the last one matches as a prefix to support search-as-you-type.
+    match = " ".join(f'"{term}"' for term in terms) + "*"
+    where, params = _hit_filters(
+        author_id, hashtag_ids, "post_id", "author_id"
+    )
+    sql = (
+        f"SELECT rowid AS doc, bm25({SQLITE_TABLE}, 10.0, 1.0) AS score "
+        f"FROM {SQLITE_TABLE} WHERE {SQLITE_TABLE} MATCH %s"
+    )
+    for condition in where:
+        sql += f" AND {condition}"
+    return sql, [match, *params]
+
+
+def _postgres_hits(terms, author_id, hashtag_ids):
+    selects, params = [], []
+    for table, doc, post in (
+        ("social_media_post", "id * 2", "id"),
+        ("social_media_comment", "id * 2 + 1", "post_id"),
+    ):
+        where, filter_params = _hit_filters(
+            author_id, hashtag_ids, post, "author_id"
+        )
+        selects.append(
+            f"SELECT {doc} AS doc, -ts_rank_cd(search_vector, query) AS score "
+            f"FROM {table}, plainto_tsquery('english', %s) query "
+            "WHERE search_vector @@ query"
+            + "".join(f" AND {condition}" for condition in where)
+        )
+        params.extend([" ".join(terms), *filter_params])
+    return " UNION ALL ".join(selects), params
+
+
+def search(query, author_id=None, hashtag_ids=None, after=None, limit=10):
+    """
+    Return up to limit (document id, score) pairs matching the query, best
+    first. Lower scores rank higher: bm25 on SQLite, negated ts_rank_cd on
+    PostgreSQL. after is the (score, document id) of the last seen hit.
+    """
+    terms = _terms(query)
+    if not terms:
+        return []
+
+    if connection.vendor == "postgresql":
+        hits_sql, params = _postgres_hits(terms, author_id, hashtag_ids)
+    else:
+        hits_sql, params = _sqlite_hits(terms, author_id, hashtag_ids)
+
+    sql = f"SELECT doc, score FROM ({hits_sql}) hits"
+    if after is not None:
+        sql += " WHERE score > %s OR (score = %s AND doc > %s)"
+        params += [after[0], after[0], after[1]]
+    sql += " ORDER BY score, doc LIMIT %s"
+    params.append(limit)
+
+    with connection.cursor() as cursor:
+        cursor.execute(sql, params)
+        return cursor.fetchall()
+
+
+def load_hits(hits):
+    """Fetch the posts and comments behind search hits, keeping the order."""
+    post_ids = [doc // 2 for doc, _ in hits if doc % 2 == 0]
+    comment_ids = [doc // 2 for doc, _ in hits if doc % 2 == 1]
+    posts = Post.objects.select_related("author").in_bulk(post_ids)
+    comments = Comment.objects.select_related("author", "post").in_bulk(
+        comment_ids
+    )
+
+    results = []
+    for doc, score in hits:
+        if doc % 2 == 0:
+            item = posts.get(doc // 2)
+            if item is None:
+                continue
+            item.search_type, item.search_post_id = POST, item.id
+            item.search_title = item.title
+        else:
+            item = comments.get(doc // 2)
+            if item is None:
+                continue
+            item.search_type, item.search_post_id = COMMENT, item.post_id
+            item.search_title = item.post.title
+        item.search_score = score
+        results.append(item)
+    return results
+
+
+class SearchPagination(BasePagination):
+    """Keyset pagination over (score, document id) of ranked search hits."""
+
+    page_size = 10
+    cursor_query_param = "cursor"
+
+    def decode_cursor(self, request):
+        encoded = request.query_params.get(self.cursor_query_param)
+        if not encoded:
+            return None
+        try:
+            score, doc = (
+                base64.urlsafe_b64decode(encoded.encode()).decode().split(":")
+            )
+            return float(score), int(doc)
+        except (TypeError, ValueError, UnicodeDecodeError, binascii.Error):
+            raise NotFound("Invalid cursor")
+
+    @staticmethod
+    def encode_cursor(score, doc):
+        return base64.urlsafe_b64encode(f"{score!r}:{doc}".encode()).decode()
+
+    def paginate_search(self, request, query, author_id, hashtag_ids):
+        self.request = request
+        hits = search(
+            query,
+            author_id=author_id,
+            hashtag_ids=hashtag_ids,
+            after=self.decode_cursor(request),
+            limit=self.page_size + 1,
+        )
+        self.has_next = len(hits) > self.page_size
+        self.last_hit = hits[self.page_size - 1] if self.has_next else None
+        return load_hits(hits[: self.page_size])
+
+    def get_next_link(self):
+        if not self.has_next:
+            return None
+        return replace_query_param(
+            self.request.build_absolute_uri(),
+            self.cursor_query_param,
+            self.encode_cursor(self.last_hit[1], self.last_hit[0]),
+        )
+
+    def get_paginated_response(self, data):
+        return Response(
+            {
+                "next": self.get_next_link(),
+                "results": data,
+            }
+        )
@@ -1,8 +1,35 @@
+from django.conf import settings
 from rest_framework import serializers
 
+from py_social_media_api.images import pick_variant
 from social_media.models import Post, Like, Comment, Hashtag
 
 
+class ImageVariantField(serializers.ReadOnlyField):
+    """
+    URL of the smallest stored variant of an image that is at least
+    IMAGE_VARIANTS["LIST_WIDTH"] wide, or of the original until the
+    variants are ready.
+    """
+
+    def __init__(self, image_field="image", **kwargs):
+        self.image_field = image_field
+        kwargs["source"] = "*"
+        super().__init__(**kwargs)
+
+    def to_representation(self, instance):
+        name = pick_variant(
+            instance,
+            self.image_field,
+            settings.IMAGE_VARIANTS["LIST_WIDTH"],
+        )
+        if name is None:
+            return None
+        url = getattr(instance, self.image_field).storage.url(name)
+        request = self.context.get("request")
+        return request.build_absolute_uri(url) if request else url
+
+
 class LikeSerializer(serializers.ModelSerializer):
     class Meta:
         model = Like
@@ -12,13 +39,30 @@ class LikeSerializer(serializers.ModelSerializer):
             "post",
         )
 
-    def validate(self, data):
-        like = Like.objects.filter(
-            post_id=data["post"], created_by_id=data["created_by"]
-        )
-        if like:
-            raise serializers.ValidationError("You have already liked this post")
-        return data
+
+class LikeBatchSerializer(serializers.Serializer):
+    like = serializers.ListField(
+        child=serializers.IntegerField(min_value=1),
+        required=False,
+        default=list,
+    )
+    unlike = serializers.ListField(
+        child=serializers.IntegerField(min_value=1),
+        required=False,
+        default=list,
+    )
+
+    def validate(self, attrs):
+        limit = settings.LIKE_BATCH_MAX_POSTS
+        if len(attrs["like"]) + len(attrs["unlike"]) > limit:
+            raise serializers.ValidationError(
+                f"At most {limit} posts can be changed in one batch."
+            )
+        if set(attrs["like"]) & set(attrs["unlike"]):
+            raise serializers.ValidationError(
+                "A post cannot be liked and unliked in the same batch."
+            )
+        return attrs
 
 
 class HashtagSerializer(serializers.ModelSerializer):
@@ -27,22 +71,88 @@ class HashtagSerializer(serializers.ModelSerializer):
         fields = (
             "id",
             "name",
+            "posts_count",
+        )
+        read_only_fields = ("posts_count",)
+
+
+class TrendingHashtagSerializer(HashtagSerializer):
+    score = serializers.FloatField(read_only=True)
+
+    class Meta:
+        model = Hashtag
+        fields = (
+            "id",
+            "name",
+            "posts_count",
+            "score",
         )
 
 
 class CommentSerializer(serializers.ModelSerializer):
+    parent = serializers.PrimaryKeyRelatedField(
+        queryset=Comment.objects.all(),
+        required=False,
+        allow_null=True,
+    )
+
     class Meta:
         model = Comment
         fields = (
             "id",
             "created_at",
             "post",
+            "parent",
+            "depth",
             "content",
             "image",
         )
+        extra_kwargs = {"post": {"required": False}}
+
+    def validate(self, attrs):
+        if self.instance is not None:
+            return self.validate_update(attrs)
+
+        parent = attrs.get("parent")
+        if parent is None:
+            if "post" not in attrs:
+                raise serializers.ValidationError(
+                    {"post": "This field is required."}
+                )
+            return attrs
+
+        if "post" in attrs and attrs["post"].id != parent.post_id:
+            raise serializers.ValidationError(
+                {"parent": "The parent comment belongs to another post."}
+            )
+        if parent.depth >= settings.COMMENT_REPLY_MAX_DEPTH:
+            raise serializers.ValidationError(
+                {"parent": "This thread cannot be nested any deeper."}
+            )
+        attrs["post_id"] = parent.post_id
+        attrs.pop("post", None)
+        return attrs
+
+    def validate_update(self, attrs):
+        comment = self.instance
+        if "parent" in attrs and attrs["parent"] != comment.parent:
+            raise serializers.ValidationError(
+                {"parent": "Replies cannot be moved to another comment."}
+            )
+        post = attrs.get("post")
+        if (
+            post is not None
+            and post.id != comment.post_id
+            and (comment.parent_id or comment.replies_count)
+        ):
+            raise serializers.ValidationError(
+                {"post": "Threaded comments cannot move to another post."}
+            )
+        return attrs
 
 
 class CommentListSerializer(serializers.ModelSerializer):
+    image = ImageVariantField()
     author = serializers.SlugRelatedField(
         many=False,
         read_only=True,
@@ -61,6 +171,9 @@ class CommentListSerializer(serializers.ModelSerializer):
             "author",
             "created_at",
             "post",
+            "parent",
+            "depth",
+            "replies_count",
             "content",
             "image",
         )
@@ -103,6 +216,9 @@ class CommentDetailSerializer(serializers.ModelSerializer):
             "author",
             "created_at",
             "post",
+            "parent",
+            "depth",
+            "replies_count",
             "content",
             "image",
         )
@@ -120,6 +236,12 @@ class CommentImageSerializer(serializers.ModelSerializer):
 
 
 class PostSerializer(serializers.ModelSerializer):
+    hashtags = serializers.PrimaryKeyRelatedField(
+        many=True,
+        queryset=Hashtag.objects.all(),
+        required=False,
+    )
+
     class Meta:
         model = Post
         fields = (
@@ -133,6 +255,7 @@ class PostSerializer(serializers.ModelSerializer):
 
 
 class PostListSerializer(serializers.ModelSerializer):
+    image = ImageVariantField()
     hashtags = serializers.SlugRelatedField(
         many=True,
         read_only=True,
@@ -143,14 +266,10 @@ class PostListSerializer(serializers.ModelSerializer):
         read_only=True,
         slug_field="nickname",
     )
-    comments_count = serializers.SerializerMethodField()
-    likes_count = serializers.SerializerMethodField()
-
-    def get_comments_count(self, obj):
-        return obj.comments.count()
-
-    def get_likes_count(self, obj):
-        return obj.likes.count()
+    liked_by_me = serializers.BooleanField(read_only=True, default=False)
+    author_followed_by_me = serializers.BooleanField(
+        read_only=True, default=False
+    )
 
     class Meta:
         model = Post
@@ -163,6 +282,12 @@ class PostListSerializer(serializers.ModelSerializer):
             "hashtags",
             "comments_count",
             "likes_count",
+            "liked_by_me",
+            "author_followed_by_me",
+        )
+        read_only_fields = (
+            "comments_count",
+            "likes_count",
         )
 
 
@@ -179,6 +304,9 @@ class PostCommentSerializer(serializers.ModelSerializer):
             "id",
             "author",
             "created_at",
+            "parent",
+            "depth",
+            "replies_count",
             "content",
         )
 
@@ -208,14 +336,8 @@ class PostDetailSerializer(serializers.ModelSerializer):
         read_only=True,
         slug_field="nickname",
     )
-    likes = PostLikeSerializer(
-        many=True,
-        read_only=True,
-    )
-    comments = PostCommentSerializer(
-        many=True,
-        read_only=True,
-    )
+    comments_preview = serializers.SerializerMethodField()
+    likes_preview = serializers.SerializerMethodField()
 
     class Meta:
         model = Post
@@ -227,9 +349,33 @@ class PostDetailSerializer(serializers.ModelSerializer):
             "content",
             "image",
             "hashtags",
-            "comments",
-            "likes",
+            "comments_count",
+            "likes_count",
+            "comments_preview",
+            "likes_preview",
         )
+        read_only_fields = (
+            "comments_count",
+            "likes_count",
+        )
+
+    @staticmethod
+    def get_comments_preview(obj):
+        comments = getattr(obj, "preview_comments", None)
+        if comments is None:
+            comments = obj.comments.select_related("author").order_by(
+                "-created_at", "-id"
+            )[: settings.POST_DETAIL_PREVIEW["COMMENTS"]]
+        return PostCommentSerializer(comments, many=True).data
+
+    @staticmethod
+    def get_likes_preview(obj):
+        likes = getattr(obj, "preview_likes", None)
+        if likes is None:
+            likes = obj.likes.select_related("created_by").order_by("id")[
+                : settings.POST_DETAIL_PREVIEW["LIKES"]
+            ]
+        return PostLikeSerializer(likes, many=True).data
 
 
 class PostImageSerializer(serializers.ModelSerializer):
@@ -241,3 +387,14 @@ class PostImageSerializer(serializers.ModelSerializer):
             "id",
             "image",
         )
+
+
+class SearchResultSerializer(serializers.Serializer):
+    type = serializers.CharField(source="search_type")
+    id = serializers.IntegerField()
+    post = serializers.IntegerField(source="search_post_id")
+    author = serializers.CharField(source="author.nickname", default=None)
+    created_at = serializers.DateTimeField()
+    title = serializers.CharField(source="search_title")
+    content = serializers.CharField()
+    score = serializers.FloatField(source="search_score")
@@ -0,0 +1,55 @@
+from django.contrib.auth import get_user_model
+from django.db import transaction
+from django.db.models.signals import (
+    m2m_changed,
+    post_delete,
+    post_save,
+    pre_delete,
+)
+from django.dispatch import receiver
+
+from social_media.cache import invalidate_post_detail
+from social_media.counters import post_ids_touched_by, recount_post_counters
+from social_media.models import Comment, PostHashtag
+from social_media.threads import place_comment
+from social_media.trending import record_hashtag_usage, release_hashtag
+
+
+@receiver(m2m_changed, sender=PostHashtag)
+def count_attached_hashtags(
+    sender, instance, action, reverse, pk_set, **kwargs
+):
+    # pk_set only holds the links that were actually created on post_add.
+    if action != "post_add" or not pk_set:
+        return
+    if reverse:
+        record_hashtag_usage([instance.pk], uses=len(pk_set))
+    else:
+        record_hashtag_usage(pk_set)
+
+
+@receiver(post_delete, sender=PostHashtag)
+def count_detached_hashtag(sender, instance, **kwargs):
+    release_hashtag(instance.hashtag_id)
+
+
+@receiver(pre_delete, sender=get_user_model())
+def recount_deleted_user_posts(sender, instance, **kwargs):
+    # The cascade removes the user's likes and comments, and the replies to
+    # those comments, without touching the counters of the posts. The user
+    # row can go before its comments, so recount once all of them are gone.
+    post_ids = post_ids_touched_by(instance)
+    if not post_ids:
+        return
+
+    def recount():
+        recount_post_counters(post_ids)
+        invalidate_post_detail(*post_ids)
+
+    transaction.on_commit(recount)
+
+
+@receiver(post_save, sender=Comment)
+def place_new_comment(sender, instance, created, raw, **kwargs):
+    if created and not raw:
+        place_comment(instance)
@@ -0,0 +1,148 @@
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import AsyncClient, Client, TestCase
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.tokens import AccessToken
+
+from social_media.models import Comment, Hashtag, Like, Post
+from user.authentication import local_users
+from user.models import Follow
+
+POST_URL = reverse("social-media-async:post-list")
+COMMENT_URL = reverse("social-media-async:comment-list")
+HASHTAG_URL = reverse("social-media-async:hashtag-list")
+
+
+def detail_url(post_id: int):
+    return reverse("social-media-async:post-detail", args=[post_id])
+
+
+def user_detail_url(user_id: int):
+    return reverse("user-async:user-detail", args=[user_id])
+
+
+class AsyncReadApiTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        local_users.clear()
+        self.client = AsyncClient()
+        self.sync_client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            "test@test.com", "test12345", nickname="tester"
+        )
+        self.other = get_user_model().objects.create_user(
+            "other@test.com", "test12345", nickname="other"
+        )
+        self.auth = {
+            "Authorization": f"Bearer {AccessToken.for_user(self.user)}"
+        }
+        self.hashtag = Hashtag.objects.create(name="django")
+        self.posts = [
+            Post.objects.create(
+                author=self.other, title=f"Post {index}", content="Text"
+            )
+            for index in range(12)
+        ]
+        self.posts[-1].hashtags.add(self.hashtag)
+
+    async def test_post_list_pages_match_sync_serialization(self):
+        response = await self.client.get(POST_URL)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        first = response.json()
+        self.assertEqual(
+            [post["id"] for post in first["results"]],
+            [post.id for post in reversed(self.posts[2:])],
+        )
+        self.assertEqual(first["results"][0]["hashtags"], ["django"])
+
+        response = await self.client.get(first["next"])
+        second = response.json()
+        self.assertEqual(
+            [post["id"] for post in second["results"]],
+            [self.posts[1].id, self.posts[0].id],
+        )
+        self.assertIsNone(second["next"])
+
+    async def test_post_list_viewer_state_and_filters(self):
+        await Like.objects.acreate(post=self.posts[-1], created_by=self.user)
+        await Follow.objects.acreate(follower=self.user, following=self.other)
+
+        response = await self.client.get(
+            POST_URL, {"hashtag_names": "#django"}, headers=self.auth
+        )
+        results = response.json()["results"]
+        self.assertEqual(len(results), 1)
+        self.assertTrue(results[0]["liked_by_me"])
+        self.assertTrue(results[0]["author_followed_by_me"])
+
+    async def test_invalid_cursor(self):
+        response = await self.client.get(POST_URL, {"cursor": "%%%"})
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+    async def test_post_detail_shares_the_detail_cache(self):
+        post = self.posts[-1]
+        await Comment.objects.acreate(
+            post=post, author=self.user, content="First"
+        )
+        response = await self.client.get(detail_url(post.id))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.headers["X-Cache"], "MISS")
+        self.assertEqual(
+            response.json()["comments_preview"][0]["content"], "First"
+        )
+
+        response = await self.client.get(detail_url(post.id))
+        self.assertEqual(response.headers["X-Cache"], "HIT")
+
+    async def test_post_detail_missing(self):
+        response = await self.client.get(detail_url(0))
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+    async def test_comment_and_hashtag_lists(self):
+        comment = await Comment.objects.acreate(
+            post=self.posts[0], author=self.user, content="Hi"
+        )
+        response = await self.client.get(COMMENT_URL)
+        results = response.json()["results"]
+        self.assertEqual(results[0]["id"], comment.id)
+        self.assertEqual(results[0]["author"], "tester")
+        self.assertEqual(results[0]["post"], "Post 0")
+
+        response = await self.client.get(HASHTAG_URL)
+        self.assertEqual(response.json()[0]["name"], "django")
+
+    async def test_user_detail(self):
+        await Follow.objects.acreate(follower=self.user, following=self.other)
+        response = await self.client.get(user_detail_url(self.other.id))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(response.json()["followers_preview"]), 1)
+        self.assertNotIn("password", response.json())
+
+        response = await self.client.get(user_detail_url(0))
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+    async def test_invalid_requests_are_rejected(self):
+        response = await self.client.get(
+            POST_URL, headers={"Authorization": "Bearer nonsense"}
+        )
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+
+        response = await self.client.get(POST_URL, {"hashtags": "x"})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn("hashtags", response.json())
+
+        response = await self.client.post(POST_URL)
+        self.assertEqual(
+            response.status_code, status.HTTP_405_METHOD_NOT_ALLOWED
+        )
+
+    def test_matches_sync_post_detail(self):
+        post = self.posts[-1]
+        sync_data = self.sync_client.get(
+            reverse("social-media:post-detail", args=[post.id])
+        ).json()
+        cache.clear()
+        response = Client().get(detail_url(post.id))
+        self.assertEqual(response.json(), sync_data)
@@ -0,0 +1,147 @@
+import json
+import os
+import tempfile
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.db.models import Count, F
+from django.test import TestCase, TransactionTestCase, override_settings
+
+from social_media.management.commands.generate_fake_data import (
+    Command as GenerateFakeData,
+)
+from social_media.models import Comment, Like, Post
+from user.models import Follow
+
+
+class GenerateFakeDataTest(TestCase):
+    def test_generates_consistent_dataset(self):
+        call_command(
+            "generate_fake_data",
+            users=20,
+            follows_per_user=5,
+            hashtags=5,
+            posts=30,
+            comments=40,
+            likes=60,
+            chunk_size=7,
+            seed=1,
+            stdout=StringIO(),
+        )
+
+        self.assertEqual(Post.objects.count(), 30)
+        self.assertTrue(Follow.objects.exists())
+        drifted = Post.objects.annotate(
+            actual_likes=Count("likes", distinct=True),
+            actual_comments=Count("comments", distinct=True),
+        ).exclude(
+            likes_count=F("actual_likes"),
+            comments_count=F("actual_comments"),
+        )
+        self.assertFalse(drifted.exists())
+        self.assertFalse(Comment.objects.filter(path="").exists())
+
+    def test_skipped_conflicts_are_not_counted(self):
+        user = get_user_model().objects.create_user(
+            "test@test.com", "test12345", nickname="tester"
+        )
+        post = Post.objects.create(author=user, title="Post", content="Text")
+        Like.objects.create(post=post, created_by=user)
+        command = GenerateFakeData()
+        command.chunk_size = 10
+
+        created = command.bulk_insert(
+            Like, [Like(post=post, created_by=user)], ignore_conflicts=True
+        )
+
+        self.assertEqual(created, 0)
+
+
+@override_settings(ALLOWED_HOSTS=["localhost"])
+class RunBenchmarkTest(TestCase):
+    def test_writes_report_for_every_endpoint(self):
+        call_command(
+            "generate_fake_data",
+            users=5,
+            posts=5,
+            comments=5,
+            likes=5,
+            seed=1,
+            stdout=StringIO(),
+        )
+
+        with tempfile.TemporaryDirectory() as directory:
+            output = os.path.join(directory, "bench.json")
+            call_command(
+                "run_benchmark",
+                requests=2,
+                warmup=1,
+                output=output,
+                stdout=StringIO(),
+            )
+            with open(output) as report_file:
+                report = json.load(report_file)
+
+        self.assertEqual(
+            set(report["endpoints"]),
+            {
+                "post_list",
+                "post_detail",
+                "post_like",
+                "comment_list",
+                "user_list",
+                "user_detail",
+                "follow",
+            },
+        )
+        for result in report["endpoints"].values():
+            self.assertEqual(result["errors"], 0)
+            self.assertLessEqual(result["p50_ms"], result["p99_ms"])
+
+
+@override_settings(ALLOWED_HOSTS=["localhost"])
+class RunBenchmarkAsyncTest(TransactionTestCase):
+    # Threaded WSGI clients need committed data.
+    def test_compares_wsgi_and_asgi_entry_points(self):
+        call_command(
+            "generate_fake_data",
+            users=5,
+            posts=5,
+            comments=5,
+            likes=5,
+            seed=1,
+            stdout=StringIO(),
+        )
+        with tempfile.TemporaryDirectory() as directory:
+            output = os.path.join(directory, "bench.json")
+            call_command(
+                "run_benchmark",
+                "--async",
+                requests=6,
+                warmup=1,
+                concurrency=3,
+                output=output,
+                stdout=StringIO(),
+            )
+            with open(output) as report_file:
+                report = json.load(report_file)
+
+        self.assertEqual(report["concurrency"], 3)
+        self.assertEqual(
+            set(report["endpoints"]),
+            {
+                f"{name}_{server}"
+                for name in (
+                    "post_list",
+                    "post_detail",
+                    "comment_list",
+                    "hashtag_list",
+                    "user_detail",
+                )
+                for server in ("wsgi", "asgi")
+            },
+        )
+        for result in report["endpoints"].values():
+            self.assertEqual(result["errors"], 0)
+            self.assertLessEqual(result["p50_ms"], result["p99_ms"])
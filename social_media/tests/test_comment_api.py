@@ -0,0 +1,211 @@
+from django.contrib.auth import get_user_model
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from py_social_media_api.testing import QueryBudgetTestMixin
+from social_media.models import Post, Comment
+
+COMMENT_URL = reverse("social-media:comment-list")
+
+
+def detail_url(comment_id: int):
+    return reverse("social-media:comment-detail", args=[comment_id])
+
+
+def thread_url(comment_id: int):
+    return reverse("social-media:comment-thread", args=[comment_id])
+
+
+def sample_post(author, **params):
+    defaults = {
+        "title": "Test Post",
+        "content": "This is a test post.",
+    }
+    defaults.update(params)
+    return Post.objects.create(author=author, **defaults)
+
+
+def sample_comment(post, author, **params):
+    defaults = {
+        "content": "Test comment",
+    }
+    defaults.update(params)
+    return Comment.objects.create(post=post, author=author, **defaults)
+
+
+class CommentThreadTest(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            "test@test.com",
+            "test12345",
+            nickname="tester",
+        )
+        self.client.force_authenticate(self.user)
+        self.post = sample_post(self.user)
+        self.other_post = sample_post(self.user, title="Other")
+
+    def reply(self, parent, content="Reply"):
+        res = self.client.post(
+            COMMENT_URL, {"parent": parent.id, "content": content}
+        )
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        return Comment.objects.get(id=res.data["id"])
+
+    def test_filter_comments_by_post(self):
+        comment = sample_comment(self.post, self.user)
+        sample_comment(self.other_post, self.user)
+
+        res = self.client.get(COMMENT_URL, {"post": self.post.id})
+
+        self.assertEqual(
+            [item["id"] for item in res.data["results"]], [comment.id]
+        )
+        res = self.client.get(COMMENT_URL, {"post": "abc"})
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_replies_store_path_depth_and_thread_count(self):
+        root = sample_comment(self.post, self.user)
+        reply = self.reply(root)
+        nested = self.reply(reply)
+
+        root.refresh_from_db()
+        self.assertEqual(root.depth, 0)
+        self.assertEqual(reply.post_id, self.post.id)
+        self.assertEqual(reply.depth, 1)
+        self.assertEqual(nested.depth, 2)
+        self.assertEqual(nested.path, f"{reply.path}/{nested.id:010d}")
+        self.assertEqual(root.replies_count, 2)
+        self.post.refresh_from_db()
+        self.assertEqual(self.post.comments_count, 2)
+
+    def test_reply_must_match_post(self):
+        root = sample_comment(self.post, self.user)
+
+        res = self.client.post(
+            COMMENT_URL,
+            {
+                "post": self.other_post.id,
+                "parent": root.id,
+                "content": "Reply",
+            },
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        res = self.client.post(COMMENT_URL, {"content": "No post"})
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+    @override_settings(COMMENT_REPLY_MAX_DEPTH=1)
+    def test_max_depth(self):
+        reply = self.reply(sample_comment(self.post, self.user))
+
+        res = self.client.post(
+            COMMENT_URL, {"parent": reply.id, "content": "Too deep"}
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_thread_is_one_ordered_range(self):
+        root = sample_comment(self.post, self.user)
+        first = self.reply(root)
+        second = self.reply(root)
+        nested = self.reply(first)
+        sample_comment(self.post, self.user)
+
+        with self.assertNumQueries(2):
+            res = self.client.get(thread_url(root.id))
+
+        self.assertEqual(
+            [item["id"] for item in res.data["results"]],
+            [root.id, first.id, nested.id, second.id],
+        )
+        self.assertEqual(res.data["results"][0]["replies_count"], 3)
+
+        res = self.client.get(thread_url(first.id))
+        self.assertEqual(
+            [item["id"] for item in res.data["results"]],
+            [first.id, nested.id],
+        )
+        res = self.client.get(thread_url(0))
+        self.assertEqual(res.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_delete_removes_replies_and_updates_counts(self):
+        res = self.client.post(
+            COMMENT_URL, {"post": self.post.id, "content": "Root"}
+        )
+        root = Comment.objects.get(id=res.data["id"])
+        first = self.reply(root)
+        self.reply(first)
+        self.reply(root)
+
+        res = self.client.delete(detail_url(first.id))
+
+        self.assertEqual(res.status_code, status.HTTP_204_NO_CONTENT)
+        root.refresh_from_db()
+        self.post.refresh_from_db()
+        self.assertEqual(root.replies_count, 1)
+        self.assertEqual(self.post.comments_count, 2)
+
+        self.client.delete(detail_url(root.id))
+        self.post.refresh_from_db()
+        self.assertEqual(self.post.comments_count, 0)
+        self.assertFalse(Comment.objects.exists())
+
+    def test_threaded_comments_cannot_move(self):
+        root = sample_comment(self.post, self.user)
+        reply = self.reply(root)
+
+        for comment in (root, reply):
+            res = self.client.patch(
+                detail_url(comment.id), {"post": self.other_post.id}
+            )
+            self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        res = self.client.patch(detail_url(reply.id), {"parent": ""})
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+
+class CommentQueryBudgetTest(QueryBudgetTestMixin, TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            "test@test.com",
+            "test12345",
+            nickname="tester",
+        )
+        self.client.force_authenticate(self.user)
+        self.post = sample_post(self.user)
+        self.comments = [
+            sample_comment(self.post, self.user) for _ in range(5)
+        ]
+
+    def test_list_budget(self):
+        with self.assertMaxQueries(1):
+            self.client.get(COMMENT_URL)
+
+    def test_retrieve_budget(self):
+        with self.assertMaxQueries(1):
+            self.client.get(detail_url(self.comments[0].id))
+
+    def test_create_budget(self):
+        # The extra query stores the path, which needs the inserted id.
+        with self.assertMaxQueries(6):
+            self.client.post(
+                COMMENT_URL, {"post": self.post.id, "content": "New"}
+            )
+
+    def test_update_budget(self):
+        with self.assertMaxQueries(5):
+            self.client.patch(
+                detail_url(self.comments[0].id), {"content": "Edited"}
+            )
+
+    def test_destroy_budget(self):
+        # The subtree delete collects the replies before deleting them.
+        with self.assertMaxQueries(7):
+            self.client.delete(detail_url(self.comments[0].id))
+
+    def test_thread_budget(self):
+        with self.assertMaxQueries(2):
+            self.client.get(thread_url(self.comments[0].id))
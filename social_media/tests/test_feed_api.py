@@ -0,0 +1,112 @@
+from django.contrib.auth import get_user_model
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from social_media.models import Like, Post, TimelineEntry
+from user.models import Follow
+
+FEED_URL = reverse("social-media:feed-list")
+POST_URL = reverse("social-media:post-list")
+
+
+def follow_url(user_id: int):
+    return reverse("user:user-follow", args=[user_id])
+
+
+def unfollow_url(user_id: int):
+    return reverse("user:user-unfollow", args=[user_id])
+
+
+def sample_user(email, nickname):
+    return get_user_model().objects.create_user(
+        email=email,
+        password="test12345",
+        nickname=nickname,
+    )
+
+
+class FeedApiTest(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.reader = sample_user("reader@test.com", "reader")
+        self.author = sample_user("author@test.com", "author")
+        self.author_client = APIClient()
+        self.author_client.force_authenticate(self.author)
+        self.client.force_authenticate(self.reader)
+
+    def create_post(self, title="Test Post"):
+        res = self.author_client.post(
+            POST_URL, {"title": title, "content": "Content"}
+        )
+        return Post.objects.get(id=res.data["id"])
+
+    def test_feed_requires_authentication(self):
+        res = APIClient().get(FEED_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_new_post_is_fanned_out_to_followers(self):
+        Follow.objects.create(follower=self.reader, following=self.author)
+
+        post = self.create_post()
+        res = self.client.get(FEED_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            [item["id"] for item in res.data["results"]], [post.id]
+        )
+
+    def test_follow_backfills_and_unfollow_prunes_timeline(self):
+        post = self.create_post()
+
+        self.client.post(follow_url(self.author.id))
+        self.assertTrue(
+            TimelineEntry.objects.filter(user=self.reader, post=post).exists()
+        )
+
+        self.client.post(unfollow_url(self.author.id))
+        self.assertFalse(
+            TimelineEntry.objects.filter(user=self.reader).exists()
+        )
+
+    def test_feed_is_paginated_by_cursor(self):
+        Follow.objects.create(follower=self.reader, following=self.author)
+        posts = [self.create_post(f"Post {index}") for index in range(12)]
+
+        first_page = self.client.get(FEED_URL)
+        second_page = self.client.get(first_page.data["next"])
+
+        ids = [item["id"] for item in first_page.data["results"]]
+        ids += [item["id"] for item in second_page.data["results"]]
+        self.assertEqual(ids, [post.id for post in reversed(posts)])
+        self.assertIsNone(second_page.data["next"])
+
+    @override_settings(FEED_CELEBRITY_FOLLOWER_THRESHOLD=1)
+    def test_celebrity_posts_are_merged_at_read_time(self):
+        self.client.post(follow_url(self.author.id))
+
+        post = self.create_post()
+        res = self.client.get(FEED_URL)
+
+        self.assertFalse(TimelineEntry.objects.filter(post=post).exists())
+        self.assertEqual(
+            [item["id"] for item in res.data["results"]], [post.id]
+        )
+
+    def test_feed_items_carry_viewer_state(self):
+        Follow.objects.create(follower=self.reader, following=self.author)
+        liked = self.create_post("Liked")
+        self.create_post("Not liked")
+        Like.objects.create(post=liked, created_by=self.reader)
+
+        res = self.client.get(FEED_URL)
+
+        self.assertEqual(
+            [
+                (item["liked_by_me"], item["author_followed_by_me"])
+                for item in res.data["results"]
+            ],
+            [(False, True), (True, True)],
+        )
@@ -0,0 +1,127 @@
+from datetime import timedelta
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import TestCase
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from social_media.models import Hashtag, HashtagUsage, Post
+from social_media.trending import compact_hashtag_usage, record_hashtag_usage
+
+POST_URL = reverse("social-media:post-list")
+TRENDING_URL = reverse("social-media:hashtag-trending")
+
+
+def post_detail_url(post_id: int):
+    return reverse("social-media:post-detail", args=[post_id])
+
+
+class HashtagApiTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            email="test@test.com",
+            password="test12345",
+            nickname="tester",
+        )
+        self.client.force_authenticate(self.user)
+        self.django = Hashtag.objects.create(name="django")
+        self.python = Hashtag.objects.create(name="python")
+
+    def create_post(self, *hashtags):
+        res = self.client.post(
+            POST_URL,
+            {
+                "title": "Post",
+                "content": "Content",
+                "hashtags": [hashtag.id for hashtag in hashtags],
+            },
+        )
+        return Post.objects.get(id=res.data["id"])
+
+    def test_posts_count_follows_hashtag_changes(self):
+        post = self.create_post(self.django, self.python)
+        self.create_post(self.django)
+
+        self.client.patch(
+            post_detail_url(post.id), {"hashtags": [self.python.id]}
+        )
+        self.django.refresh_from_db()
+        self.assertEqual(self.django.posts_count, 1)
+
+        self.client.delete(post_detail_url(post.id))
+        self.python.refresh_from_db()
+        self.assertEqual(self.python.posts_count, 0)
+
+    def test_hashtag_usage_is_counted_into_hourly_buckets(self):
+        self.create_post(self.django, self.python)
+        self.create_post(self.django)
+
+        usage = HashtagUsage.objects.get(hashtag=self.django)
+        self.assertEqual(usage.granularity, HashtagUsage.HOUR)
+        self.assertEqual(usage.count, 2)
+        self.assertEqual(usage.bucket.minute, 0)
+
+    def test_trending_ranks_recent_usage_higher(self):
+        record_hashtag_usage(
+            [self.django.id],
+            uses=3,
+            when=timezone.now() - timedelta(hours=20),
+        )
+        record_hashtag_usage([self.python.id], uses=2)
+
+        res = self.client.get(TRENDING_URL, {"window": "24h"})
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            [hashtag["name"] for hashtag in res.data], ["python", "django"]
+        )
+        self.assertEqual(res.data[0]["posts_count"], 2)
+
+        old_only = self.client.get(TRENDING_URL, {"window": "1h"})
+        self.assertEqual(
+            [hashtag["name"] for hashtag in old_only.data], ["python"]
+        )
+
+    def test_trending_is_cached(self):
+        record_hashtag_usage([self.django.id])
+        self.client.get(TRENDING_URL)
+
+        record_hashtag_usage([self.python.id], uses=5)
+        res = self.client.get(TRENDING_URL)
+
+        self.assertEqual([hashtag["name"] for hashtag in res.data], ["django"])
+
+    def test_trending_rejects_invalid_window(self):
+        for window in ("abc", "0h", "365d", "99999999999999d"):
+            res = self.client.get(TRENDING_URL, {"window": window})
+
+            self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_compaction_rolls_hours_into_days(self):
+        now = timezone.now()
+        three_days_ago = now - timedelta(days=3)
+        record_hashtag_usage(
+            [self.django.id], when=three_days_ago.replace(hour=1)
+        )
+        record_hashtag_usage(
+            [self.django.id], uses=2, when=three_days_ago.replace(hour=5)
+        )
+        record_hashtag_usage([self.django.id])
+
+        rolled_up, deleted = compact_hashtag_usage(now=now)
+
+        self.assertEqual((rolled_up, deleted), (2, 0))
+        daily = HashtagUsage.objects.get(granularity=HashtagUsage.DAY)
+        self.assertEqual(daily.count, 3)
+        self.assertEqual(
+            daily.bucket,
+            three_days_ago.replace(hour=0, minute=0, second=0, microsecond=0),
+        )
+        self.assertTrue(
+            HashtagUsage.objects.filter(granularity=HashtagUsage.HOUR).exists()
+        )
@@ -0,0 +1,121 @@
+import io
+import shutil
+import tempfile
+from datetime import timedelta
+
+from django.contrib.auth import get_user_model
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from PIL import Image
+from rest_framework.test import APIClient
+
+from path_creator import image_storage
+from py_social_media_api.images import collect_image_blobs
+from social_media.models import ImageBlob, Post
+
+MEDIA_ROOT = tempfile.mkdtemp()
+IMAGE_VARIANTS = {
+    "WIDTHS": [40],
+    "MAX_WIDTH": 100,
+    "FORMATS": ["webp"],
+    "QUALITY": 80,
+    "MAX_PIXELS": 1_000_000,
+    "WORKERS": 1,
+    "LIST_WIDTH": 40,
+    "EAGER": True,
+}
+
+
+def upload_image_url(post_id: int):
+    return reverse("social-media:post-upload-image", args=[post_id])
+
+
+def sample_image(color="red"):
+    buffer = io.BytesIO()
+    Image.new("RGB", (80, 40), color).save(buffer, format="PNG")
+    return SimpleUploadedFile("image.png", buffer.getvalue(), "image/png")
+
+
+@override_settings(MEDIA_ROOT=MEDIA_ROOT, IMAGE_VARIANTS=IMAGE_VARIANTS)
+class ContentAddressedStorageTest(TestCase):
+    @classmethod
+    def tearDownClass(cls):
+        shutil.rmtree(MEDIA_ROOT, ignore_errors=True)
+        super().tearDownClass()
+
+    def setUp(self):
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            email="test@test.com",
+            password="test12345",
+            nickname="tester",
+        )
+        self.client.force_authenticate(self.user)
+        self.storage = image_storage()
+
+    def create_post_with_image(self, color="red"):
+        post = Post.objects.create(
+            author=self.user, title="Post", content="Content"
+        )
+        self.upload(post, color)
+        return post
+
+    def upload(self, post, color):
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post(
+                upload_image_url(post.id),
+                {"image": sample_image(color)},
+                format="multipart",
+            )
+        post.refresh_from_db()
+
+    def test_identical_uploads_share_one_blob(self):
+        first = self.create_post_with_image()
+        second = self.create_post_with_image()
+
+        self.assertEqual(first.image.name, second.image.name)
+        self.assertRegex(
+            first.image.name,
+            r"^cas/[0-9a-f]{2}/[0-9a-f]{2}/[0-9a-f]{64}\.png$",
+        )
+        self.assertEqual(
+            first.image_variants["variants"],
+            second.image_variants["variants"],
+        )
+        self.assertEqual(ImageBlob.objects.get().refcount, 2)
+
+    def test_references_follow_replacement_and_deletion(self):
+        post = self.create_post_with_image()
+        red = post.image.name
+
+        self.upload(post, "blue")
+        post.refresh_from_db()
+        self.assertEqual(ImageBlob.objects.get(name=red).refcount, 0)
+        self.assertEqual(
+            ImageBlob.objects.get(name=post.image.name).refcount, 1
+        )
+
+        post.delete()
+        self.assertFalse(ImageBlob.objects.filter(refcount__gt=0).exists())
+
+    def test_garbage_collection_deletes_only_unreferenced_blobs(self):
+        kept = self.create_post_with_image()
+        removed = self.create_post_with_image("blue")
+        removed_name = removed.image.name
+        removed_variants = [
+            variant["name"] for variant in removed.image_variants["variants"]
+        ]
+        removed.delete()
+
+        self.assertEqual(
+            collect_image_blobs(self.storage, timedelta(minutes=5)), 0
+        )
+        deleted = collect_image_blobs(self.storage, timedelta(seconds=-1))
+
+        self.assertEqual(deleted, 1)
+        self.assertFalse(self.storage.exists(removed_name))
+        for name in removed_variants:
+            self.assertFalse(self.storage.exists(name))
+        self.assertTrue(self.storage.exists(kept.image.name))
+        self.assertFalse(ImageBlob.objects.filter(name=removed_name).exists())
@@ -0,0 +1,163 @@
+import io
+import shutil
+import tempfile
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from PIL import Image
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from py_social_media_api import images
+from social_media.models import Post
+
+POST_URL = reverse("social-media:post-list")
+MEDIA_ROOT = tempfile.mkdtemp()
+IMAGE_VARIANTS = {
+    "WIDTHS": [40, 100],
+    "MAX_WIDTH": 150,
+    "FORMATS": ["webp", "jpeg"],
+    "QUALITY": 80,
+    "MAX_PIXELS": 1_000_000,
+    "WORKERS": 1,
+    "LIST_WIDTH": 50,
+    "EAGER": True,
+}
+
+
+def upload_image_url(post_id: int):
+    return reverse("social-media:post-upload-image", args=[post_id])
+
+
+def sample_image(size=(200, 100), name="image.jpg"):
+    image = Image.new("RGB", size, "red")
+    exif = Image.Exif()
+    exif[0x010F] = "Camera maker"
+    buffer = io.BytesIO()
+    image.save(buffer, format="JPEG", exif=exif)
+    return SimpleUploadedFile(name, buffer.getvalue(), "image/jpeg")
+
+
+@override_settings(MEDIA_ROOT=MEDIA_ROOT, IMAGE_VARIANTS=IMAGE_VARIANTS)
+class ImageVariantsTest(TestCase):
+    @classmethod
+    def tearDownClass(cls):
+        shutil.rmtree(MEDIA_ROOT, ignore_errors=True)
+        super().tearDownClass()
+
+    def setUp(self):
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            email="test@test.com",
+            password="test12345",
+            nickname="tester",
+        )
+        self.client.force_authenticate(self.user)
+        self.post = Post.objects.create(
+            author=self.user, title="Post", content="Content"
+        )
+
+    def upload(self, image):
+        with self.captureOnCommitCallbacks(execute=True):
+            res = self.client.post(
+                upload_image_url(self.post.id),
+                {"image": image},
+                format="multipart",
+            )
+        self.post.refresh_from_db()
+        return res
+
+    def test_upload_builds_variants_without_exif(self):
+        res = self.upload(sample_image())
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        recorded = self.post.image_variants
+        self.assertEqual(recorded["source"], self.post.image.name)
+        self.assertEqual(
+            sorted(
+                (variant["width"], variant["format"])
+                for variant in recorded["variants"]
+            ),
+            [
+                (40, "jpeg"),
+                (40, "webp"),
+                (100, "jpeg"),
+                (100, "webp"),
+                (150, "jpeg"),
+                (150, "webp"),
+            ],
+        )
+        for variant in recorded["variants"]:
+            with self.post.image.storage.open(variant["name"]) as file:
+                with Image.open(file) as image:
+                    self.assertEqual(image.width, variant["width"])
+                    self.assertFalse(image.getexif())
+
+    def test_list_serves_smallest_suitable_variant(self):
+        self.upload(sample_image())
+
+        res = self.client.get(POST_URL)
+
+        self.assertTrue(
+            res.data["results"][0]["image"].endswith("-100w.webp")
+        )
+
+    def test_small_image_is_not_upscaled(self):
+        self.upload(sample_image(size=(60, 30)))
+
+        variants = self.post.image_variants["variants"]
+        self.assertEqual(
+            sorted({variant["width"] for variant in variants}), [40, 60]
+        )
+
+    @override_settings(
+        IMAGE_VARIANTS={**IMAGE_VARIANTS, "MAX_PIXELS": 10_000}
+    )
+    def test_oversized_image_gets_no_variants(self):
+        with self.assertLogs("py_social_media_api.images", "ERROR"):
+            self.upload(sample_image())
+
+        self.assertEqual(self.post.image_variants, {})
+        res = self.client.get(POST_URL)
+        self.assertTrue(res.data["results"][0]["image"].endswith(".jpg"))
+
+    @override_settings(IMAGE_VARIANTS={**IMAGE_VARIANTS, "EAGER": False})
+    def test_variants_are_built_off_the_request_thread(self):
+        with mock.patch(
+            "py_social_media_api.images.get_executor"
+        ) as get_executor:
+            self.upload(sample_image())
+
+        get_executor.return_value.submit.assert_called_once()
+        self.assertEqual(self.post.image_variants, {})
+
+    def test_replaced_image_keeps_shared_variants(self):
+        other = Post.objects.create(
+            author=self.user, title="Other", content="Content"
+        )
+        self.upload(sample_image())
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post(
+                upload_image_url(other.id),
+                {"image": sample_image()},
+                format="multipart",
+            )
+        other.refresh_from_db()
+        self.assertEqual(other.image.name, self.post.image.name)
+        build_variants = images.build_variants
+
+        def replace_while_building(file):
+            Post.objects.filter(pk=self.post.pk).update(image="")
+            return build_variants(file)
+
+        with mock.patch(
+            "py_social_media_api.images.build_variants",
+            side_effect=replace_while_building,
+        ):
+            images.process_image(Post, self.post.pk, "image")
+
+        for variant in other.image_variants["variants"]:
+            self.assertTrue(other.image.storage.exists(variant["name"]))
@@ -0,0 +1,132 @@
+from django.contrib.auth import get_user_model
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from py_social_media_api.testing import QueryBudgetTestMixin
+from social_media.models import Post, Like
+
+BATCH_URL = reverse("social-media:likes-batch")
+STATE_URL = reverse("social-media:likes-state")
+
+
+def sample_post(author, **params):
+    defaults = {
+        "title": "Test Post",
+        "content": "Content",
+    }
+    defaults.update(params)
+
+    return Post.objects.create(author=author, **defaults)
+
+
+class LikeBatchApiTest(QueryBudgetTestMixin, TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            email="test@test.com",
+            password="test12345",
+            nickname="tester",
+        )
+        self.client.force_authenticate(self.user)
+        self.posts = [
+            sample_post(self.user, title=f"Post {index}")
+            for index in range(3)
+        ]
+
+    def test_batch_requires_authentication(self):
+        res = APIClient().post(BATCH_URL, {"like": [1]}, format="json")
+
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_batch_like_and_unlike(self):
+        first, second, third = self.posts
+        Like.objects.create(post=third, created_by=self.user)
+        Post.objects.filter(id=third.id).update(likes_count=1)
+
+        res = self.client.post(
+            BATCH_URL,
+            {"like": [first.id, second.id, 1000], "unlike": [third.id]},
+            format="json",
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            res.data["results"],
+            [
+                {"post": first.id, "liked": True, "likes_count": 1},
+                {"post": second.id, "liked": True, "likes_count": 1},
+                {"post": third.id, "liked": False, "likes_count": 0},
+            ],
+        )
+        self.assertEqual(
+            set(
+                Like.objects.filter(created_by=self.user).values_list(
+                    "post_id", flat=True
+                )
+            ),
+            {first.id, second.id},
+        )
+
+    def test_batch_like_is_idempotent(self):
+        post = self.posts[0]
+        payload = {"like": [post.id]}
+
+        self.client.post(BATCH_URL, payload, format="json")
+        res = self.client.post(BATCH_URL, payload, format="json")
+
+        self.assertEqual(res.data["results"][0]["likes_count"], 1)
+        self.assertEqual(Like.objects.filter(post=post).count(), 1)
+
+    @override_settings(LIKE_BATCH_MAX_POSTS=2)
+    def test_batch_rejects_too_many_posts(self):
+        res = self.client.post(
+            BATCH_URL,
+            {"like": [post.id for post in self.posts]},
+            format="json",
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_batch_rejects_conflicting_lists(self):
+        post = self.posts[0]
+
+        res = self.client.post(
+            BATCH_URL, {"like": [post.id], "unlike": [post.id]}, format="json"
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_like_state(self):
+        first, second, _ = self.posts
+        Like.objects.create(post=first, created_by=self.user)
+
+        res = self.client.get(STATE_URL, {"posts": f"{first.id},{second.id}"})
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            res.data["results"],
+            [
+                {"post": first.id, "liked": True},
+                {"post": second.id, "liked": False},
+            ],
+        )
+
+    def test_like_state_rejects_invalid_ids(self):
+        res = self.client.get(STATE_URL, {"posts": "1,abc"})
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_batch_budget(self):
+        payload = {
+            "like": [post.id for post in self.posts[:2]],
+            "unlike": [self.posts[2].id],
+        }
+        with self.assertMaxQueries(7):
+            self.client.post(BATCH_URL, payload, format="json")
+
+    def test_state_budget(self):
+        posts = ",".join(str(post.id) for post in self.posts)
+        with self.assertMaxQueries(1):
+            self.client.get(STATE_URL, {"posts": posts})
@@ -1,21 +1,47 @@
+import threading
+import time
+from io import StringIO
+
 from django.contrib.auth import get_user_model
-from django.test import TestCase
+from django.core.cache import cache
+from django.core.management import call_command
+from django.test import TestCase, override_settings
 from django.urls import reverse
 from rest_framework import status
 from rest_framework.test import APIClient
 
-from social_media.models import Post, Hashtag
+from py_social_media_api.testing import QueryBudgetTestMixin
+from social_media.cache import get_or_compute_post_detail
+from social_media.models import Post, Hashtag, Like, Comment
+from user.models import Follow
 from social_media.serializers import (
     PostListSerializer, PostDetailSerializer,
 )
 
 POST_URL = reverse("social-media:post-list")
+COMMENT_URL = reverse("social-media:comment-list")
 
 
 def detail_url(post_id: int):
     return reverse("social-media:post-detail", args=[post_id])
 
 
+def like_url(post_id: int):
+    return reverse("social-media:post-like", args=[post_id])
+
+
+def unlike_url(post_id: int):
+    return reverse("social-media:post-unlike", args=[post_id])
+
+
+def post_likes_url(post_id: int):
+    return reverse("social-media:post-likes", args=[post_id])
+
+
+def post_comments_url(post_id: int):
+    return reverse("social-media:post-comments", args=[post_id])
+
+
 def sample_hashtag(**params):
     defaults = {
         "name": "Test Hashtag",
@@ -35,6 +61,7 @@ def sample_post(author, **params):
 
 class AuthenticatedPostApiTest(TestCase):
     def setUp(self):
+        cache.clear()
         self.client = APIClient()
         self.user = get_user_model().objects.create_user(
             "test@test.com",
@@ -58,6 +85,53 @@ class AuthenticatedPostApiTest(TestCase):
         self.assertEqual(res.status_code, status.HTTP_200_OK)
         self.assertEqual(res.data['results'], serializer.data)
 
+    def test_list_posts_is_cursor_paginated(self):
+        posts = [sample_post(self.user, title=f"Post {i}") for i in range(12)]
+
+        first_page = self.client.get(POST_URL)
+        second_page = self.client.get(first_page.data["next"])
+
+        self.assertNotIn("count", first_page.data)
+        ids = [post["id"] for post in first_page.data["results"]]
+        ids += [post["id"] for post in second_page.data["results"]]
+        self.assertEqual(ids, [post.id for post in reversed(posts)])
+
+    def test_list_posts_page_number_opt_in(self):
+        for i in range(12):
+            sample_post(self.user, title=f"Post {i}")
+
+        res = self.client.get(POST_URL, {"page": 2})
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data["count"], 12)
+        self.assertEqual(len(res.data["results"]), 2)
+
+    def test_list_posts_viewer_state(self):
+        author = get_user_model().objects.create_user(
+            "author@test.com",
+            "test12345",
+            nickname="author",
+        )
+        liked_post = sample_post(author, title="Liked")
+        own_post = sample_post(self.user, title="Own")
+        Like.objects.create(post=liked_post, created_by=self.user)
+        Follow.objects.create(follower=self.user, following=author)
+
+        res = self.client.get(POST_URL)
+        anonymous_res = APIClient().get(POST_URL)
+
+        states = {
+            item["id"]: (item["liked_by_me"], item["author_followed_by_me"])
+            for item in res.data["results"]
+        }
+        self.assertEqual(
+            states,
+            {liked_post.id: (True, True), own_post.id: (False, False)},
+        )
+        for item in anonymous_res.data["results"]:
+            self.assertFalse(item["liked_by_me"])
+            self.assertFalse(item["author_followed_by_me"])
+
     def test_filter_posts_by_hashtag(self):
         post1 = sample_post(self.user, title="Test post")
         post2 = sample_post(self.user, title="Another test post")
@@ -82,6 +156,41 @@ class AuthenticatedPostApiTest(TestCase):
         self.assertIn(serializer2.data, res.data["results"])
         self.assertNotIn(serializer3.data, res.data["results"])
 
+    def test_filter_posts_by_invalid_hashtag(self):
+        res = self.client.get(POST_URL, {"hashtags": "x"})
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_filter_posts_by_all_hashtags_and_names(self):
+        both = sample_post(self.user, title="Both tags")
+        one = sample_post(self.user, title="One tag")
+        hashtag1 = sample_hashtag(name="test")
+        hashtag2 = sample_hashtag(name="django")
+        both.hashtags.add(hashtag1, hashtag2)
+        one.hashtags.add(hashtag1)
+
+        any_res = self.client.get(
+            POST_URL, {"hashtags": f"{hashtag1.id},{hashtag2.id}"}
+        )
+        all_res = self.client.get(
+            POST_URL,
+            {"hashtags": f"{hashtag1.id},{hashtag2.id}", "match": "all"},
+        )
+        names_res = self.client.get(
+            POST_URL, {"hashtag_names": "#django", "match": "all"}
+        )
+
+        self.assertEqual(
+            [post["id"] for post in any_res.data["results"]],
+            [one.id, both.id],
+        )
+        self.assertEqual(
+            [post["id"] for post in all_res.data["results"]], [both.id]
+        )
+        self.assertEqual(
+            [post["id"] for post in names_res.data["results"]], [both.id]
+        )
+
     def test_retrieve_post_detail(self):
         post = sample_post(self.user)
         post.hashtags.add(sample_hashtag(name="test"))
@@ -94,6 +203,35 @@ class AuthenticatedPostApiTest(TestCase):
         self.assertEqual(res.status_code, status.HTTP_200_OK)
         self.assertEqual(res.data, serializer.data)
 
+    def test_retrieve_post_detail_is_cached(self):
+        post = sample_post(self.user)
+        url = detail_url(post.id)
+
+        first = self.client.get(url)
+        with self.assertNumQueries(0):
+            second = self.client.get(url)
+
+        self.assertEqual(first["X-Cache"], "MISS")
+        self.assertEqual(second["X-Cache"], "HIT")
+        self.assertEqual(first.data, second.data)
+
+    def test_post_detail_cache_invalidated_by_like_and_comment(self):
+        post = sample_post(self.user)
+        url = detail_url(post.id)
+        self.client.get(url)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post(like_url(post.id))
+        res = self.client.get(url)
+        self.assertEqual(res["X-Cache"], "MISS")
+        self.assertEqual(res.data["likes_count"], 1)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post(COMMENT_URL, {"post": post.id, "content": "Hi"})
+        res = self.client.get(url)
+        self.assertEqual(res["X-Cache"], "MISS")
+        self.assertEqual(res.data["comments_count"], 1)
+
     def test_create_post(self):
         payload = {
             "title": "Test Post",
@@ -137,3 +275,270 @@ class AuthenticatedPostApiTest(TestCase):
         url = detail_url(post.id)
         res = self.client.delete(url)
         self.assertEqual(res.status_code, status.HTTP_204_NO_CONTENT)
+
+    def test_like_and_unlike_update_likes_count(self):
+        author = get_user_model().objects.create_user(
+            "author@test.com",
+            "test12345",
+            nickname="author",
+        )
+        post = sample_post(author)
+
+        res = self.client.post(like_url(post.id))
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data, {"liked": True, "likes_count": 1})
+        post.refresh_from_db()
+        self.assertEqual(post.likes_count, 1)
+
+        res = self.client.post(unlike_url(post.id))
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data, {"liked": False, "likes_count": 0})
+        post.refresh_from_db()
+        self.assertEqual(post.likes_count, 0)
+
+    @override_settings(POST_DETAIL_PREVIEW={"COMMENTS": 2, "LIKES": 2})
+    def test_post_detail_embeds_bounded_previews(self):
+        post = sample_post(self.user)
+        comments = [
+            Comment.objects.create(post=post, author=self.user, content=str(i))
+            for i in range(4)
+        ]
+        for i in range(3):
+            liker = get_user_model().objects.create_user(
+                f"liker{i}@test.com", "test12345", nickname=f"liker{i}"
+            )
+            Like.objects.create(post=post, created_by=liker)
+
+        res = self.client.get(detail_url(post.id))
+
+        self.assertEqual(
+            [comment["id"] for comment in res.data["comments_preview"]],
+            [comments[3].id, comments[2].id],
+        )
+        self.assertEqual(
+            [like["created_by"] for like in res.data["likes_preview"]],
+            ["liker0", "liker1"],
+        )
+
+    def test_post_likes_and_comments_sub_resources(self):
+        post = sample_post(self.user)
+        for i in range(25):
+            liker = get_user_model().objects.create_user(
+                f"liker{i}@test.com", "test12345", nickname=f"liker{i}"
+            )
+            Like.objects.create(post=post, created_by=liker)
+            Comment.objects.create(post=post, author=liker, content=str(i))
+
+        likes = self.client.get(post_likes_url(post.id))
+        more_likes = self.client.get(likes.data["next"])
+        comments = self.client.get(post_comments_url(post.id))
+
+        self.assertEqual(len(likes.data["results"]), 20)
+        self.assertEqual(len(more_likes.data["results"]), 5)
+        self.assertEqual(likes.data["results"][0]["created_by"], "liker24")
+        self.assertEqual(len(comments.data["results"]), 10)
+        self.assertEqual(comments.data["results"][0]["content"], "24")
+
+    def test_post_sub_resources_of_missing_post(self):
+        res = self.client.get(post_likes_url(1000))
+
+        self.assertEqual(res.status_code, status.HTTP_404_NOT_FOUND)
+        for url in (post_likes_url("abc"), post_comments_url("abc")):
+            res = self.client.get(url)
+            self.assertEqual(res.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_like_and_unlike_are_idempotent(self):
+        post = sample_post(self.user)
+
+        self.client.post(like_url(post.id))
+        res = self.client.post(like_url(post.id))
+        self.assertEqual(res.data, {"liked": True, "likes_count": 1})
+        self.assertEqual(Like.objects.filter(post=post).count(), 1)
+
+        self.client.post(unlike_url(post.id))
+        res = self.client.post(unlike_url(post.id))
+        self.assertEqual(res.data, {"liked": False, "likes_count": 0})
+
+    def test_like_missing_post(self):
+        res = self.client.post(like_url(1000))
+
+        self.assertEqual(res.status_code, status.HTTP_404_NOT_FOUND)
+        self.assertFalse(Like.objects.exists())
+
+    def test_comment_create_and_delete_update_comments_count(self):
+        post = sample_post(self.user)
+
+        res = self.client.post(
+            COMMENT_URL, {"post": post.id, "content": "Nice post"}
+        )
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        post.refresh_from_db()
+        self.assertEqual(post.comments_count, 1)
+
+        res = self.client.delete(
+            reverse("social-media:comment-detail", args=[res.data["id"]])
+        )
+        self.assertEqual(res.status_code, status.HTTP_204_NO_CONTENT)
+        post.refresh_from_db()
+        self.assertEqual(post.comments_count, 0)
+
+    def test_deleting_user_recounts_their_posts(self):
+        post = sample_post(self.user)
+        other = get_user_model().objects.create_user(
+            "other@test.com", "test12345", nickname="other"
+        )
+        self.client.force_authenticate(other)
+        self.client.post(like_url(post.id))
+        res = self.client.post(
+            COMMENT_URL, {"post": post.id, "content": "Nice post"}
+        )
+        self.client.force_authenticate(self.user)
+        self.client.post(
+            COMMENT_URL,
+            {"post": post.id, "content": "Thanks", "parent": res.data["id"]},
+        )
+        self.client.post(
+            COMMENT_URL, {"post": post.id, "content": "Still here"}
+        )
+
+        with self.captureOnCommitCallbacks(execute=True):
+            other.delete()
+
+        post.refresh_from_db()
+        self.assertEqual(post.likes_count, 0)
+        self.assertEqual(post.comments_count, 1)
+
+    def test_repair_post_counters_fixes_drift(self):
+        post = sample_post(self.user)
+        Like.objects.create(post=post, created_by=self.user)
+        Comment.objects.create(post=post, author=self.user, content="Hi")
+        Post.objects.filter(id=post.id).update(likes_count=7, comments_count=0)
+
+        call_command("repair_post_counters", stdout=StringIO())
+
+        post.refresh_from_db()
+        self.assertEqual(post.likes_count, 1)
+        self.assertEqual(post.comments_count, 1)
+
+
+class PostQueryBudgetTest(QueryBudgetTestMixin, TestCase):
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            "test@test.com",
+            "test12345",
+            nickname="tester",
+        )
+        self.client.force_authenticate(self.user)
+        hashtags = [sample_hashtag(name=f"tag{i}") for i in range(3)]
+        self.posts = []
+
+        for i in range(5):
+            liker = get_user_model().objects.create_user(
+                f"liker{i}@test.com",
+                "test12345",
+                nickname=f"liker{i}",
+            )
+            post = sample_post(self.user, title=f"Post {i}")
+            post.hashtags.add(*hashtags)
+            Like.objects.create(post=post, created_by=liker)
+            Comment.objects.create(post=post, author=liker, content="Hi")
+            self.posts.append(post)
+
+    def test_list_budget(self):
+        with self.assertMaxQueries(2):
+            res = self.client.get(POST_URL)
+            self.assertEqual(res.status_code, status.HTTP_200_OK)
+
+    @override_settings(
+        QUERY_BUDGET={
+            "HEADERS": True,
+            "DEFAULT": 20,
+            "VIEWS": {"GET social-media:post-list": 1},
+        }
+    )
+    def test_query_budget_headers_and_warning(self):
+        with self.assertLogs("py_social_media_api.middleware", "WARNING"):
+            res = self.client.get(POST_URL)
+
+        self.assertEqual(res["X-DB-Queries"], "2")
+        self.assertIn("X-DB-Time-Ms", res)
+
+    def test_retrieve_budget(self):
+        with self.assertMaxQueries(4):
+            res = self.client.get(detail_url(self.posts[0].id))
+            self.assertEqual(res.status_code, status.HTTP_200_OK)
+
+    def test_create_budget(self):
+        with self.assertMaxQueries(7):
+            res = self.client.post(
+                POST_URL, {"title": "New", "content": "Post"}
+            )
+            self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+
+    def test_update_budget(self):
+        with self.assertMaxQueries(6):
+            res = self.client.patch(
+                detail_url(self.posts[0].id), {"title": "New"}
+            )
+            self.assertEqual(res.status_code, status.HTTP_200_OK)
+
+    def test_destroy_budget(self):
+        # One posts_count decrement per detached hashtag, and comments are
+        # loaded (with their replies) to release the image blobs they
+        # reference.
+        with self.assertMaxQueries(15):
+            res = self.client.delete(detail_url(self.posts[0].id))
+            self.assertEqual(res.status_code, status.HTTP_204_NO_CONTENT)
+
+    def test_like_budget(self):
+        with self.assertMaxQueries(4):
+            res = self.client.post(like_url(self.posts[0].id))
+            self.assertEqual(res.status_code, status.HTTP_200_OK)
+
+    def test_likes_sub_resource_budget(self):
+        with self.assertMaxQueries(2):
+            res = self.client.get(post_likes_url(self.posts[0].id))
+            self.assertEqual(res.status_code, status.HTTP_200_OK)
+
+    def test_comments_sub_resource_budget(self):
+        with self.assertMaxQueries(2):
+            res = self.client.get(post_comments_url(self.posts[0].id))
+            self.assertEqual(res.status_code, status.HTTP_200_OK)
+
+    def test_unlike_budget(self):
+        Like.objects.create(post=self.posts[0], created_by=self.user)
+
+        with self.assertMaxQueries(4):
+            res = self.client.post(unlike_url(self.posts[0].id))
+            self.assertEqual(res.status_code, status.HTTP_200_OK)
+
+
+class PostDetailCacheTest(TestCase):
+    def setUp(self):
+        cache.clear()
+
+    def test_concurrent_misses_compute_once(self):
+        calls = []
+
+        def compute():
+            calls.append(1)
+            time.sleep(0.2)
+            return {"id": 1}
+
+        threads = [
+            threading.Thread(
+                target=get_or_compute_post_detail, args=(1, compute)
+            )
+            for _ in range(5)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(len(calls), 1)
+        self.assertEqual(
+            get_or_compute_post_detail(1, compute), ({"id": 1}, True)
+        )
@@ -0,0 +1,195 @@
+import re
+import unittest
+from collections import defaultdict
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from rest_framework.test import APIClient
+
+from social_media.feed import backfill_timelines, prune_timeline
+from social_media.models import Comment, Hashtag, Like, Post
+from user.models import Follow
+
+SUBQUERY = re.compile(r"(?:CO-ROUTINE|MATERIALIZE) (\S+)")
+TABLE_READ = re.compile(r"(SCAN|SEARCH) (\S+)(.*)")
+
+
+def plan_problems(sql):
+    """
+    EXPLAIN QUERY PLAN sql on SQLite and describe every full table scan and
+    every temp B-tree sort of table rows in it. Sorting the rows of an
+    already bounded subquery, as in sliced prefetches, is fine.
+    """
+    with connection.cursor() as cursor:
+        cursor.execute(f"EXPLAIN QUERY PLAN {sql}")
+        rows = cursor.fetchall()
+
+    subqueries = {
+        match.group(1)
+        for *_, detail in rows
+        if (match := SUBQUERY.match(detail))
+    }
+    steps = defaultdict(list)
+    for _, parent, _, detail in rows:
+        steps[parent].append(detail)
+
+    problems = []
+    for details in steps.values():
+        reads = [
+            match
+            for detail in details
+            if (match := TABLE_READ.match(detail))
+            and match.group(2) not in subqueries
+        ]
+        for match in reads:
+            if match.group(1) == "SCAN" and " USING " not in match.group(3):
+                problems.append(match.group(0))
+        if reads and any("USE TEMP B-TREE" in detail for detail in details):
+            problems.append(
+                "temp B-tree sort over "
+                + ", ".join(match.group(2) for match in reads)
+            )
+    return problems
+
+
+@unittest.skipUnless(connection.vendor == "sqlite", "Checks SQLite plans")
+class QueryPlanTest(TestCase):
+    """
+    Run the hot queries of the post, comment and user endpoints and make
+    sure each of them is served by an index: no full table scans and no
+    sorting of table rows.
+    """
+
+    def setUp(self):
+        cache.clear()
+        User = get_user_model()
+        self.user = User.objects.create_user(
+            "test@test.com", "test12345", nickname="tester"
+        )
+        self.other = User.objects.create_user(
+            "other@test.com", "test12345", nickname="other"
+        )
+        self.hashtag = Hashtag.objects.create(name="django")
+        self.post = Post.objects.create(
+            author=self.other, title="Post", content="Text"
+        )
+        self.post.hashtags.add(self.hashtag)
+        self.comment = Comment.objects.create(
+            post=self.post, author=self.user, content="Comment"
+        )
+        Like.objects.create(post=self.post, created_by=self.user)
+        Follow.objects.create(follower=self.user, following=self.other)
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def assertIndexedQueries(self, run):
+        with CaptureQueriesContext(connection) as context:
+            run()
+        statements = [
+            query["sql"]
+            for query in context.captured_queries
+            if query["sql"].startswith(("SELECT", "UPDATE", "DELETE"))
+        ]
+        self.assertTrue(statements)
+        for sql in statements:
+            with self.subTest(sql=sql):
+                self.assertEqual(plan_problems(sql), [])
+
+    def assertIndexedEndpoint(self, url, params=None):
+        def run():
+            response = self.client.get(url, params)
+            self.assertEqual(response.status_code, 200)
+
+        self.assertIndexedQueries(run)
+
+    def test_plan_problems_detects_scans_and_sorts(self):
+        self.assertEqual(
+            plan_problems("SELECT * FROM social_media_post WHERE title = 'x'"),
+            ["SCAN social_media_post"],
+        )
+        self.assertEqual(
+            plan_problems(
+                "SELECT * FROM social_media_post WHERE author_id = 1 "
+                "ORDER BY title"
+            ),
+            ["temp B-tree sort over social_media_post"],
+        )
+
+    def test_post_list(self):
+        url = reverse("social-media:post-list")
+        for params in (
+            None,
+            {"page": 1},
+            {"hashtags": self.hashtag.id},
+            {"hashtag_names": "django", "match": "all"},
+        ):
+            self.assertIndexedEndpoint(url, params)
+
+    def test_post_detail_and_sub_resources(self):
+        for name in ("post-detail", "post-comments", "post-likes"):
+            self.assertIndexedEndpoint(
+                reverse(f"social-media:{name}", args=[self.post.id])
+            )
+
+    def test_comment_list_and_detail(self):
+        self.assertIndexedEndpoint(reverse("social-media:comment-list"))
+        self.assertIndexedEndpoint(
+            reverse("social-media:comment-detail", args=[self.comment.id])
+        )
+
+    def test_comments_of_post_and_thread(self):
+        Comment.objects.create(
+            post=self.post,
+            author=self.user,
+            parent=self.comment,
+            content="Reply",
+        )
+        self.assertIndexedEndpoint(
+            reverse("social-media:comment-list"), {"post": self.post.id}
+        )
+        self.assertIndexedEndpoint(
+            reverse("social-media:comment-thread", args=[self.comment.id])
+        )
+
+    def test_user_detail_and_follow_lists(self):
+        self.assertIndexedEndpoint(
+            reverse("user:user-detail", args=[self.other.id])
+        )
+        self.assertIndexedEndpoint(
+            reverse("user:user-following", args=[self.user.id])
+        )
+        self.assertIndexedEndpoint(
+            reverse("user:user-followers", args=[self.other.id])
+        )
+
+    def test_user_list_nickname_filters(self):
+        self.assertIndexedEndpoint(
+            reverse("user:user-list"), {"nickname": "Other"}
+        )
+        self.assertIndexedEndpoint(
+            reverse("user:user-list"), {"nickname_prefix": "Oth"}
+        )
+
+    def test_author_posts_in_list_order(self):
+        self.assertIndexedQueries(
+            lambda: list(Post.objects.filter(author=self.other)[:10])
+        )
+
+    def test_timeline_backfill_and_prune(self):
+        self.assertIndexedQueries(
+            lambda: backfill_timelines(self.user.id, [self.other.id])
+        )
+        self.assertIndexedQueries(
+            lambda: list(
+                Post.objects.filter(author_id=self.other.id)
+                .order_by("-id")
+                .values_list("id", flat=True)[:10]
+            )
+        )
+        self.assertIndexedQueries(
+            lambda: prune_timeline(self.user.id, self.other.id)
+        )
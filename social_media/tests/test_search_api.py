@@ -0,0 +1,142 @@
+from io import StringIO
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from py_social_media_api.testing import QueryBudgetTestMixin
+from social_media.models import Comment, Hashtag, Post
+from social_media.search import SQLITE_TABLE, rebuild_search_index
+
+SEARCH_URL = reverse("social-media:search-list")
+
+
+class SearchApiTest(QueryBudgetTestMixin, TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.author = get_user_model().objects.create_user(
+            email="author@test.com",
+            password="test12345",
+            nickname="author",
+        )
+        self.other = get_user_model().objects.create_user(
+            email="other@test.com",
+            password="test12345",
+            nickname="other",
+        )
+        self.django_post = Post.objects.create(
+            author=self.author,
+            title="Django tips",
+            content="Use select_related for foreign keys",
+        )
+        self.python_post = Post.objects.create(
+            author=self.other,
+            title="Python news",
+            content="A new release mentions django once",
+        )
+        self.comment = Comment.objects.create(
+            post=self.python_post,
+            author=self.author,
+            content="Great django overview",
+        )
+
+    def search(self, **params):
+        return self.client.get(SEARCH_URL, params)
+
+    def test_search_posts_and_comments_ranked(self):
+        res = self.search(q="django")
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        hits = [(hit["type"], hit["id"]) for hit in res.data["results"]]
+        self.assertEqual(hits[0], ("post", self.django_post.id))
+        self.assertCountEqual(
+            hits,
+            [
+                ("post", self.django_post.id),
+                ("post", self.python_post.id),
+                ("comment", self.comment.id),
+            ],
+        )
+        comment_hit = res.data["results"][
+            hits.index(("comment", self.comment.id))
+        ]
+        self.assertEqual(comment_hit["post"], self.python_post.id)
+        self.assertEqual(comment_hit["title"], "Python news")
+
+    def test_search_matches_prefix_and_ignores_syntax(self):
+        res = self.search(q='(sele"')
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            [hit["id"] for hit in res.data["results"]], [self.django_post.id]
+        )
+
+    def test_search_filters_by_author_and_hashtag(self):
+        hashtag = Hashtag.objects.create(name="web")
+        self.python_post.hashtags.add(hashtag)
+
+        by_author = self.search(q="django", author=self.author.id)
+        by_hashtag = self.search(q="django", hashtags=str(hashtag.id))
+
+        self.assertCountEqual(
+            [(hit["type"], hit["id"]) for hit in by_author.data["results"]],
+            [("post", self.django_post.id), ("comment", self.comment.id)],
+        )
+        self.assertCountEqual(
+            [(hit["type"], hit["id"]) for hit in by_hashtag.data["results"]],
+            [("post", self.python_post.id), ("comment", self.comment.id)],
+        )
+
+    def test_index_follows_updates_and_deletes(self):
+        self.django_post.title = "Flask tips"
+        self.django_post.content = "Nothing else"
+        self.django_post.save()
+        self.python_post.delete()
+
+        self.assertEqual(self.search(q="django").data["results"], [])
+        self.assertEqual(len(self.search(q="flask").data["results"]), 1)
+
+    def test_search_is_paginated_by_cursor(self):
+        for index in range(12):
+            Post.objects.create(
+                author=self.author, title=f"Cursor {index}", content="paged"
+            )
+
+        first_page = self.search(q="paged")
+        second_page = self.client.get(first_page.data["next"])
+
+        ids = [hit["id"] for hit in first_page.data["results"]]
+        ids += [hit["id"] for hit in second_page.data["results"]]
+        self.assertEqual(len(ids), 12)
+        self.assertEqual(len(set(ids)), 12)
+        self.assertIsNone(second_page.data["next"])
+
+    def test_empty_query_returns_nothing(self):
+        res = self.search(q="  ")
+
+        self.assertEqual(res.data, {"next": None, "results": []})
+
+    def test_rebuild_search_index(self):
+        with connection.cursor() as cursor:
+            cursor.execute(f"DELETE FROM {SQLITE_TABLE}")
+
+        call_command("rebuild_search_index", batch_size=1, stdout=StringIO())
+
+        self.assertEqual(len(self.search(q="django").data["results"]), 3)
+
+    def test_failed_rebuild_keeps_old_index(self):
+        with mock.patch("social_media.search.Comment") as comment:
+            comment.objects.using.side_effect = RuntimeError
+            with self.assertRaises(RuntimeError):
+                rebuild_search_index(batch_size=1)
+
+        self.assertEqual(len(self.search(q="django").data["results"]), 3)
+
+    def test_search_budget(self):
+        with self.assertMaxQueries(3):
+            self.search(q="django")
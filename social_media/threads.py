@@ -0,0 +1,81 @@
+from django.db.models import CharField, Value
+from django.db.models.functions import Cast, LPad
+
+from py_social_media_api.db import shifted
+
+from social_media.models import Comment
+
+SEGMENT_WIDTH = 10
+SEPARATOR = "/"
+
+
+def path_segment(comment_id):
+    return f"{comment_id:0{SEGMENT_WIDTH}d}"
+
+
+def thread_root_id(path):
+    return int(path[:SEGMENT_WIDTH])
+
+
+def subtree_lookup(path):
+    """
+    Filter matching the comment at path and all of its replies as a single
+    range on the path index: every reply path continues with SEPARATOR,
+    which sorts right before "0".
+    """
+    return {
+        "path__gte": path,
+        "path__lt": path + chr(ord(SEPARATOR) + 1),
+    }
+
+
+def shift_replies_count(root_id, delta):
+    Comment.objects.filter(pk=root_id).update(
+        replies_count=shifted("replies_count", delta)
+    )
+
+
+def place_comment(comment):
+    """
+    Store the path and depth of a newly created comment and count it as a
+    reply of its thread. Must run in the transaction that created it.
+    """
+    parent = comment.parent
+    if parent is None:
+        comment.path = path_segment(comment.pk)
+        comment.depth = 0
+    else:
+        comment.path = f"{parent.path}{SEPARATOR}{path_segment(comment.pk)}"
+        comment.depth = parent.depth + 1
+        shift_replies_count(thread_root_id(parent.path), 1)
+    Comment.objects.filter(pk=comment.pk).update(
+        path=comment.path, depth=comment.depth
+    )
+
+
+def place_root_comments(queryset):
+    """
+    Make every comment of queryset the root of its own thread in a single
+    UPDATE, for comments inserted with bulk_create, which sends no signals.
+    """
+    return queryset.update(
+        path=LPad(Cast("id", CharField()), SEGMENT_WIDTH, Value("0")),
+        depth=0,
+    )
+
+
+def delete_subtree(comment):
+    """
+    Delete a comment together with all of its replies and keep the reply
+    count of the thread in step. Returns the number of deleted comments.
+    """
+    if not comment.path:
+        comment.delete()
+        return 1
+    _, deleted = Comment.objects.filter(
+        post_id=comment.post_id, **subtree_lookup(comment.path)
+    ).delete()
+    removed = deleted.get(Comment._meta.label, 0)
+    if comment.depth:
+        shift_replies_count(thread_root_id(comment.path), -removed)
+    return removed
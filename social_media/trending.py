@@ -0,0 +1,171 @@
+import re
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Count, F, OuterRef, Subquery, Sum
+from django.db.models.functions import Coalesce, TruncDay
+from django.utils import timezone
+
+from py_social_media_api.db import shifted, upsert_increment
+from social_media.models import Hashtag, HashtagUsage, PostHashtag
+
+WINDOW_RE = re.compile(r"^(\d+)([hd])$")
+
+
+def _hour(moment):
+    return moment.replace(minute=0, second=0, microsecond=0)
+
+
+def record_hashtag_usage(hashtag_ids, uses=1, when=None):
+    """
+    Count uses of every hashtag into the current hourly bucket and its
+    posts_count. Must run in the transaction that attached the hashtags.
+    """
+    hashtag_ids = list(hashtag_ids)
+    if not hashtag_ids:
+        return
+
+    bucket = _hour(when or timezone.now())
+    upsert_increment(
+        HashtagUsage,
+        [
+            {
+                "hashtag": hashtag_id,
+                "granularity": HashtagUsage.HOUR,
+                "bucket": bucket,
+                "count": uses,
+            }
+            for hashtag_id in sorted(hashtag_ids)
+        ],
+        unique_fields=["hashtag", "granularity", "bucket"],
+        field_name="count",
+    )
+    Hashtag.objects.filter(id__in=hashtag_ids).update(
+        posts_count=F("posts_count") + uses
+    )
+
+
+def release_hashtag(hashtag_id):
+    """Decrement posts_count when a hashtag is detached from a post."""
+    Hashtag.objects.filter(id=hashtag_id).update(
+        posts_count=shifted("posts_count", -1)
+    )
+
+
+def repair_hashtag_counters():
+    """Recompute posts_count of every hashtag from the post/hashtag table."""
+    return Hashtag.objects.update(
+        posts_count=Coalesce(
+            Subquery(
+                PostHashtag.objects.filter(hashtag=OuterRef("pk"))
+                .order_by()
+                .values("hashtag")
+                .annotate(total=Count("pk"))
+                .values("total")
+            ),
+            0,
+        )
+    )
+
+
+def parse_window(value):
+    """Turn a window such as "6h" or "7d" into a timedelta, or None."""
+    match = WINDOW_RE.match(value or "")
+    if not match:
+        return None
+    amount, unit = int(match.group(1)), match.group(2)
+    hours = amount if unit == "h" else amount * 24
+    # Checked before building the timedelta, which overflows on huge values.
+    if not 0 < hours <= settings.TRENDING_HASHTAGS["MAX_WINDOW_HOURS"]:
+        return None
+    return timedelta(hours=hours)
+
+
+def compute_trending(window, limit, now=None):
+    """
+    Rank hashtags by their usage within the window, each bucket weighted by
+    exponential decay with a half-life of HALF_LIFE_HOURS.
+    """
+    now = now or timezone.now()
+    half_life = settings.TRENDING_HASHTAGS["HALF_LIFE_HOURS"]
+    buckets = HashtagUsage.objects.filter(
+        bucket__gte=now - window
+    ).values_list("hashtag_id", "bucket", "count")
+
+    scores = {}
+    for hashtag_id, bucket, count in buckets.iterator():
+        age_hours = max((now - bucket).total_seconds() / 3600, 0)
+        scores[hashtag_id] = scores.get(hashtag_id, 0) + count * 0.5 ** (
+            age_hours / half_life
+        )
+
+    top = sorted(scores.items(), key=lambda item: (-item[1], item[0]))[:limit]
+    hashtags = Hashtag.objects.in_bulk([hashtag_id for hashtag_id, _ in top])
+    ranked = []
+    for hashtag_id, score in top:
+        if hashtag_id in hashtags:
+            hashtag = hashtags[hashtag_id]
+            hashtag.score = round(score, 4)
+            ranked.append(hashtag)
+    return ranked
+
+
+def get_trending(window_name, window, limit, compute):
+    """
+    Cached trending response; compute(hashtags) serializes a fresh ranking.
+    Entries expire after CACHE_TIMEOUT seconds, bounding their staleness.
+    """
+    key = f"hashtags:trending:{window_name}:{limit}"
+    data = cache.get(key)
+    if data is None:
+        data = compute(compute_trending(window, limit))
+        cache.set(
+            key, data, timeout=settings.TRENDING_HASHTAGS["CACHE_TIMEOUT"]
+        )
+    return data
+
+
+def compact_hashtag_usage(now=None):
+    """
+    Roll hourly buckets of whole days older than HOURLY_RETENTION_HOURS up
+    into daily buckets and drop daily buckets older than
+    DAILY_RETENTION_DAYS. Returns (rolled up, deleted) row counts.
+    """
+    config = settings.TRENDING_HASHTAGS
+    now = now or timezone.now()
+    retained_from = now - timedelta(hours=config["HOURLY_RETENTION_HOURS"])
+    cutoff = retained_from.replace(hour=0, minute=0, second=0, microsecond=0)
+
+    with transaction.atomic():
+        hourly = HashtagUsage.objects.filter(
+            granularity=HashtagUsage.HOUR, bucket__lt=cutoff
+        )
+        daily_totals = (
+            hourly.annotate(day=TruncDay("bucket"))
+            .values("hashtag_id", "day")
+            .annotate(total=Sum("count"))
+            .order_by()
+        )
+        upsert_increment(
+            HashtagUsage,
+            [
+                {
+                    "hashtag": row["hashtag_id"],
+                    "granularity": HashtagUsage.DAY,
+                    "bucket": row["day"],
+                    "count": row["total"],
+                }
+                for row in daily_totals.iterator()
+            ],
+            unique_fields=["hashtag", "granularity", "bucket"],
+            field_name="count",
+        )
+        rolled_up, _ = hourly.delete()
+
+    deleted, _ = HashtagUsage.objects.filter(
+        granularity=HashtagUsage.DAY,
+        bucket__lt=now - timedelta(days=config["DAILY_RETENTION_DAYS"]),
+    ).delete()
+    return rolled_up, deleted
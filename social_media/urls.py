@@ -1,6 +1,13 @@
 from rest_framework import routers
 
-from social_media.views import HashtagViewSet, PostViewSet, CommentViewSet
+from social_media.views import (
+    HashtagViewSet,
+    PostViewSet,
+    CommentViewSet,
+    FeedViewSet,
+    LikeViewSet,
+    SearchViewSet,
+)
 
 
 app_name = "social_media"
@@ -10,6 +17,9 @@ router = routers.DefaultRouter()
 router.register("posts", PostViewSet)
 router.register("comments", CommentViewSet)
 router.register("hashtags", HashtagViewSet)
+router.register("feed", FeedViewSet, basename="feed")
+router.register("likes", LikeViewSet, basename="likes")
+router.register("search", SearchViewSet, basename="search")
 
 
 urlpatterns = router.urls
@@ -1,25 +1,55 @@
+from django.conf import settings
+from django.db import transaction
 from rest_framework import viewsets, status
 from rest_framework.decorators import action
-from rest_framework.exceptions import ValidationError
-from rest_framework.generics import get_object_or_404
-from rest_framework.pagination import PageNumberPagination
+from rest_framework.exceptions import NotFound, ValidationError
 from rest_framework.response import Response
-from rest_framework.permissions import IsAuthenticatedOrReadOnly
+from rest_framework.permissions import (
+    IsAdminUser,
+    IsAuthenticated,
+    IsAuthenticatedOrReadOnly,
+)
 
+from py_social_media_api.routers import ReplicaReadMixin, use_primary
+from social_media.cache import (
+    get_or_compute_post_detail,
+    get_stats,
+    invalidate_post_detail,
+)
+from social_media.counters import increment_post_counter
+from social_media.feed import FeedPagination, fan_out_post
+from social_media.likes import (
+    batch_update_likes,
+    like_post,
+    liked_post_ids,
+    unlike_post,
+)
 from social_media.models import Hashtag, Post, Comment, Like
+from social_media.pagination import (
+    CursorOrPageNumberPagination,
+    LikePagination,
+    ThreadPagination,
+)
 from social_media.permissions import IsAuthorOrReadOnly
 from social_media.serializers import (
     HashtagSerializer,
     PostSerializer,
     PostListSerializer,
     PostDetailSerializer,
+    PostLikeSerializer,
+    PostCommentSerializer,
     CommentSerializer,
     CommentListSerializer,
     CommentDetailSerializer,
     PostImageSerializer,
     CommentImageSerializer,
-    LikeSerializer,
+    LikeBatchSerializer,
+    SearchResultSerializer,
+    TrendingHashtagSerializer,
 )
+from social_media.search import SearchPagination
+from social_media.threads import delete_subtree, subtree_lookup
+from social_media.trending import get_trending, parse_window
 
 
 class HashtagViewSet(viewsets.ModelViewSet):
@@ -27,15 +57,66 @@ class HashtagViewSet(viewsets.ModelViewSet):
     serializer_class = HashtagSerializer
     permission_classes = (IsAuthenticatedOrReadOnly,)
 
+    @action(
+        detail=False,
+        methods=["GET"],
+        url_path="trending",
+        serializer_class=TrendingHashtagSerializer,
+    )
+    def trending(self, request):
+        """
+        Endpoint for hashtags ranked by recent usage with time decay
+        example: api/social_media/hashtags/trending/?window=24h&limit=10
+        """
+        config = settings.TRENDING_HASHTAGS
+        window_name = request.query_params.get(
+            "window", config["DEFAULT_WINDOW"]
+        )
+        window = parse_window(window_name)
+        if window is None:
+            raise ValidationError(
+                {"window": "Expected a window such as 6h or 7d."}
+            )
+        limit = request.query_params.get("limit", str(config["LIMIT"]))
+        if not limit.isdigit() or not 0 < int(limit) <= config["MAX_LIMIT"]:
+            raise ValidationError(
+                {
+                    "limit": "Expected a number from 1 to "
+                    f"{config['MAX_LIMIT']}."
+                }
+            )
+
+        data = get_trending(
+            window_name,
+            window,
+            int(limit),
+            lambda hashtags: self.get_serializer(hashtags, many=True).data,
+        )
+        return Response(data, status=status.HTTP_200_OK)
+
+    def _invalidate_tagged_posts(self, hashtag):
+        invalidate_post_detail(*hashtag.posts.values_list("id", flat=True))
+
+    def perform_update(self, serializer):
+        with transaction.atomic():
+            hashtag = serializer.save()
+            self._invalidate_tagged_posts(hashtag)
+
+    def perform_destroy(self, instance):
+        with transaction.atomic():
+            self._invalidate_tagged_posts(instance)
+            instance.delete()
 
-class PostPagination(PageNumberPagination):
+
+class PostPagination(CursorOrPageNumberPagination):
     page_size = 10
     max_page_size = 100
 
 
-class PostViewSet(viewsets.ModelViewSet):
-    queryset = Post.objects.prefetch_related(
+class PostViewSet(ReplicaReadMixin, viewsets.ModelViewSet):
+    queryset = Post.objects.select_related(
         "author",
+    ).prefetch_related(
         "hashtags",
     )
     serializer_class = PostSerializer
@@ -54,42 +135,70 @@ class PostViewSet(viewsets.ModelViewSet):
             return PostListSerializer
         if self.action == "retrieve":
             return PostDetailSerializer
+        if self.action == "upload_image":
+            return PostImageSerializer
         return PostSerializer
 
-    def get_queryset(self):
-        queryset = self.queryset
-        hashtags = self.request.query_params.get("hashtags")
+    @staticmethod
+    def _params_to_names(qs):
+        return [name.strip().lstrip("#") for name in qs.split(",")]
+
+    @classmethod
+    def filter_by_params(cls, queryset, query_params):
+        """Apply the hashtag filters of the post list query string."""
+        hashtags = query_params.get("hashtags")
+        hashtag_names = query_params.get("hashtag_names")
+        match_all = query_params.get("match") == "all"
 
         if hashtags:
-            hashtags_id = self._params_to_int(hashtags)
-            queryset = queryset.filter(hashtags__id__in=hashtags_id)
+            try:
+                hashtags_id = cls._params_to_int(hashtags)
+            except ValueError:
+                raise ValidationError(
+                    {"hashtags": "Expected a comma separated list of ids."}
+                )
+            queryset = queryset.tagged(hashtags_id, match_all=match_all)
+
+        if hashtag_names:
+            queryset = queryset.tagged(
+                cls._params_to_names(hashtag_names),
+                lookup="hashtag__name",
+                match_all=match_all,
+            )
+
+        return queryset
+
+    def get_queryset(self):
+        queryset = self.filter_by_params(
+            self.queryset, self.request.query_params
+        )
 
-        return queryset.distinct()
+        if self.action == "list":
+            queryset = queryset.with_viewer_state(self.request.user)
+
+        if self.action == "retrieve":
+            queryset = queryset.with_previews()
+
+        return queryset
+
+    @staticmethod
+    def _pk_to_int(pk):
+        if not str(pk).isdigit():
+            raise NotFound("No Post matches the given query.")
+        return int(pk)
 
     @action(
         detail=True,
         methods=["POST"],
         url_path="like",
-        serializer_class=LikeSerializer,
     )
     def like(self, request, pk):
         """
         Endpoint for performing like action
         example: api/posts/pk/like/
         """
-        post = get_object_or_404(
-            Post,
-            id=pk,
-        )
-        created_by = request.user
-        serializer = LikeSerializer(data={"post": post.id, "created_by": created_by.id})
-        serializer.is_valid(
-            raise_exception=True,
-        )
-        serializer.save()
-        response_serializer = PostDetailSerializer(post)
         return Response(
-            response_serializer.data,
+            like_post(self._pk_to_int(pk), request.user.id),
             status=status.HTTP_200_OK,
         )
 
@@ -103,24 +212,57 @@ class PostViewSet(viewsets.ModelViewSet):
         Endpoint for performing unlike action
         example: api/posts/pk/unlike/
         """
-        post = get_object_or_404(
-            Post,
-            id=pk,
-        )
-        created_by = request.user
-        like = Like.objects.filter(
-            post__id=post.id,
-            created_by__id=created_by.id,
-        )
-        if not like:
-            raise ValidationError("You have not liked this post yet")
-        like.delete()
-        response_serializer = PostDetailSerializer(post)
         return Response(
-            response_serializer.data,
+            unlike_post(self._pk_to_int(pk), request.user.id),
             status=status.HTTP_200_OK,
         )
 
+    def _paginate_sub_resource(self, pk, queryset, paginator, serializer):
+        if not Post.objects.filter(id=pk).exists():
+            raise NotFound("No Post matches the given query.")
+        page = paginator.paginate_queryset(queryset, self.request, view=self)
+        return paginator.get_paginated_response(
+            serializer(page, many=True).data
+        )
+
+    @action(
+        detail=True,
+        methods=["GET"],
+        url_path="likes",
+        serializer_class=PostLikeSerializer,
+    )
+    def likes(self, request, pk=None):
+        """
+        Endpoint for listing the likes of a post, newest first
+        example: api/posts/pk/likes/
+        """
+        pk = self._pk_to_int(pk)
+        return self._paginate_sub_resource(
+            pk,
+            Like.objects.filter(post_id=pk).select_related("created_by"),
+            LikePagination(),
+            PostLikeSerializer,
+        )
+
+    @action(
+        detail=True,
+        methods=["GET"],
+        url_path="comments",
+        serializer_class=PostCommentSerializer,
+    )
+    def comments(self, request, pk=None):
+        """
+        Endpoint for listing the comments of a post, newest first
+        example: api/posts/pk/comments/
+        """
+        pk = self._pk_to_int(pk)
+        return self._paginate_sub_resource(
+            pk,
+            Comment.objects.filter(post_id=pk).select_related("author"),
+            CommentPagination(),
+            PostCommentSerializer,
+        )
+
     @action(
         detail=True,
         methods=["POST"],
@@ -136,38 +278,236 @@ class PostViewSet(viewsets.ModelViewSet):
         serializer = self.get_serializer(comment, data=request.data)
 
         serializer.is_valid(raise_exception=True)
-        serializer.save()
+        with transaction.atomic():
+            serializer.save()
+            invalidate_post_detail(comment.id)
 
         return Response(serializer.data, status=status.HTTP_200_OK)
 
+    @action(
+        detail=False,
+        methods=["GET"],
+        url_path="cache_stats",
+        permission_classes=[IsAdminUser],
+    )
+    def cache_stats(self, request):
+        """
+        Endpoint with hit/miss counters of the post detail cache
+        example: api/posts/cache_stats/
+        """
+        return Response(get_stats(), status=status.HTTP_200_OK)
+
+    def retrieve(self, request, *args, **kwargs):
+        def compute():
+            # A lagging replica could otherwise be cached under the version
+            # that invalidated it.
+            with use_primary():
+                response = super(PostViewSet, self).retrieve(
+                    request, *args, **kwargs
+                )
+            return response.data
+
+        data, hit = get_or_compute_post_detail(
+            self._pk_to_int(kwargs["pk"]), compute
+        )
+        return Response(data, headers={"X-Cache": "HIT" if hit else "MISS"})
+
     def perform_create(self, serializer):
-        serializer.save(author=self.request.user)
+        with transaction.atomic():
+            post = serializer.save(author=self.request.user)
+            fan_out_post(post)
+
+    def perform_update(self, serializer):
+        with transaction.atomic():
+            post = serializer.save()
+            invalidate_post_detail(post.id)
+
+    def perform_destroy(self, instance):
+        with transaction.atomic():
+            invalidate_post_detail(instance.id)
+            instance.delete()
+
+
+class FeedViewSet(viewsets.GenericViewSet):
+    serializer_class = PostListSerializer
+    pagination_class = FeedPagination
+    permission_classes = (IsAuthenticated,)
+
+    def list(self, request):
+        """
+        Endpoint for the home timeline of posts from followed users
+        example: api/social_media/feed/
+        """
+        posts = self.paginator.paginate_feed(request, request.user)
+        serializer = self.get_serializer(posts, many=True)
+        return self.get_paginated_response(serializer.data)
+
+
+class SearchViewSet(viewsets.GenericViewSet):
+    serializer_class = SearchResultSerializer
+    pagination_class = SearchPagination
+    permission_classes = (IsAuthenticatedOrReadOnly,)
 
+    def list(self, request):
+        """
+        Endpoint for full-text search over posts and comments, best first
+        example: api/social_media/search/?q=django&author=1&hashtags=1,2
+        """
+        author = request.query_params.get("author")
+        hashtags = request.query_params.get("hashtags")
+        try:
+            author_id = int(author) if author else None
+            hashtag_ids = (
+                PostViewSet._params_to_int(hashtags) if hashtags else None
+            )
+        except ValueError:
+            raise ValidationError(
+                {"detail": "author and hashtags must be numeric ids."}
+            )
+
+        hits = self.paginator.paginate_search(
+            request, request.query_params.get("q", ""), author_id, hashtag_ids
+        )
+        serializer = self.get_serializer(hits, many=True)
+        return self.get_paginated_response(serializer.data)
+
+
+class LikeViewSet(viewsets.GenericViewSet):
+    serializer_class = LikeBatchSerializer
+    permission_classes = (IsAuthenticated,)
+
+    @action(
+        detail=False,
+        methods=["POST"],
+        url_path="batch",
+    )
+    def batch(self, request):
+        """
+        Endpoint for liking and unliking many posts in one request
+        example: api/social_media/likes/batch/
+        """
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
 
-class CommentPagination(PageNumberPagination):
+        results = batch_update_likes(
+            request.user.id,
+            serializer.validated_data["like"],
+            serializer.validated_data["unlike"],
+        )
+        return Response({"results": results}, status=status.HTTP_200_OK)
+
+    @action(
+        detail=False,
+        methods=["GET"],
+        url_path="state",
+    )
+    def state(self, request):
+        """
+        Endpoint for checking which of the given posts the user liked
+        example: api/social_media/likes/state/?posts=1,2,3
+        """
+        posts = request.query_params.get("posts", "")
+        try:
+            post_ids = list(
+                dict.fromkeys(int(str_id) for str_id in posts.split(","))
+            )
+        except ValueError:
+            raise ValidationError(
+                {"posts": "Expected a comma separated list of post ids."}
+            )
+        if len(post_ids) > settings.LIKE_BATCH_MAX_POSTS:
+            raise ValidationError(
+                {
+                    "posts": "At most "
+                    f"{settings.LIKE_BATCH_MAX_POSTS} posts can be checked."
+                }
+            )
+
+        liked = liked_post_ids(request.user.id, post_ids)
+        return Response(
+            {
+                "results": [
+                    {"post": post_id, "liked": post_id in liked}
+                    for post_id in post_ids
+                ]
+            },
+            status=status.HTTP_200_OK,
+        )
+
+
+class CommentPagination(CursorOrPageNumberPagination):
     page_size = 10
     max_page_size = 100
 
 
-class CommentViewSet(viewsets.ModelViewSet):
+class CommentViewSet(ReplicaReadMixin, viewsets.ModelViewSet):
     queryset = Comment.objects.select_related(
         "author",
-        "post",
+        "post__author",
     )
     serializer_class = CommentSerializer
-    pagination_class = PostPagination
+    pagination_class = CommentPagination
     permission_classes = (
         IsAuthenticatedOrReadOnly,
         IsAuthorOrReadOnly,
     )
 
     def get_serializer_class(self):
-        if self.action == "list":
+        if self.action in ("list", "thread"):
             return CommentListSerializer
         if self.action == "retrieve":
             return CommentDetailSerializer
+        if self.action == "upload_image":
+            return CommentImageSerializer
         return CommentSerializer
 
+    @staticmethod
+    def filter_by_params(queryset, query_params):
+        """Apply the post filter of the comment list query string."""
+        post = query_params.get("post")
+        if post:
+            if not post.isdigit():
+                raise ValidationError({"post": "Expected a post id."})
+            queryset = queryset.filter(post_id=int(post))
+        return queryset
+
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        if self.action == "list":
+            queryset = self.filter_by_params(
+                queryset, self.request.query_params
+            )
+        return queryset
+
+    @action(
+        detail=True,
+        methods=["GET"],
+        url_path="thread",
+        pagination_class=ThreadPagination,
+    )
+    def thread(self, request, pk=None):
+        """
+        Endpoint for a comment with all of its nested replies, each reply
+        right after its parent, loaded as one range of the path index
+        example: api/social_media/comments/pk/thread/
+        """
+        path = None
+        if str(pk).isdigit():
+            path = (
+                Comment.objects.filter(pk=int(pk))
+                .values_list("path", flat=True)
+                .first()
+            )
+        if path is None:
+            raise NotFound("No Comment matches the given query.")
+
+        queryset = Comment.objects.filter(
+            **subtree_lookup(path)
+        ).select_related("author", "post")
+        page = self.paginate_queryset(queryset)
+        serializer = self.get_serializer(page, many=True)
+        return self.get_paginated_response(serializer.data)
+
     @action(
         detail=True,
         methods=["POST"],
@@ -188,4 +528,24 @@ class CommentViewSet(viewsets.ModelViewSet):
         return Response(serializer.data, status=status.HTTP_200_OK)
 
     def perform_create(self, serializer):
-        serializer.save(author=self.request.user)
+        with transaction.atomic():
+            comment = serializer.save(author=self.request.user)
+            increment_post_counter(comment.post_id, "comments_count")
+            invalidate_post_detail(comment.post_id)
+
+    def perform_update(self, serializer):
+        previous_post_id = serializer.instance.post_id
+        with transaction.atomic():
+            comment = serializer.save()
+            if comment.post_id != previous_post_id:
+                increment_post_counter(previous_post_id, "comments_count", -1)
+                increment_post_counter(comment.post_id, "comments_count")
+            invalidate_post_detail(previous_post_id, comment.post_id)
+
+    def perform_destroy(self, instance):
+        with transaction.atomic():
+            deleted = delete_subtree(instance)
+            increment_post_counter(
+                instance.post_id, "comments_count", -deleted
+            )
+            invalidate_post_detail(instance.post_id)
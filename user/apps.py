@@ -4,3 +4,10 @@ from django.apps import AppConfig
 class UserConfig(AppConfig):
     default_auto_field = "django.db.models.BigAutoField"
     name = "user"
+
+    def ready(self):
+        import user.checks  # noqa: F401
+        import user.signals  # noqa: F401
+        from py_social_media_api.images import register
+
+        register(self.get_model("User"), "avatar")
@@ -0,0 +1,9 @@
+from django.urls import path
+
+from user.async_views import user_detail
+
+app_name = "user_async"
+
+urlpatterns = [
+    path("<int:pk>/", user_detail, name="user-detail"),
+]
@@ -0,0 +1,20 @@
+from django.contrib.auth import get_user_model
+from rest_framework.exceptions import NotFound
+
+from py_social_media_api.async_api import async_api_view
+from user.serializers import UserDetailSerializer
+from user.views import with_follow_previews
+
+
+@async_api_view
+async def user_detail(request, pk):
+    """
+    Endpoint for a user with follow previews on the async read path
+    example: api/async/users/pk/
+    """
+    user = await with_follow_previews(
+        get_user_model().objects.filter(pk=pk)
+    ).afirst()
+    if user is None:
+        raise NotFound("No User matches the given query.")
+    return UserDetailSerializer(user, context={"request": request}).data, {}
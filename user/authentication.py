@@ -0,0 +1,206 @@
+import threading
+import time
+from collections import OrderedDict
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.contrib.auth.models import AnonymousUser
+from django.core.cache import cache
+from django.db import transaction
+from django.utils.translation import gettext_lazy as _
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import (
+    AuthenticationFailed,
+    InvalidToken,
+)
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.utils import get_md5_hash_password
+
+
+def _version_key(user_id):
+    return f"auth-user:{user_id}:version"
+
+
+def _data_key(user_id, version):
+    return f"auth-user:{user_id}:v{version}"
+
+
+def _fresh_version():
+    # Same scheme as the post detail cache: an evicted version key can never
+    # be recreated with a value a stale entry was stored under.
+    return time.time_ns()
+
+
+def get_version(user_id):
+    key = _version_key(user_id)
+    version = cache.get(key)
+    if version is None:
+        cache.add(key, _fresh_version(), timeout=None)
+        version = cache.get(key)
+    return version
+
+
+def bump_version(user_id):
+    try:
+        cache.incr(_version_key(user_id))
+    except ValueError:
+        cache.set(_version_key(user_id), _fresh_version(), timeout=None)
+    local_users.discard(user_id)
+
+
+def invalidate_cached_user(user_id):
+    """
+    Drop the cached user now and again once the current transaction commits,
+    in case a concurrent request re-cached the old row in between.
+    """
+    bump_version(user_id)
+    transaction.on_commit(lambda: bump_version(user_id))
+
+
+class LocalUserCache:
+    """Thread-safe LRU of (version, expiry, user) entries for one process."""
+
+    def __init__(self):
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+
+    def get(self, user_id, version):
+        with self.lock:
+            entry = self.entries.get(user_id)
+            if entry is None:
+                return None
+            if entry[0] != version or entry[1] < time.monotonic():
+                del self.entries[user_id]
+                return None
+            self.entries.move_to_end(user_id)
+            return entry[2]
+
+    def set(self, user_id, version, user):
+        config = settings.JWT_USER_CACHE
+        # Without a shared cache other processes never see the version bump.
+        timeout = config[
+            "TIMEOUT" if settings.SHARED_CACHE else "LOCAL_TIMEOUT"
+        ]
+        with self.lock:
+            self.entries[user_id] = (
+                version,
+                time.monotonic() + timeout,
+                user,
+            )
+            self.entries.move_to_end(user_id)
+            while len(self.entries) > config["MAX_SIZE"]:
+                self.entries.popitem(last=False)
+
+    def discard(self, user_id):
+        with self.lock:
+            self.entries.pop(user_id, None)
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+
+
+local_users = LocalUserCache()
+
+
+def fresh_instance(user):
+    """
+    Build a new instance from the field values of a cached user. Unlike a
+    shallow copy it shares no _state, so related objects cached on it by
+    one request never leak into another.
+    """
+    fields = type(user)._meta.concrete_fields
+    return type(user).from_db(
+        user._state.db,
+        [field.attname for field in fields],
+        [getattr(user, field.attname) for field in fields],
+    )
+
+
+class CachedJWTAuthentication(JWTAuthentication):
+    """
+    JWTAuthentication that resolves the token's user from a short-lived
+    in-process cache, optionally backed by the shared Django cache, instead
+    of querying the database on every request. Entries are keyed by a
+    per-user version stamp that is bumped whenever the user is saved or
+    deleted, so password changes and deactivations apply immediately. The
+    version stamps live in the default cache; when that is not shared by
+    every process, entries expire after the short LOCAL_TIMEOUT instead.
+    """
+
+    def get_cached_user(self, user_id):
+        config = settings.JWT_USER_CACHE
+        if not config["ENABLED"]:
+            return self.user_model.objects.filter(
+                **{api_settings.USER_ID_FIELD: user_id}
+            ).first()
+
+        version = get_version(user_id)
+        user = local_users.get(user_id, version)
+
+        if user is None and config["SHARED"]:
+            user = cache.get(_data_key(user_id, version))
+            if user is not None:
+                local_users.set(user_id, version, user)
+
+        if user is None:
+            user = self.user_model.objects.filter(
+                **{api_settings.USER_ID_FIELD: user_id}
+            ).first()
+            if user is None:
+                return None
+            local_users.set(user_id, version, user)
+            if config["SHARED"]:
+                cache.set(
+                    _data_key(user_id, version), user, config["TIMEOUT"]
+                )
+
+        # Views may modify request.user, so never hand out the cached one.
+        return fresh_instance(user)
+
+    def get_user(self, validated_token):
+        try:
+            user_id = validated_token[api_settings.USER_ID_CLAIM]
+        except KeyError:
+            raise InvalidToken(
+                _("Token contained no recognizable user identification")
+            )
+
+        user = self.get_cached_user(user_id)
+        if user is None:
+            raise AuthenticationFailed(
+                _("User not found"), code="user_not_found"
+            )
+
+        if not user.is_active:
+            raise AuthenticationFailed(
+                _("User is inactive"), code="user_inactive"
+            )
+
+        if api_settings.CHECK_REVOKE_TOKEN:
+            if validated_token.get(
+                api_settings.REVOKE_TOKEN_CLAIM
+            ) != get_md5_hash_password(user.password):
+                raise AuthenticationFailed(
+                    _("The user's password has been changed."),
+                    code="password_changed",
+                )
+
+        return user
+
+
+async def aauthenticate(request):
+    """
+    Resolve the JWT user of a plain async Django view the way
+    CachedJWTAuthentication does for DRF views. Requests without credentials
+    get AnonymousUser; bad credentials raise the simplejwt exceptions.
+    """
+    authentication = CachedJWTAuthentication()
+    header = authentication.get_header(request)
+    if header is None:
+        return AnonymousUser()
+    raw_token = authentication.get_raw_token(header)
+    if raw_token is None:
+        return AnonymousUser()
+    validated_token = authentication.get_validated_token(raw_token)
+    return await sync_to_async(authentication.get_user)(validated_token)
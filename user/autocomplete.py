@@ -0,0 +1,236 @@
+import threading
+import time
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+
+from user.models import fold_nickname
+
+GENERATION_KEY = "nickname-index:generation"
+# Sorts after every character, so prefix + LAST_CHAR bounds a prefix range.
+LAST_CHAR = chr(0x10FFFF)
+
+
+def prefix_lookup(prefix):
+    """
+    Filter matching users whose nickname starts with prefix, ignoring case.
+    The range lets the nickname_folded index serve it; startswith keeps the
+    match exact under any collation.
+    """
+    folded = fold_nickname(prefix)
+    return {
+        "nickname_folded__startswith": folded,
+        "nickname_folded__gte": folded,
+        "nickname_folded__lt": folded + LAST_CHAR,
+    }
+
+
+def _fresh_generation():
+    return time.time_ns()
+
+
+def get_generation():
+    generation = cache.get(GENERATION_KEY)
+    if generation is None:
+        cache.add(GENERATION_KEY, _fresh_generation(), timeout=None)
+        generation = cache.get(GENERATION_KEY)
+    return generation
+
+
+def bump_generation():
+    """Tell every process a nickname changed; returns the new value."""
+    try:
+        return cache.incr(GENERATION_KEY)
+    except ValueError:
+        generation = _fresh_generation()
+        cache.set(GENERATION_KEY, generation, timeout=None)
+        return generation
+
+
+class TrieNode:
+    __slots__ = ("children", "users")
+
+    def __init__(self):
+        self.children = {}
+        # user id -> nickname of the users whose folded nickname ends here
+        self.users = {}
+
+
+class NicknameTrie:
+    """Prefix tree of case-folded nicknames."""
+
+    def __init__(self):
+        self.root = TrieNode()
+
+    def insert(self, folded, user_id, nickname):
+        node = self.root
+        for char in folded:
+            node = node.children.setdefault(char, TrieNode())
+        node.users[user_id] = nickname
+
+    def remove(self, folded, user_id):
+        nodes = [self.root]
+        for char in folded:
+            node = nodes[-1].children.get(char)
+            if node is None:
+                return
+            nodes.append(node)
+        nodes[-1].users.pop(user_id, None)
+        # Drop the branch nodes left without users or children.
+        for depth in range(len(folded), 0, -1):
+            if nodes[depth].users or nodes[depth].children:
+                break
+            del nodes[depth - 1].children[folded[depth - 1]]
+
+    def search(self, prefix, limit):
+        """
+        Up to limit (user id, nickname) pairs whose folded nickname starts
+        with prefix, in folded nickname order and then by id.
+        """
+        node = self.root
+        for char in prefix:
+            node = node.children.get(char)
+            if node is None:
+                return []
+        results = []
+        stack = [node]
+        while stack and len(results) < limit:
+            node = stack.pop()
+            results.extend(sorted(node.users.items())[: limit - len(results)])
+            stack.extend(
+                node.children[char]
+                for char in sorted(node.children, reverse=True)
+            )
+        return results
+
+
+class NicknameIndex:
+    """
+    Process-local trie of the nicknames of active users for autocomplete,
+    so prefix lookups never query the database. The trie is built from the
+    nickname_folded column on first use and kept current with this
+    process's own user changes. Changes made by other processes are picked
+    up by a rebuild, at most once every SYNC_INTERVAL seconds. Without a
+    shared cache they cannot be signalled, so the trie is then rebuilt
+    every SYNC_INTERVAL seconds.
+
+    A rebuild loads the new trie without holding the lock, so searches keep
+    using the current one until it is swapped in. Changes recorded in the
+    meantime are replayed on the new trie.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        # Held by the one thread loading a new trie.
+        self.build_lock = threading.Lock()
+        self.clear()
+
+    def clear(self):
+        self.trie = None
+        self.folded = {}
+        self.generation = None
+        self.built_at = 0
+        # Changes recorded while a rebuild is loading, or None.
+        self.pending = None
+
+    def is_stale(self, generation):
+        if self.trie is None:
+            return True
+        changed = generation != self.generation or not settings.SHARED_CACHE
+        interval = settings.NICKNAME_AUTOCOMPLETE["SYNC_INTERVAL"]
+        return changed and time.monotonic() - self.built_at >= interval
+
+    def load(self):
+        trie, folded = NicknameTrie(), {}
+        rows = (
+            get_user_model()
+            .objects.filter(is_active=True)
+            .values_list("id", "nickname", "nickname_folded")
+        )
+        for user_id, nickname, nickname_folded in rows.iterator(
+            chunk_size=5000
+        ):
+            trie.insert(nickname_folded, user_id, nickname)
+            folded[user_id] = nickname_folded
+        return trie, folded
+
+    def rebuild(self):
+        # Read first: a change published while loading triggers another.
+        generation = get_generation()
+        with self.lock:
+            self.pending = []
+        try:
+            trie, folded = self.load()
+        except Exception:
+            with self.lock:
+                self.pending = None
+            raise
+        with self.lock:
+            self.trie, self.folded = trie, folded
+            for user_id, nickname, is_active in self.pending:
+                self._apply(user_id, nickname, is_active)
+            self.pending = None
+            self.generation = generation
+            self.built_at = time.monotonic()
+
+    def refresh(self):
+        if not self.is_stale(get_generation()):
+            return
+        # Only the very first build makes searches wait; later ones keep
+        # serving the current trie while another thread rebuilds it.
+        if not self.build_lock.acquire(blocking=self.trie is None):
+            return
+        try:
+            if self.is_stale(get_generation()):
+                self.rebuild()
+        finally:
+            self.build_lock.release()
+
+    def search(self, prefix, limit=None):
+        self.refresh()
+        limit = limit or settings.NICKNAME_AUTOCOMPLETE["LIMIT"]
+        with self.lock:
+            matches = self.trie.search(fold_nickname(prefix), limit)
+        return [
+            {"id": user_id, "nickname": nickname}
+            for user_id, nickname in matches
+        ]
+
+    def update(self, user_id, nickname, is_active):
+        """Record a committed user change here and tell other processes."""
+        with self.lock:
+            self._record(user_id, nickname, is_active)
+        self.publish()
+
+    def discard(self, user_id):
+        with self.lock:
+            self._record(user_id, None, False)
+        self.publish()
+
+    def _record(self, user_id, nickname, is_active):
+        if self.pending is not None:
+            self.pending.append((user_id, nickname, is_active))
+        if self.trie is not None:
+            self._apply(user_id, nickname, is_active)
+
+    def _apply(self, user_id, nickname, is_active):
+        folded = self.folded.pop(user_id, None)
+        if folded is not None:
+            self.trie.remove(folded, user_id)
+        if is_active:
+            folded = fold_nickname(nickname)
+            self.trie.insert(folded, user_id, nickname)
+            self.folded[user_id] = folded
+
+    def publish(self):
+        generation = bump_generation()
+        with self.lock:
+            # Nobody else wrote in between, so there is nothing to rebuild.
+            if self.generation is not None and generation == (
+                self.generation + 1
+            ):
+                self.generation = generation
+
+
+nickname_index = NicknameIndex()
@@ -0,0 +1,197 @@
+import hashlib
+import math
+import threading
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.utils import timezone
+from rest_framework_simplejwt.token_blacklist.models import (
+    BlacklistedToken,
+    OutstandingToken,
+)
+
+GENERATION_KEY = "token-blacklist:generation"
+
+
+class BloomFilter:
+    """
+    Fixed-size Bloom filter: membership tests may give false positives at
+    roughly error_rate once capacity items are added, never false negatives.
+    """
+
+    def __init__(self, capacity, error_rate):
+        self.capacity = max(capacity, 1)
+        self.size = max(
+            math.ceil(
+                -self.capacity * math.log(error_rate) / math.log(2) ** 2
+            ),
+            8,
+        )
+        self.hashes = max(round(self.size / self.capacity * math.log(2)), 1)
+        self.bits = bytearray((self.size + 7) // 8)
+        self.count = 0
+
+    def _positions(self, item):
+        digest = hashlib.blake2b(item.encode(), digest_size=16).digest()
+        first = int.from_bytes(digest[:8], "big")
+        second = int.from_bytes(digest[8:], "big") | 1
+        return (
+            (first + index * second) % self.size
+            for index in range(self.hashes)
+        )
+
+    def add(self, item):
+        for position in self._positions(item):
+            self.bits[position >> 3] |= 1 << (position & 7)
+        self.count += 1
+
+    def __contains__(self, item):
+        return all(
+            self.bits[position >> 3] & (1 << (position & 7))
+            for position in self._positions(item)
+        )
+
+
+def _fresh_generation():
+    return time.time_ns()
+
+
+def get_generation():
+    generation = cache.get(GENERATION_KEY)
+    if generation is None:
+        cache.add(GENERATION_KEY, _fresh_generation(), timeout=None)
+        generation = cache.get(GENERATION_KEY)
+    return generation
+
+
+def bump_generation():
+    """Tell every process a JTI was blacklisted; returns the new value."""
+    try:
+        return cache.incr(GENERATION_KEY)
+    except ValueError:
+        generation = _fresh_generation()
+        cache.set(GENERATION_KEY, generation, timeout=None)
+        return generation
+
+
+class BlacklistFilter:
+    """
+    Process-local Bloom filter of blacklisted refresh token JTIs. A JTI that
+    is not in the filter is certainly not blacklisted, so only the rare
+    positives need the database check. The filter is built on first use and
+    then synced incrementally whenever another process signals a new entry
+    through the shared cache, or at least every SYNC_INTERVAL seconds.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.clear()
+
+    def clear(self):
+        self.filter = None
+        self.generation = None
+        self.synced_at = None
+        self.checked_at = 0
+
+    def _load(self, since=None):
+        # Entries are read back with an overlap because a row is timestamped
+        # before its transaction commits.
+        config = settings.TOKEN_BLACKLIST_FILTER
+        started = timezone.now()
+        rows = BlacklistedToken.objects.filter(
+            token__expires_at__gt=started
+        )
+        if since is not None:
+            rows = rows.filter(
+                blacklisted_at__gte=since
+                - timedelta(seconds=config["SYNC_OVERLAP"])
+            )
+        jtis = list(rows.values_list("token__jti", flat=True))
+        return started, jtis
+
+    def rebuild(self):
+        config = settings.TOKEN_BLACKLIST_FILTER
+        synced_at, jtis = self._load()
+        bloom = BloomFilter(
+            max(len(jtis) * 2, config["MIN_CAPACITY"]), config["ERROR_RATE"]
+        )
+        for jti in jtis:
+            bloom.add(jti)
+        self.filter, self.synced_at = bloom, synced_at
+
+    def sync(self):
+        self.synced_at, jtis = self._load(self.synced_at)
+        for jti in jtis:
+            self.filter.add(jti)
+
+    def refresh(self):
+        generation = get_generation()
+        interval = settings.TOKEN_BLACKLIST_FILTER["SYNC_INTERVAL"]
+        with self.lock:
+            if self.filter is None or self.filter.count > self.filter.capacity:
+                self.rebuild()
+            elif (
+                generation != self.generation
+                or time.monotonic() - self.checked_at > interval
+            ):
+                self.sync()
+            else:
+                return
+            self.generation = generation
+            self.checked_at = time.monotonic()
+
+    def might_contain(self, jti):
+        if not settings.TOKEN_BLACKLIST_FILTER["ENABLED"]:
+            # Entries of other processes would go unnoticed without a
+            # shared cache, so leave every check to the database.
+            return True
+        self.refresh()
+        return jti in self.filter
+
+    def add(self, jti):
+        """Record a new blacklist entry here and, after commit, elsewhere."""
+        with self.lock:
+            if self.filter is not None:
+                self.filter.add(jti)
+        transaction.on_commit(self.publish)
+
+    def publish(self):
+        generation = bump_generation()
+        with self.lock:
+            # Nobody else wrote in between, so there is nothing to sync.
+            if self.generation is not None and generation == (
+                self.generation + 1
+            ):
+                self.generation = generation
+
+
+blacklisted_jtis = BlacklistFilter()
+
+
+def compact_tokens(batch_size=1000, now=None):
+    """
+    Delete expired outstanding tokens together with their blacklist entries
+    in batches of batch_size, so no single statement locks the tables for
+    long. Returns the number of deleted outstanding tokens.
+
+    The tables belong to simplejwt and SQLite has no table partitioning, so
+    expiry is kept by the expires_at index instead of per-period tables:
+    each batch is the oldest range of that index.
+    """
+    now = now or timezone.now()
+    deleted = 0
+    while True:
+        with transaction.atomic():
+            ids = list(
+                OutstandingToken.objects.filter(expires_at__lte=now)
+                .order_by("expires_at")
+                .values_list("id", flat=True)[:batch_size]
+            )
+            if not ids:
+                return deleted
+            BlacklistedToken.objects.filter(token_id__in=ids).delete()
+            OutstandingToken.objects.filter(id__in=ids).delete()
+        deleted += len(ids)
@@ -0,0 +1,23 @@
+from django.conf import settings
+from django.core.checks import Warning, register
+
+
+@register()
+def check_shared_cache(app_configs, **kwargs):
+    """
+    The token blacklist filter invalidates other processes through the
+    default cache, which must therefore be shared by all of them. The user
+    cache falls back to a short timeout instead.
+    """
+    if settings.SHARED_CACHE or not settings.TOKEN_BLACKLIST_FILTER["ENABLED"]:
+        return []
+    return [
+        Warning(
+            "TOKEN_BLACKLIST_FILTER is enabled but the default cache is "
+            "local to each process, so tokens blacklisted by other workers "
+            "go unnoticed.",
+            hint="Set CACHE_BACKEND to a cache shared by every worker, "
+            "such as Redis or Memcached, or run a single process.",
+            id="user.W001",
+        )
+    ]
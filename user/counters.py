@@ -0,0 +1,58 @@
+from django.contrib.auth import get_user_model
+from django.db.models import Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+from py_social_media_api.db import shift_counter, shifted
+from user.authentication import invalidate_cached_user
+from user.models import Follow
+
+
+def shift_follow_counters(follower_id, following_id, delta):
+    """
+    Atomically shift following_count of the follower and followers_count of
+    the followed user, returning the latter. Must be called inside the
+    transaction that changed the Follow row; counters never go below zero.
+    """
+    User = get_user_model()
+    # The raw UPDATE sends no post_save, so drop the cached users here.
+    invalidate_cached_user(follower_id)
+    invalidate_cached_user(following_id)
+    shift_counter(User, follower_id, "following_count", delta)
+    return shift_counter(User, following_id, "followers_count", delta)
+
+
+def release_follow_counters(user):
+    """
+    Decrement the counters of everyone connected to a user that is about to
+    be deleted, since the cascade removes the Follow rows without them.
+    """
+    User = get_user_model()
+    User.objects.filter(following__following=user).update(
+        following_count=shifted("following_count", -1)
+    )
+    User.objects.filter(followers__follower=user).update(
+        followers_count=shifted("followers_count", -1)
+    )
+
+
+def _count_subquery(field):
+    return Coalesce(
+        Subquery(
+            Follow.objects.filter(**{field: OuterRef("pk")})
+            .order_by()
+            .values(field)
+            .annotate(total=Count("pk"))
+            .values("total")
+        ),
+        0,
+    )
+
+
+def recount_follow_counters(queryset=None):
+    """Recompute followers_count/following_count from the Follow table."""
+    if queryset is None:
+        queryset = get_user_model().objects.all()
+    return queryset.update(
+        followers_count=_count_subquery("following"),
+        following_count=_count_subquery("follower"),
+    )
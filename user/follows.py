@@ -0,0 +1,107 @@
+from django.contrib.auth import get_user_model
+from django.db import transaction
+from rest_framework.exceptions import NotFound, ValidationError
+
+from py_social_media_api.db import insert_ignore
+from user.authentication import invalidate_cached_user
+from social_media.feed import backfill_timelines, prune_timeline
+from user.counters import recount_follow_counters, shift_follow_counters
+from user.models import Follow
+
+
+def _followers_count(follower_id, following_id, changed, delta):
+    if changed:
+        followers_count = shift_follow_counters(
+            follower_id, following_id, delta
+        )
+    else:
+        followers_count = (
+            get_user_model()
+            .objects.filter(id=following_id)
+            .values_list("followers_count", flat=True)
+            .first()
+        )
+    if followers_count is None:
+        raise NotFound("No User matches the given query.")
+    return followers_count
+
+
+def follow_user(follower_id, following_id):
+    """
+    Idempotently follow a user with one conflict-ignoring insert plus the
+    counter updates. Returns the resulting state and whether a new follow
+    was created.
+    """
+    if follower_id == following_id:
+        raise ValidationError("You cannot follow yourself.")
+    with transaction.atomic():
+        inserted = insert_ignore(
+            Follow, follower_id=follower_id, following_id=following_id
+        )
+        followers_count = _followers_count(
+            follower_id, following_id, inserted, 1
+        )
+        if inserted:
+            backfill_timelines(follower_id, [following_id])
+    state = {"following": True, "followers_count": followers_count}
+    return state, bool(inserted)
+
+
+def unfollow_user(follower_id, following_id):
+    """Idempotently unfollow a user with one delete plus the counters."""
+    with transaction.atomic():
+        deleted, _ = Follow.objects.filter(
+            follower_id=follower_id, following_id=following_id
+        ).delete()
+        followers_count = _followers_count(
+            follower_id, following_id, deleted, -deleted
+        )
+        if deleted:
+            prune_timeline(follower_id, following_id)
+    return {"following": False, "followers_count": followers_count}
+
+
+def batch_follow(follower_id, following_ids):
+    """
+    Follow many users at once with one bulk insert and one recount of the
+    affected users. Ids of missing users and the follower itself are
+    ignored. Returns the resulting state of every existing followed user.
+    """
+    User = get_user_model()
+    with transaction.atomic():
+        following_ids = set(
+            User.objects.filter(id__in=following_ids)
+            .exclude(id=follower_id)
+            .values_list("id", flat=True)
+        )
+        already_following = set(
+            Follow.objects.filter(
+                follower_id=follower_id, following_id__in=following_ids
+            ).values_list("following_id", flat=True)
+        )
+        Follow.objects.bulk_create(
+            [
+                Follow(follower_id=follower_id, following_id=following_id)
+                for following_id in following_ids - already_following
+            ],
+            ignore_conflicts=True,
+        )
+        recount_follow_counters(
+            User.objects.filter(id__in=following_ids | {follower_id})
+        )
+        for user_id in following_ids | {follower_id}:
+            invalidate_cached_user(user_id)
+        backfill_timelines(follower_id, following_ids - already_following)
+        counts = dict(
+            User.objects.filter(id__in=following_ids).values_list(
+                "id", "followers_count"
+            )
+        )
+    return [
+        {
+            "user": following_id,
+            "following": True,
+            "followers_count": counts[following_id],
+        }
+        for following_id in sorted(following_ids)
+    ]
@@ -0,0 +1,24 @@
+from django.core.management.base import BaseCommand
+
+from user.blacklist import compact_tokens
+
+
+class Command(BaseCommand):
+    help = (
+        "Delete expired outstanding refresh tokens and their blacklist "
+        "entries in batches"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=1000,
+            help="Number of expired tokens deleted per transaction",
+        )
+
+    def handle(self, *args, **options):
+        deleted = compact_tokens(batch_size=options["batch_size"])
+        self.stdout.write(
+            self.style.SUCCESS(f"Deleted {deleted} expired token(s)")
+        )
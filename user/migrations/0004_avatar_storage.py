@@ -0,0 +1,23 @@
+# Generated by Django 5.0.1 on 2026-10-18 03:21
+
+import path_creator
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("user", "0003_avatar_variants"),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name="user",
+            name="avatar",
+            field=models.ImageField(
+                blank=True,
+                null=True,
+                storage=path_creator.image_storage,
+                upload_to=path_creator.image_file_path,
+            ),
+        ),
+    ]
@@ -0,0 +1,47 @@
+# Generated by Django 5.0.1 on 2026-10-18 03:28
+
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+
+def populate_counters(apps, schema_editor):
+    User = apps.get_model("user", "User")
+    Follow = apps.get_model("user", "Follow")
+
+    def count_subquery(field):
+        return Coalesce(
+            Subquery(
+                Follow.objects.filter(**{field: OuterRef("pk")})
+                .order_by()
+                .values(field)
+                .annotate(total=Count("pk"))
+                .values("total")
+            ),
+            0,
+        )
+
+    User.objects.update(
+        followers_count=count_subquery("following"),
+        following_count=count_subquery("follower"),
+    )
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("user", "0004_avatar_storage"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="user",
+            name="followers_count",
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name="user",
+            name="following_count",
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.RunPython(populate_counters, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,24 @@
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+    # The token tables belong to simplejwt, so their indexes are created
+    # here: compact_token_blacklist scans outstanding tokens by expiry and
+    # the blacklist filter syncs recent entries by blacklisted_at.
+    dependencies = [
+        ("user", "0005_follow_counters"),
+        ("token_blacklist", "0012_alter_outstandingtoken_user"),
+    ]
+
+    operations = [
+        migrations.RunSQL(
+            "CREATE INDEX outstanding_token_expires_idx "
+            "ON token_blacklist_outstandingtoken (expires_at)",
+            "DROP INDEX outstanding_token_expires_idx",
+        ),
+        migrations.RunSQL(
+            "CREATE INDEX blacklisted_token_time_idx "
+            "ON token_blacklist_blacklistedtoken (blacklisted_at)",
+            "DROP INDEX blacklisted_token_time_idx",
+        ),
+    ]
@@ -0,0 +1,35 @@
+# Generated by Django 5.0.1 on 2026-10-18 04:31
+
+from django.db import migrations, models
+
+
+def populate_folded_nicknames(apps, schema_editor):
+    User = apps.get_model("user", "User")
+    batch = []
+    for user in User.objects.only("id", "nickname").iterator(chunk_size=1000):
+        user.nickname_folded = user.nickname.casefold()
+        batch.append(user)
+        if len(batch) == 1000:
+            User.objects.bulk_update(batch, ["nickname_folded"])
+            batch = []
+    User.objects.bulk_update(batch, ["nickname_folded"])
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("user", "0007_follow_indexes"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="user",
+            name="nickname_folded",
+            field=models.CharField(
+                db_index=True, default="", editable=False, max_length=255
+            ),
+            preserve_default=False,
+        ),
+        migrations.RunPython(
+            populate_folded_nicknames, migrations.RunPython.noop
+        ),
+    ]
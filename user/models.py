@@ -1,7 +1,12 @@
 from django.contrib.auth.models import AbstractUser, BaseUserManager
 from django.db import models
 from django.utils.translation import gettext_lazy as _
-from path_creator import image_file_path
+from path_creator import image_file_path, image_storage
+
+
+def fold_nickname(nickname):
+    """Case-folded form of a nickname used for case-insensitive lookups."""
+    return nickname.casefold()
 
 
 class UserManager(BaseUserManager):
@@ -42,26 +47,62 @@ class User(AbstractUser):
     username = None
     email = models.EmailField(_("email address"), unique=True)
     nickname = models.CharField(max_length=64, unique=True)
-    avatar = models.ImageField(null=True, blank=True, upload_to=image_file_path)
+    # Case folding can lengthen a string, e.g. "ß" becomes "ss".
+    nickname_folded = models.CharField(
+        max_length=255, db_index=True, editable=False
+    )
+    avatar = models.ImageField(
+        null=True,
+        blank=True,
+        upload_to=image_file_path,
+        storage=image_storage,
+    )
+    avatar_variants = models.JSONField(default=dict, blank=True)
     biography = models.TextField(blank=True, null=True)
     city = models.CharField(null=True, blank=True, max_length=255)
+    followers_count = models.PositiveIntegerField(default=0)
+    following_count = models.PositiveIntegerField(default=0)
 
     USERNAME_FIELD = "email"
     REQUIRED_FIELDS = []
 
     objects = UserManager()
 
+    def save(self, *args, **kwargs):
+        self.nickname_folded = fold_nickname(self.nickname)
+        update_fields = kwargs.get("update_fields")
+        if update_fields is not None and "nickname" in update_fields:
+            kwargs["update_fields"] = {*update_fields, "nickname_folded"}
+        super().save(*args, **kwargs)
+
 
 class Follow(models.Model):
     follower = models.ForeignKey(
-        User, related_name="following", on_delete=models.CASCADE
+        User,
+        related_name="following",
+        on_delete=models.CASCADE,
+        db_index=False,
     )
     following = models.ForeignKey(
-        User, related_name="followers", on_delete=models.CASCADE
+        User,
+        related_name="followers",
+        on_delete=models.CASCADE,
+        db_index=False,
     )
 
     class Meta:
         unique_together = ("follower", "following")
+        # Follow lists and previews are ordered newest first by id.
+        indexes = [
+            models.Index(
+                fields=["follower", "id"],
+                name="follow_follower_id_idx",
+            ),
+            models.Index(
+                fields=["following", "id"],
+                name="follow_following_id_idx",
+            ),
+        ]
 
     def __str__(self):
         return f"{self.follower} follows {self.following}"
@@ -1,7 +1,13 @@
+from django.conf import settings
 from django.contrib.auth import get_user_model
 from rest_framework import serializers
+from rest_framework_simplejwt.serializers import (
+    TokenRefreshSerializer as BaseTokenRefreshSerializer,
+)
 
+from social_media.serializers import ImageVariantField
 from user.models import Follow
+from user.tokens import RefreshToken
 
 
 class UserSerializer(serializers.ModelSerializer):
@@ -18,8 +24,10 @@ class UserSerializer(serializers.ModelSerializer):
             "biography",
             "city",
             "is_staff",
+            "following_count",
+            "followers_count",
         )
-        read_only_fields = ("is_staff",)
+        read_only_fields = ("is_staff", "following_count", "followers_count")
         extra_kwargs = {
             "password": {"write_only": True, "min_length": 5}}
 
@@ -28,17 +36,21 @@ class UserSerializer(serializers.ModelSerializer):
 
     def update(self, instance, validated_data):
         password = validated_data.pop("password", None)
-        user = super().update(instance, validated_data)
+        for attr, value in validated_data.items():
+            setattr(instance, attr, value)
+        update_fields = list(validated_data)
         if password:
-            user.set_password(password)
-            user.save()
+            instance.set_password(password)
+            update_fields.append("password")
+        # Write only the submitted fields: the instance may be a cached
+        # request.user whose follow counters are already out of date.
+        instance.save(update_fields=update_fields)
 
-        return user
+        return instance
 
 
 class UserListSerializer(UserSerializer):
-    num_following = serializers.IntegerField(read_only=True)
-    num_followers = serializers.IntegerField(read_only=True)
+    avatar = ImageVariantField("avatar")
 
     class Meta:
         model = get_user_model()
@@ -53,17 +65,17 @@ class UserListSerializer(UserSerializer):
             "biography",
             "city",
             "is_staff",
-            "num_following",
-            "num_followers",
+            "following_count",
+            "followers_count",
         )
-        read_only_fields = ("is_staff",)
+        read_only_fields = ("is_staff", "following_count", "followers_count")
         extra_kwargs = {
             "password": {"write_only": True, "min_length": 5}}
 
 
 class UserDetailSerializer(UserSerializer):
-    following = serializers.SerializerMethodField()
-    followers = serializers.SerializerMethodField()
+    following_preview = serializers.SerializerMethodField()
+    followers_preview = serializers.SerializerMethodField()
 
     class Meta:
         model = get_user_model()
@@ -78,30 +90,38 @@ class UserDetailSerializer(UserSerializer):
             "biography",
             "city",
             "is_staff",
-            "following",
-            "followers",
+            "following_count",
+            "followers_count",
+            "following_preview",
+            "followers_preview",
         )
+        read_only_fields = ("is_staff", "following_count", "followers_count")
+        extra_kwargs = {"password": {"write_only": True, "min_length": 5}}
 
     @staticmethod
-    def get_following(obj):
-        return FollowSerializer(
-            obj.following.all(),
-            many=True,
-        ).data
+    def get_following_preview(obj):
+        following = getattr(obj, "preview_following", None)
+        if following is None:
+            following = obj.following.select_related("following").order_by(
+                "-id"
+            )[: settings.USER_DETAIL_PREVIEW["FOLLOWING"]]
+        return FollowSerializer(following, many=True).data
 
     @staticmethod
-    def get_followers(obj):
-        return UserFollowersSerializer(
-            obj.followers.all(),
-            many=True,
-        ).data
+    def get_followers_preview(obj):
+        followers = getattr(obj, "preview_followers", None)
+        if followers is None:
+            followers = obj.followers.select_related("follower").order_by(
+                "-id"
+            )[: settings.USER_DETAIL_PREVIEW["FOLLOWERS"]]
+        return UserFollowersSerializer(followers, many=True).data
 
 
 class FollowSerializer(serializers.ModelSerializer):
     id = serializers.ReadOnlyField(
-        source="user_following.id")
+        source="following.id")
     nickname = serializers.ReadOnlyField(
-        source="user.nickname",
+        source="following.nickname",
     )
 
     class Meta:
@@ -123,3 +143,22 @@ class UserFollowersSerializer(serializers.ModelSerializer):
             "follower",
             "nickname",
         )
+
+
+class FollowBatchSerializer(serializers.Serializer):
+    users = serializers.ListField(
+        child=serializers.IntegerField(min_value=1),
+        allow_empty=False,
+    )
+
+    def validate_users(self, value):
+        limit = settings.FOLLOW_BATCH_MAX_USERS
+        if len(value) > limit:
+            raise serializers.ValidationError(
+                f"At most {limit} users can be followed in one batch."
+            )
+        return value
+
+
+class TokenRefreshSerializer(BaseTokenRefreshSerializer):
+    token_class = RefreshToken
@@ -0,0 +1,51 @@
+from django.contrib.auth import get_user_model
+from django.db.models.signals import post_delete, post_save, pre_delete
+from django.db import transaction
+from django.dispatch import receiver
+from rest_framework_simplejwt.token_blacklist.models import BlacklistedToken
+
+from user.authentication import invalidate_cached_user
+from user.autocomplete import nickname_index
+from user.blacklist import blacklisted_jtis
+from user.counters import release_follow_counters
+
+
+@receiver(pre_delete, sender=get_user_model())
+def release_deleted_user_follows(sender, instance, **kwargs):
+    release_follow_counters(instance)
+
+
+@receiver(post_save, sender=get_user_model())
+@receiver(post_delete, sender=get_user_model())
+def invalidate_authenticated_user(sender, instance, **kwargs):
+    # Covers profile updates, password changes, deactivation and deletion.
+    invalidate_cached_user(instance.pk)
+
+
+@receiver(post_save, sender=get_user_model())
+def index_saved_user_nickname(sender, instance, update_fields, raw, **kwargs):
+    if raw or (
+        update_fields is not None
+        and not {"nickname", "is_active"} & set(update_fields)
+    ):
+        return
+    user_id, nickname, is_active = (
+        instance.pk,
+        instance.nickname,
+        instance.is_active,
+    )
+    transaction.on_commit(
+        lambda: nickname_index.update(user_id, nickname, is_active)
+    )
+
+
+@receiver(post_delete, sender=get_user_model())
+def unindex_deleted_user_nickname(sender, instance, **kwargs):
+    user_id = instance.pk
+    transaction.on_commit(lambda: nickname_index.discard(user_id))
+
+
+@receiver(post_save, sender=BlacklistedToken)
+def add_blacklisted_jti(sender, instance, created, **kwargs):
+    if created:
+        blacklisted_jtis.add(instance.token.jti)
@@ -1,10 +1,32 @@
+import threading
+from datetime import timedelta
+from io import StringIO
+from unittest import mock
+
 from django.contrib.auth import get_user_model
-from django.test import TestCase
+from django.core.cache import cache
+from django.core.management import call_command
+from django.test import TestCase, override_settings
 from django.urls import reverse
+from django.utils import timezone
 from rest_framework import status
 from rest_framework.test import APIClient
+from rest_framework_simplejwt.token_blacklist.models import (
+    BlacklistedToken,
+    OutstandingToken,
+)
+from rest_framework_simplejwt.tokens import AccessToken
+
+from py_social_media_api.testing import QueryBudgetTestMixin
+from user import autocomplete
+from user.authentication import CachedJWTAuthentication, local_users
+from user.autocomplete import NicknameTrie, nickname_index
+from user.blacklist import BloomFilter, blacklisted_jtis, bump_generation
+from user.checks import check_shared_cache
+from user.follows import follow_user
 from user.models import Follow
 from user.serializers import UserSerializer
+from user.tokens import RefreshToken
 
 
 def detail_url(user_id):
@@ -31,7 +53,7 @@ class UserViewSetTest(TestCase):
 
         self.client.force_authenticate(user=user)
         url = detail_url(user_to_follow.id)
-        response = self.client.get(url + "follow/")
+        response = self.client.post(url + "follow/")
 
         self.assertEqual(response.status_code, status.HTTP_201_CREATED)
         self.assertTrue(
@@ -54,13 +76,74 @@ class UserViewSetTest(TestCase):
 
         self.client.force_authenticate(user=user)
         url = detail_url(user_to_unfollow.id)
-        response = self.client.get(url + "unfollow/")
+        response = self.client.post(url + "unfollow/")
 
         self.assertEqual(response.status_code, status.HTTP_200_OK)
         self.assertFalse(
             Follow.objects.filter(follower=user, following=user_to_unfollow).exists()
         )
 
+    def test_follow_and_unfollow_are_idempotent(self):
+        user = get_user_model().objects.create_user(
+            email="test@example.com",
+            password="testpassword",
+            nickname="testuser",
+        )
+        followed = get_user_model().objects.create_user(
+            email="follow@example.com",
+            password="followpassword",
+            nickname="followuser",
+        )
+        self.client.force_authenticate(user=user)
+        url = detail_url(followed.id)
+
+        first = self.client.post(url + "follow/")
+        second = self.client.post(url + "follow/")
+
+        self.assertEqual(first.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(second.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            second.data, {"following": True, "followers_count": 1}
+        )
+
+        self.client.post(url + "unfollow/")
+        response = self.client.post(url + "unfollow/")
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            response.data, {"following": False, "followers_count": 0}
+        )
+        user.refresh_from_db()
+        self.assertEqual(user.following_count, 0)
+
+    def test_cannot_follow_self_or_missing_user(self):
+        user = get_user_model().objects.create_user(
+            email="test@example.com",
+            password="testpassword",
+            nickname="testuser",
+        )
+        self.client.force_authenticate(user=user)
+
+        own = self.client.post(detail_url(user.id) + "follow/")
+        missing = self.client.post(detail_url(user.id + 100) + "follow/")
+
+        self.assertEqual(own.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(missing.status_code, status.HTTP_404_NOT_FOUND)
+        self.assertFalse(Follow.objects.exists())
+        user.refresh_from_db()
+        self.assertEqual(user.following_count, 0)
+
+    def test_follow_requires_authentication(self):
+        user = get_user_model().objects.create_user(
+            email="test@example.com",
+            password="testpassword",
+            nickname="testuser",
+        )
+
+        response = self.client.post(detail_url(user.id) + "follow/")
+
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+
     def test_me_get_profile(self):
         user = get_user_model().objects.create_user(
             email="test@example.com",
@@ -123,3 +206,634 @@ class UserViewSetTest(TestCase):
         self.assertEqual(response.status_code, status.HTTP_201_CREATED)
         self.assertEqual(response.data, serializer.data)
         self.assertTrue(user.check_password(payload["password"]))
+
+
+class FollowCountersTest(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.users = [
+            get_user_model().objects.create_user(
+                email=f"user{i}@example.com",
+                password="testpassword",
+                nickname=f"user{i}",
+            )
+            for i in range(8)
+        ]
+        self.user = self.users[0]
+        self.client.force_authenticate(user=self.user)
+
+    def follow_all(self):
+        for other in self.users[1:]:
+            self.client.post(detail_url(other.id) + "follow/")
+            client = APIClient()
+            client.force_authenticate(user=other)
+            client.post(detail_url(self.user.id) + "follow/")
+
+    def test_follow_and_unfollow_update_counters(self):
+        followed = self.users[1]
+
+        res = self.client.post(detail_url(followed.id) + "follow/")
+        self.assertEqual(res.data["followers_count"], 1)
+
+        self.user.refresh_from_db()
+        self.assertEqual(self.user.following_count, 1)
+
+        res = self.client.post(detail_url(followed.id) + "unfollow/")
+        self.assertEqual(res.data["followers_count"], 0)
+
+        self.user.refresh_from_db()
+        self.assertEqual(self.user.following_count, 0)
+
+    def test_list_returns_stored_counters(self):
+        self.follow_all()
+
+        res = self.client.get(reverse("user:user-list"))
+
+        counts = {
+            user["id"]: (user["following_count"], user["followers_count"])
+            for user in res.data
+        }
+        self.assertEqual(counts[self.user.id], (7, 7))
+        self.assertEqual(counts[self.users[1].id], (1, 1))
+
+    def test_detail_returns_bounded_previews(self):
+        self.follow_all()
+
+        res = self.client.get(detail_url(self.user.id))
+
+        self.assertEqual(res.data["followers_count"], 7)
+        self.assertNotIn("password", res.data)
+        self.assertEqual(len(res.data["followers_preview"]), 5)
+        self.assertEqual(len(res.data["following_preview"]), 5)
+        self.assertEqual(
+            res.data["following_preview"][0]["id"], self.users[-1].id
+        )
+
+    def test_follow_lists_are_paginated_by_cursor(self):
+        self.follow_all()
+        url = detail_url(self.user.id) + "followers/"
+
+        first_page = self.client.get(url, {"page_size": 4})
+        second_page = self.client.get(first_page.data["next"])
+
+        ids = [item["follower"] for item in first_page.data["results"]]
+        ids += [item["follower"] for item in second_page.data["results"]]
+        self.assertEqual(ids, [user.id for user in reversed(self.users[1:])])
+        self.assertIsNone(second_page.data["next"])
+
+        res = self.client.get(detail_url(self.users[1].id) + "following/")
+        self.assertEqual(
+            [item["id"] for item in res.data["results"]], [self.user.id]
+        )
+
+    def test_follow_list_of_missing_user(self):
+        res = self.client.get(detail_url(0) + "followers/")
+
+        self.assertEqual(res.status_code, status.HTTP_404_NOT_FOUND)
+        for name in ("followers", "following"):
+            res = self.client.get(detail_url("abc") + f"{name}/")
+            self.assertEqual(res.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_deleting_user_releases_counters(self):
+        self.follow_all()
+
+        self.users[1].delete()
+
+        self.user.refresh_from_db()
+        self.assertEqual(
+            (self.user.following_count, self.user.followers_count), (6, 6)
+        )
+
+
+class FollowBatchTest(TestCase):
+    FOLLOW_BATCH_URL = reverse("user:user-follow-batch")
+
+    def setUp(self):
+        self.client = APIClient()
+        self.users = [
+            get_user_model().objects.create_user(
+                email=f"user{i}@example.com",
+                password="testpassword",
+                nickname=f"user{i}",
+            )
+            for i in range(4)
+        ]
+        self.user = self.users[0]
+        self.client.force_authenticate(user=self.user)
+
+    def test_follow_batch(self):
+        Follow.objects.create(follower=self.user, following=self.users[1])
+        ids = [user.id for user in self.users]
+
+        res = self.client.post(
+            self.FOLLOW_BATCH_URL, {"users": ids + [999]}, format="json"
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            res.data["results"],
+            [
+                {"user": user.id, "following": True, "followers_count": 1}
+                for user in self.users[1:]
+            ],
+        )
+        self.assertEqual(
+            Follow.objects.filter(follower=self.user).count(), 3
+        )
+        self.user.refresh_from_db()
+        self.assertEqual(self.user.following_count, 3)
+
+    @override_settings(FOLLOW_BATCH_MAX_USERS=2)
+    def test_follow_batch_limit(self):
+        res = self.client.post(
+            self.FOLLOW_BATCH_URL,
+            {"users": [user.id for user in self.users[1:]]},
+            format="json",
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertFalse(Follow.objects.exists())
+
+
+class UserQueryBudgetTest(QueryBudgetTestMixin, TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.users = [
+            get_user_model().objects.create_user(
+                email=f"user{i}@example.com",
+                password="testpassword",
+                nickname=f"user{i}",
+            )
+            for i in range(5)
+        ]
+        self.user = self.users[0]
+        for other in self.users[1:]:
+            Follow.objects.create(follower=self.user, following=other)
+            Follow.objects.create(follower=other, following=self.user)
+        self.client.force_authenticate(user=self.user)
+
+    def test_list_budget(self):
+        with self.assertMaxQueries(1):
+            self.client.get(reverse("user:user-list"))
+
+    def test_retrieve_budget(self):
+        with self.assertMaxQueries(3):
+            self.client.get(detail_url(self.user.id))
+
+    def test_followers_budget(self):
+        with self.assertMaxQueries(2):
+            self.client.get(detail_url(self.user.id) + "followers/")
+
+    def test_follow_budget(self):
+        Follow.objects.filter(following=self.users[1]).delete()
+
+        with self.assertMaxQueries(7):
+            self.client.post(detail_url(self.users[1].id) + "follow/")
+
+    def test_unfollow_budget(self):
+        with self.assertMaxQueries(6):
+            self.client.post(detail_url(self.users[1].id) + "unfollow/")
+
+    def test_me_budget(self):
+        with self.assertMaxQueries(1):
+            self.client.patch(reverse("user:user-me"), {"city": "Kyiv"})
+
+
+JWT_USER_CACHE = {
+    "ENABLED": True,
+    "TIMEOUT": 30,
+    "LOCAL_TIMEOUT": 5,
+    "MAX_SIZE": 10000,
+    "SHARED": False,
+}
+TOKEN_BLACKLIST_FILTER = {
+    "ENABLED": True,
+    "ERROR_RATE": 0.001,
+    "MIN_CAPACITY": 10000,
+    "SYNC_INTERVAL": 30,
+    "SYNC_OVERLAP": 60,
+}
+
+
+@override_settings(JWT_USER_CACHE=JWT_USER_CACHE)
+class CachedJWTAuthenticationTest(TestCase):
+    ME_URL = reverse("user:user-me")
+
+    def setUp(self):
+        cache.clear()
+        local_users.clear()
+        self.user = get_user_model().objects.create_user(
+            email="test@example.com",
+            password="testpassword",
+            nickname="testuser",
+        )
+        self.client = APIClient()
+        self.client.credentials(
+            HTTP_AUTHORIZATION=f"Bearer {AccessToken.for_user(self.user)}"
+        )
+
+    def test_user_is_loaded_once(self):
+        with self.assertNumQueries(1):
+            self.client.get(self.ME_URL)
+
+        with self.assertNumQueries(0):
+            response = self.client.get(self.ME_URL)
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data["email"], self.user.email)
+
+    def test_profile_update_invalidates_cached_user(self):
+        self.client.get(self.ME_URL)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.patch(self.ME_URL, {"city": "Kyiv"})
+
+        with self.assertNumQueries(1):
+            response = self.client.get(self.ME_URL)
+        self.assertEqual(response.data["city"], "Kyiv")
+
+    def test_deactivation_revokes_access_immediately(self):
+        self.client.get(self.ME_URL)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.user.is_active = False
+            self.user.save()
+
+        response = self.client.get(self.ME_URL)
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_deleted_user_is_rejected(self):
+        self.client.get(self.ME_URL)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.delete(self.ME_URL)
+
+        response = self.client.get(self.ME_URL)
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_follow_counters_invalidate_cached_user(self):
+        follower = get_user_model().objects.create_user(
+            email="follower@example.com",
+            password="testpassword",
+            nickname="follower",
+        )
+        self.client.get(self.ME_URL)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            follow_user(follower.id, self.user.id)
+
+        response = self.client.get(self.ME_URL)
+        self.assertEqual(response.data["followers_count"], 1)
+
+    def test_profile_update_keeps_counters_of_stale_user(self):
+        self.client.get(self.ME_URL)
+        get_user_model().objects.filter(id=self.user.id).update(
+            followers_count=3
+        )
+
+        response = self.client.patch(self.ME_URL, {"city": "Kyiv"})
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.user.refresh_from_db()
+        self.assertEqual(self.user.city, "Kyiv")
+        self.assertEqual(self.user.followers_count, 3)
+
+    def test_cached_users_share_no_state(self):
+        authentication = CachedJWTAuthentication()
+        first = authentication.get_cached_user(self.user.id)
+        second = authentication.get_cached_user(self.user.id)
+
+        self.assertIsNot(first, second)
+        self.assertIsNot(first._state, second._state)
+        self.assertEqual(first.email, second.email)
+
+    @override_settings(
+        JWT_USER_CACHE={**JWT_USER_CACHE, "MAX_SIZE": 10, "SHARED": True}
+    )
+    def test_shared_cache_serves_other_processes(self):
+        self.client.get(self.ME_URL)
+        local_users.clear()
+
+        with self.assertNumQueries(0):
+            response = self.client.get(self.ME_URL)
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+    @override_settings(JWT_USER_CACHE={**JWT_USER_CACHE, "ENABLED": False})
+    def test_user_is_loaded_every_time_when_disabled(self):
+        self.client.get(self.ME_URL)
+
+        with self.assertNumQueries(1):
+            response = self.client.get(self.ME_URL)
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+    @override_settings(
+        SHARED_CACHE=False,
+        JWT_USER_CACHE={**JWT_USER_CACHE, "LOCAL_TIMEOUT": 0},
+    )
+    def test_local_timeout_applies_without_shared_cache(self):
+        self.client.get(self.ME_URL)
+
+        with self.assertNumQueries(1):
+            response = self.client.get(self.ME_URL)
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(check_shared_cache(None), [])
+
+
+@override_settings(TOKEN_BLACKLIST_FILTER=TOKEN_BLACKLIST_FILTER)
+class TokenBlacklistFilterTest(TestCase):
+    REFRESH_URL = reverse("user:token_refresh")
+    LOGOUT_URL = reverse("user:auth_logout")
+
+    def setUp(self):
+        cache.clear()
+        blacklisted_jtis.clear()
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            email="test@example.com",
+            password="testpassword",
+            nickname="testuser",
+        )
+
+    def test_bloom_filter_has_no_false_negatives(self):
+        bloom = BloomFilter(100, 0.01)
+        items = [f"jti-{index}" for index in range(100)]
+        for item in items:
+            bloom.add(item)
+
+        self.assertTrue(all(item in bloom for item in items))
+        false_positives = sum(
+            f"other-{index}" in bloom for index in range(1000)
+        )
+        self.assertLess(false_positives, 50)
+
+    def test_unlisted_token_skips_blacklist_query(self):
+        token = str(RefreshToken.for_user(self.user))
+        blacklisted_jtis.refresh()
+
+        with self.assertNumQueries(0):
+            RefreshToken(token)
+
+    @override_settings(SHARED_CACHE=False)
+    def test_enabled_filter_requires_shared_cache(self):
+        warnings = check_shared_cache(None)
+
+        self.assertEqual(
+            [warning.id for warning in warnings], ["user.W001"]
+        )
+        self.assertIn("TOKEN_BLACKLIST_FILTER", warnings[0].msg)
+
+    @override_settings(
+        TOKEN_BLACKLIST_FILTER={**TOKEN_BLACKLIST_FILTER, "ENABLED": False}
+    )
+    def test_blacklist_is_queried_without_shared_cache(self):
+        refresh = RefreshToken.for_user(self.user)
+        outstanding = OutstandingToken.objects.get(jti=refresh["jti"])
+        BlacklistedToken.objects.bulk_create(
+            [BlacklistedToken(token=outstanding)]
+        )
+
+        res = self.client.post(self.REFRESH_URL, {"refresh": str(refresh)})
+
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_blacklisted_token_cannot_refresh(self):
+        refresh = RefreshToken.for_user(self.user)
+        self.client.force_authenticate(user=self.user)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post(self.LOGOUT_URL, {"refresh_token": str(refresh)})
+        res = self.client.post(self.REFRESH_URL, {"refresh": str(refresh)})
+
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_rotated_token_is_blacklisted(self):
+        refresh = str(RefreshToken.for_user(self.user))
+
+        with self.captureOnCommitCallbacks(execute=True):
+            rotated = self.client.post(self.REFRESH_URL, {"refresh": refresh})
+        reused = self.client.post(self.REFRESH_URL, {"refresh": refresh})
+
+        self.assertEqual(rotated.status_code, status.HTTP_200_OK)
+        self.assertIn("refresh", rotated.data)
+        self.assertEqual(reused.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_entries_from_other_processes_are_synced(self):
+        refresh = RefreshToken.for_user(self.user)
+        blacklisted_jtis.refresh()
+
+        outstanding = OutstandingToken.objects.get(jti=refresh["jti"])
+        BlacklistedToken.objects.bulk_create(
+            [BlacklistedToken(token=outstanding)]
+        )
+        bump_generation()
+
+        self.assertTrue(blacklisted_jtis.might_contain(refresh["jti"]))
+
+    def test_compact_token_blacklist(self):
+        for _ in range(3):
+            RefreshToken.for_user(self.user).blacklist()
+        RefreshToken.for_user(self.user)
+        OutstandingToken.objects.filter(
+            id__in=OutstandingToken.objects.order_by("id").values("id")[:3]
+        ).update(expires_at=timezone.now() - timedelta(days=1))
+
+        call_command(
+            "compact_token_blacklist", batch_size=2, stdout=StringIO()
+        )
+
+        self.assertEqual(OutstandingToken.objects.count(), 1)
+        self.assertFalse(BlacklistedToken.objects.exists())
+
+
+class UserSearchTest(TestCase):
+    AUTOCOMPLETE_URL = reverse("user:user-autocomplete")
+
+    def setUp(self):
+        cache.clear()
+        nickname_index.clear()
+        self.client = APIClient()
+        self.users = {
+            nickname: get_user_model().objects.create_user(
+                email=f"{nickname}@example.com",
+                password="testpassword",
+                nickname=nickname,
+                city=city,
+            )
+            for nickname, city in (
+                ("John", "Kyiv"),
+                ("johnny", "Lviv"),
+                ("Joan", "kyiv"),
+                ("Straße", None),
+            )
+        }
+
+    def nicknames(self, response):
+        return [item["nickname"] for item in response.data["results"]]
+
+    def test_nickname_is_stored_case_folded(self):
+        user = self.users["Straße"]
+        self.assertEqual(user.nickname_folded, "strasse")
+
+        user.nickname = "NewName"
+        user.save(update_fields=["nickname"])
+        user.refresh_from_db()
+
+        self.assertEqual(user.nickname_folded, "newname")
+
+    def test_filter_by_nickname_and_city(self):
+        response = self.client.get(
+            reverse("user:user-list"), {"nickname": "JOHN"}
+        )
+        self.assertEqual(
+            [item["nickname"] for item in response.data], ["John"]
+        )
+
+        response = self.client.get(
+            reverse("user:user-list"), {"nickname": "jo", "city": "KYIV"}
+        )
+        self.assertEqual(response.data, [])
+
+    def test_filter_by_nickname_prefix_and_city(self):
+        response = self.client.get(
+            reverse("user:user-list"), {"nickname_prefix": "JO"}
+        )
+        self.assertEqual(
+            sorted(item["nickname"] for item in response.data),
+            ["Joan", "John", "johnny"],
+        )
+
+        response = self.client.get(
+            reverse("user:user-list"),
+            {"nickname_prefix": "john", "city": "KYIV"},
+        )
+        self.assertEqual(
+            [item["nickname"] for item in response.data], ["John"]
+        )
+
+    def test_autocomplete_orders_matches_by_folded_nickname(self):
+        response = self.client.get(self.AUTOCOMPLETE_URL, {"q": "Jo"})
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(self.nicknames(response), ["Joan", "John", "johnny"])
+        self.assertEqual(
+            response.data["results"][1],
+            {"id": self.users["John"].id, "nickname": "John"},
+        )
+        response = self.client.get(self.AUTOCOMPLETE_URL, {"q": "STRASS"})
+        self.assertEqual(self.nicknames(response), ["Straße"])
+
+    @override_settings(NICKNAME_AUTOCOMPLETE={"LIMIT": 2, "SYNC_INTERVAL": 30})
+    def test_autocomplete_limit(self):
+        response = self.client.get(self.AUTOCOMPLETE_URL, {"q": "j"})
+
+        self.assertEqual(self.nicknames(response), ["Joan", "John"])
+
+    def test_autocomplete_requires_query(self):
+        response = self.client.get(self.AUTOCOMPLETE_URL, {"q": " "})
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_autocomplete_skips_database_once_built(self):
+        nickname_index.search("j")
+
+        with self.assertNumQueries(0):
+            response = self.client.get(self.AUTOCOMPLETE_URL, {"q": "joh"})
+
+        self.assertEqual(self.nicknames(response), ["John", "johnny"])
+
+    def test_user_changes_update_index(self):
+        nickname_index.search("j")
+        user = self.users["johnny"]
+
+        with self.captureOnCommitCallbacks(execute=True):
+            get_user_model().objects.create_user(
+                email="jo@example.com", password="testpassword", nickname="Jo"
+            )
+            user.nickname = "Bob"
+            user.save()
+            self.users["Joan"].delete()
+            self.users["John"].is_active = False
+            self.users["John"].save()
+
+        with self.assertNumQueries(0):
+            self.assertEqual(
+                [item["nickname"] for item in nickname_index.search("jo")],
+                ["Jo"],
+            )
+            self.assertEqual(
+                [item["nickname"] for item in nickname_index.search("b")],
+                ["Bob"],
+            )
+
+    def test_changes_from_other_processes_trigger_rebuild(self):
+        nickname_index.search("j")
+        get_user_model().objects.filter(id=self.users["Joan"].id).update(
+            nickname="Zed", nickname_folded="zed"
+        )
+        autocomplete.bump_generation()
+
+        with override_settings(
+            NICKNAME_AUTOCOMPLETE={"LIMIT": 10, "SYNC_INTERVAL": 0}
+        ):
+            matches = nickname_index.search("z")
+
+        self.assertEqual([item["nickname"] for item in matches], ["Zed"])
+
+    @override_settings(
+        SHARED_CACHE=False,
+        NICKNAME_AUTOCOMPLETE={"LIMIT": 10, "SYNC_INTERVAL": 0},
+    )
+    def test_rebuilds_on_interval_without_shared_cache(self):
+        nickname_index.search("j")
+        get_user_model().objects.filter(id=self.users["Joan"].id).update(
+            nickname="Zed", nickname_folded="zed"
+        )
+
+        matches = nickname_index.search("z")
+
+        self.assertEqual([item["nickname"] for item in matches], ["Zed"])
+
+    @override_settings(
+        SHARED_CACHE=False,
+        NICKNAME_AUTOCOMPLETE={"LIMIT": 10, "SYNC_INTERVAL": 0},
+    )
+    def test_rebuild_keeps_serving_and_replays_changes(self):
+        nickname_index.search("j")
+        loaded = nickname_index.load()
+        loading, release = threading.Event(), threading.Event()
+
+        def slow_load():
+            loading.set()
+            release.wait(5)
+            return loaded
+
+        with mock.patch.object(nickname_index, "load", slow_load):
+            rebuild = threading.Thread(target=nickname_index.refresh)
+            rebuild.start()
+            loading.wait(5)
+            with self.assertNumQueries(0):
+                matches = nickname_index.search("joa")
+            nickname_index.update(self.users["Joan"].id, "Zed", True)
+            release.set()
+            rebuild.join()
+
+        self.assertEqual([item["nickname"] for item in matches], ["Joan"])
+        self.assertIs(nickname_index.trie, loaded[0])
+        self.assertEqual(
+            nickname_index.trie.search("z", 10),
+            [(self.users["Joan"].id, "Zed")],
+        )
+
+    def test_trie_removes_empty_branches(self):
+        trie = NicknameTrie()
+        trie.insert("ab", 1, "ab")
+        trie.insert("abc", 2, "abc")
+
+        trie.remove("abc", 2)
+        trie.remove("ab", 1)
+
+        self.assertEqual(trie.root.children, {})
+        self.assertEqual(trie.search("a", 10), [])
@@ -0,0 +1,16 @@
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.tokens import RefreshToken as BaseRefreshToken
+
+from user.blacklist import blacklisted_jtis
+
+
+class RefreshToken(BaseRefreshToken):
+    """
+    Refresh token that only asks the database whether it is blacklisted
+    when the in-memory blacklist filter cannot rule it out.
+    """
+
+    def check_blacklist(self):
+        jti = self.payload[api_settings.JTI_CLAIM]
+        if blacklisted_jtis.might_contain(jti):
+            super().check_blacklist()
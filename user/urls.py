@@ -18,5 +18,5 @@ urlpatterns = [
     path("api/token/refresh/", TokenRefreshView.as_view(), name="token_refresh"),
     path("api/token/verify/", TokenVerifyView.as_view(), name="token_verify"),
     path("api/logout/", LogoutView.as_view(), name="auth_logout"),
-    path("", include(router.ursl)),
+    path("", include(router.urls)),
 ]
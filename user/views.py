@@ -1,44 +1,84 @@
-from django.db.models import Count
+from django.conf import settings
+from django.db.models import Prefetch
 from django.contrib.auth import get_user_model
 from drf_spectacular.utils import extend_schema
 from rest_framework import viewsets, status
 from rest_framework.permissions import IsAuthenticated
 from rest_framework.response import Response
 from rest_framework.decorators import action
+from rest_framework.exceptions import NotFound, ValidationError
+from rest_framework.pagination import CursorPagination
 from rest_framework.views import APIView
-from rest_framework_simplejwt.tokens import RefreshToken
 
-from user.models import Follow
+from py_social_media_api.routers import ReplicaReadMixin
+from user.autocomplete import nickname_index, prefix_lookup
+from user.follows import batch_follow, follow_user, unfollow_user
+from user.models import Follow, fold_nickname
 from user.permissions import IsOwnerOrReadOnly
 from user.serializers import (
+    FollowBatchSerializer,
+    FollowSerializer,
     UserSerializer,
     UserListSerializer,
     UserDetailSerializer,
+    UserFollowersSerializer,
 )
+from user.tokens import RefreshToken
 
 
-class UserViewSet(viewsets.ModelViewSet):
+def with_follow_previews(queryset):
+    """
+    Prefetch the latest follows shown on a user detail, bounded per user
+    by USER_DETAIL_PREVIEW.
+    """
+    preview = settings.USER_DETAIL_PREVIEW
+    return queryset.prefetch_related(
+        Prefetch(
+            "following",
+            queryset=Follow.objects.select_related("following").order_by(
+                "-id"
+            )[: preview["FOLLOWING"]],
+            to_attr="preview_following",
+        ),
+        Prefetch(
+            "followers",
+            queryset=Follow.objects.select_related("follower").order_by("-id")[
+                : preview["FOLLOWERS"]
+            ],
+            to_attr="preview_followers",
+        ),
+    )
+
+
+class FollowPagination(CursorPagination):
+    page_size = 20
+    max_page_size = 100
+    page_size_query_param = "page_size"
+    ordering = "-id"
+
+
+class UserViewSet(ReplicaReadMixin, viewsets.ModelViewSet):
     serializer_class = UserSerializer
     queryset = get_user_model().objects.all()
     permission_classes = (IsOwnerOrReadOnly,)
 
     def get_queryset(self):
-        queryset = self.queryset
+        queryset = super().get_queryset()
         nickname = self.request.query_params.get("nickname")
+        nickname_prefix = self.request.query_params.get("nickname_prefix")
         city = self.request.query_params.get("city")
 
         if nickname:
-            queryset = queryset.filter(user__nickname=nickname)
+            queryset = queryset.filter(nickname_folded=fold_nickname(nickname))
+        if nickname_prefix:
+            queryset = queryset.filter(**prefix_lookup(nickname_prefix))
         if city:
-            queryset = queryset.filter(user__city=city)
+            queryset = queryset.filter(city__iexact=city)
 
-        if self.action == "list":
-            queryset = queryset.annotate(
-                num_following=Count("following"),
-                num_followers=Count("followers"),
-            )
+        if self.action == "retrieve":
+            queryset = with_follow_previews(queryset)
 
-        return queryset.distinct()
+        return queryset
 
     def get_serializer_class(self):
         if self.action == "list":
@@ -49,45 +89,120 @@ class UserViewSet(viewsets.ModelViewSet):
 
         return UserSerializer
 
+    @staticmethod
+    def _pk_to_int(pk):
+        if not str(pk).isdigit():
+            raise NotFound("No User matches the given query.")
+        return int(pk)
+
     @action(
         detail=True,
-        methods=[
-            "GET",
-        ],
-        serializer_class=[UserDetailSerializer],
+        methods=["POST"],
+        permission_classes=(IsAuthenticated,),
     )
     def follow(self, request, pk=None):
         """
         Endpoint for performing follow action
         example: api/users/pk/follow/
         """
-        user = request.user
-        user_follow = self.get_object()
-        Follow.objects.create(follower=user, following=user_follow)
-        serializer = self.get_serializer_class()(user_follow)
-        return Response(serializer.data, status=status.HTTP_201_CREATED)
+        state, created = follow_user(request.user.id, self._pk_to_int(pk))
+        return Response(
+            state,
+            status=status.HTTP_201_CREATED if created else status.HTTP_200_OK,
+        )
 
     @action(
         detail=True,
-        methods=[
-            "GET",
-        ],
-        serializer_class=[UserDetailSerializer],
+        methods=["POST"],
+        permission_classes=(IsAuthenticated,),
     )
     def unfollow(self, request, pk=None):
         """
         Endpoint for performing unfollow action
         example: api/users/pk/unfollow/
         """
+        return Response(
+            unfollow_user(request.user.id, self._pk_to_int(pk)),
+            status=status.HTTP_200_OK,
+        )
 
-        user = request.user
-        user_follow = self.get_object()
-        follow_conn = Follow.objects.filter(
-            follower=user, following=user_follow
-        ).first()
-        follow_conn.delete()
-        serializer = self.get_serializer_class()(user_follow)
-        return Response(serializer.data, status.HTTP_200_OK)
+    @action(
+        detail=False,
+        methods=["POST"],
+        url_path="follow/batch",
+        serializer_class=FollowBatchSerializer,
+        permission_classes=(IsAuthenticated,),
+    )
+    def follow_batch(self, request):
+        """
+        Endpoint for following many users in one request
+        example: api/users/follow/batch/
+        """
+        serializer = FollowBatchSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+
+        results = batch_follow(
+            request.user.id, serializer.validated_data["users"]
+        )
+        return Response({"results": results}, status=status.HTTP_200_OK)
+
+    def _paginate_follows(self, pk, queryset, serializer):
+        if not get_user_model().objects.filter(id=pk).exists():
+            raise NotFound("No User matches the given query.")
+        paginator = FollowPagination()
+        page = paginator.paginate_queryset(queryset, self.request, view=self)
+        return paginator.get_paginated_response(
+            serializer(page, many=True).data
+        )
+
+    @action(
+        detail=True,
+        methods=["GET"],
+        serializer_class=FollowSerializer,
+    )
+    def following(self, request, pk=None):
+        """
+        Endpoint for listing the users a user follows, newest first
+        example: api/users/pk/following/
+        """
+        pk = self._pk_to_int(pk)
+        return self._paginate_follows(
+            pk,
+            Follow.objects.filter(follower_id=pk).select_related("following"),
+            FollowSerializer,
+        )
+
+    @action(
+        detail=True,
+        methods=["GET"],
+        serializer_class=UserFollowersSerializer,
+    )
+    def followers(self, request, pk=None):
+        """
+        Endpoint for listing the followers of a user, newest first
+        example: api/users/pk/followers/
+        """
+        pk = self._pk_to_int(pk)
+        return self._paginate_follows(
+            pk,
+            Follow.objects.filter(following_id=pk).select_related("follower"),
+            UserFollowersSerializer,
+        )
+
+    @action(
+        detail=False,
+        methods=["GET"],
+    )
+    def autocomplete(self, request):
+        """
+        Endpoint for nickname prefix suggestions, e.g. for @-mentions,
+        answered from memory without querying the database
+        example: api/users/autocomplete/?q=jo
+        """
+        query = request.query_params.get("q", "").strip()
+        if not query:
+            raise ValidationError({"q": "This query parameter is required."})
+        return Response({"results": nickname_index.search(query)})
 
     @action(
         detail=False,